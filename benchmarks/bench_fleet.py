@@ -0,0 +1,86 @@
+"""Scaling benchmark for one config entry serving a fleet of IHDs.
+
+For each fleet size, reports the memory held per device once every device
+has published each message kind, and the mean dispatch cost per message
+at that size, so both can be checked to stay flat as the fleet grows.
+
+    python benchmarks/bench_fleet.py --output fleet.json
+    python benchmarks/bench_fleet.py --compare before.json after.json
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+
+from bench_pipeline import compare
+from harness import Pipeline, device_ids, synthetic_messages
+
+DEFAULT_DEVICES = (10, 100, 500, 1000)
+
+
+async def run_case(devices: int, steps: int) -> dict:
+    """Run one fleet size and return its results."""
+    ids = device_ids(devices)
+
+    gc.collect()
+    tracemalloc.start()
+    with Pipeline() as pipeline:
+        await pipeline.async_setup()
+        baseline, _ = tracemalloc.get_traced_memory()
+        for device_id in ids:
+            for topic, payload in synthetic_messages(device_id, 0):
+                await pipeline.async_publish(topic, payload)
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        messages = [
+            message
+            for step in range(1, steps + 1)
+            for device_id in ids
+            for message in synthetic_messages(device_id, step)
+        ]
+        started = time.perf_counter()
+        for topic, payload in messages:
+            await pipeline.async_publish(topic, payload)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "devices": devices,
+        "entities": len(pipeline.entities),
+        "bytes_per_device": round((current - baseline) / devices),
+        "messages": len(messages),
+        "dispatch_us_per_message": round(elapsed / len(messages) * 1e6, 2),
+    }
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=DEFAULT_DEVICES)
+    parser.add_argument("--steps", type=int, default=6, help="10 second steps per device")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = []
+    for devices in args.devices:
+        result = asyncio.run(run_case(devices, args.steps))
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Throughput and latency benchmark for the Glow sensor pipeline.
+
+Drives synthetic STATE, electricitymeter and gasmeter messages through the
+MQTT callback registered by ``sensor.async_setup_entry`` and reports, for
+each fleet size, messages/sec, p50/p99 per-message latency, state writes
+per message and the tracemalloc peak.
+
+    python benchmarks/bench_pipeline.py --output results.json
+    python benchmarks/bench_pipeline.py --sensors electricity_import electricity_power
+    python benchmarks/bench_pipeline.py --compare before.json after.json
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from harness import Pipeline, device_ids, synthetic_messages
+
+DEFAULT_DEVICES = (1, 10, 100, 1000)
+
+
+def percentile(samples: list[int], fraction: float) -> int:
+    """Return the nearest-rank percentile of sorted samples."""
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+async def run_case(devices: int, steps: int, sensors: list[str] | None = None) -> dict:
+    """Run one fleet size, with only the given sensors when set, and return its results."""
+    ids = device_ids(devices)
+    messages = [
+        message
+        for step in range(1, steps + 1)
+        for device_id in ids
+        for message in synthetic_messages(device_id, step)
+    ]
+
+    with Pipeline(sensors=sensors) as pipeline:
+        await pipeline.async_setup()
+        # First contact creates the entities; keep it out of the timings.
+        for device_id in ids:
+            for topic, payload in synthetic_messages(device_id, 0):
+                await pipeline.async_publish(topic, payload)
+        pipeline.state_writes = 0
+
+        latencies = []
+        gc.collect()
+        started = time.perf_counter()
+        for topic, payload in messages:
+            before = time.perf_counter_ns()
+            await pipeline.async_publish(topic, payload)
+            latencies.append(time.perf_counter_ns() - before)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        state_writes = pipeline.state_writes
+
+    # Memory is measured in a separate pass, tracing distorts the timings.
+    tracemalloc.start()
+    with Pipeline(sensors=sensors) as pipeline:
+        await pipeline.async_setup()
+        for step in range(0, min(steps, 5)):
+            for device_id in ids:
+                for topic, payload in synthetic_messages(device_id, step):
+                    await pipeline.async_publish(topic, payload)
+        _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "devices": devices,
+        "messages": len(messages),
+        "messages_per_second": round(len(messages) / elapsed, 1),
+        "latency_p50_us": round(percentile(latencies, 0.50) / 1000, 2),
+        "latency_p99_us": round(percentile(latencies, 0.99) / 1000, 2),
+        "state_writes_per_message": round(state_writes / len(messages), 3),
+        "tracemalloc_peak_bytes": peak,
+    }
+
+
+def git_revision() -> str | None:
+    """Return the current commit, if this is a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print the relative change between two result files."""
+    with open(before_path, encoding="utf-8") as file:
+        before = {case["devices"]: case for case in json.load(file)["results"]}
+    with open(after_path, encoding="utf-8") as file:
+        after = {case["devices"]: case for case in json.load(file)["results"]}
+    for devices in sorted(before.keys() & after.keys()):
+        print(f"{devices} devices")
+        for metric, value in after[devices].items():
+            if metric in ("devices", "messages"):
+                continue
+            old = before[devices][metric]
+            change = f"{(value - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {metric:28} {old:>14} -> {value:>14}  {change}")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=DEFAULT_DEVICES)
+    parser.add_argument("--steps", type=int, default=None, help="10 second steps per device")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--sensors", nargs="+", help="only create these sensors, by key")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = []
+    for devices in args.devices:
+        # Keep roughly the same number of messages per case.
+        steps = args.steps or max(3, 20000 // devices)
+        result = asyncio.run(run_case(devices, steps, args.sensors))
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "revision": git_revision(),
+                    "python": platform.python_version(),
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
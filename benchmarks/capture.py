@@ -0,0 +1,122 @@
+"""Capture format for Glow MQTT traffic, and a recorder that writes it.
+
+A capture is newline-delimited JSON, optionally gzip compressed, with one
+record per message::
+
+    {"t": 1718138093.512, "topic": "glow/XXXXXXYYYYYY/STATE", "p": "{...}"}
+
+``t`` is the receive time in seconds since the epoch and ``p`` the payload
+as text. Payloads that are not valid UTF-8 are stored base64 encoded under
+``b`` instead, so the raw bytes always round-trip.
+
+Recording needs paho-mqtt:
+
+    python benchmarks/capture.py --host broker.local --output glow.ndjson.gz
+"""
+
+from __future__ import annotations
+import argparse
+import base64
+from collections.abc import Iterator
+import gzip
+import json
+import time
+from typing import IO, NamedTuple
+
+
+class CaptureRecord(NamedTuple):
+    """One captured message."""
+
+    received: float
+    topic: str
+    payload: bytes
+
+
+def open_capture(path: str, mode: str) -> IO[str]:
+    """Open a capture file as text, transparently handling .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def encode_record(record: CaptureRecord) -> str:
+    """Return the capture line for a record."""
+    line = {"t": round(record.received, 3), "topic": record.topic}
+    try:
+        line["p"] = record.payload.decode("utf-8")
+    except UnicodeDecodeError:
+        line["b"] = base64.b64encode(record.payload).decode("ascii")
+    return json.dumps(line, separators=(",", ":"))
+
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    """Stream the records of a capture without loading it into memory."""
+    with open_capture(path, "r") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            payload = (
+                data["p"].encode("utf-8") if "p" in data else base64.b64decode(data["b"])
+            )
+            yield CaptureRecord(data["t"], data["topic"], payload)
+
+
+class CaptureWriter:
+    """Append records to a capture file."""
+
+    def __init__(self, path: str) -> None:
+        """Open the capture for writing."""
+        self._file = open_capture(path, "a")
+
+    def write(self, record: CaptureRecord) -> None:
+        """Write one record."""
+        self._file.write(encode_record(record))
+        self._file.write("\n")
+
+    def close(self) -> None:
+        """Flush and close the capture."""
+        self._file.close()
+
+
+def record(host: str, port: int, prefix: str, output: str, username: str | None, password: str | None) -> None:
+    """Record the Glow topics under prefix until interrupted."""
+    import paho.mqtt.client as paho  # pylint: disable=import-outside-toplevel
+
+    writer = CaptureWriter(output)
+    client = paho.Client(paho.CallbackAPIVersion.VERSION2)
+    if username:
+        client.username_pw_set(username, password)
+
+    def on_connect(client, userdata, flags, reason_code, properties):
+        client.subscribe([(f"{prefix}/+/STATE", 1), (f"{prefix}/+/SENSOR/+", 1)])
+
+    def on_message(client, userdata, message):
+        writer.write(CaptureRecord(time.time(), message.topic, message.payload))
+
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(host, port)
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+
+
+def main() -> None:
+    """Record a capture from a broker."""
+    parser = argparse.ArgumentParser(description="Record Glow MQTT traffic to a capture file.")
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--prefix", default="glow")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--output", required=True, help="capture file, .gz to compress")
+    args = parser.parse_args()
+    record(args.host, args.port, args.prefix, args.output, args.username, args.password)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""Offline harness that drives the integration without Home Assistant running.
+
+It provides a stubbed ``hass``, a local stand-in for the MQTT component and
+synthetic Glow payloads, so the sensor pipeline can be exercised and measured
+from a plain Python process. Home Assistant itself must be importable.
+"""
+
+from __future__ import annotations
+import asyncio
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from datetime import UTC, datetime, timedelta
+import json
+import os
+import sys
+from types import SimpleNamespace
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from homeassistant.const import CONF_DEVICE_ID  # noqa: E402
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+from custom_components.hildebrand_glow_ihd_mqtt import hub, sensor  # noqa: E402
+from custom_components.hildebrand_glow_ihd_mqtt.const import (  # noqa: E402
+    CONF_ALLOWED_DEVICES,
+    CONF_COALESCE_WINDOW,
+    CONF_COUNTER_INTERVAL,
+    CONF_DEBUG_SENSORS,
+    CONF_DENIED_DEVICES,
+    CONF_ELECTRICITY_MAX_POWER,
+    CONF_GAS_MAX_POWER,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_POWER_INTERVAL,
+    CONF_SENSORS,
+    CONF_STALE_ACTION,
+    CONF_STALE_TIMEOUT,
+    CONF_STATISTICS_IMPORT,
+    CONF_TIME_ZONE_ELECTRICITY,
+    CONF_TIME_ZONE_GAS,
+    CONF_TOPIC_PREFIX,
+    DATA_HUB,
+    DEFAULT_ELECTRICITY_MAX_POWER,
+    DEFAULT_GAS_MAX_POWER,
+    DEFAULT_STALE_ACTION,
+    DEFAULT_TOPIC_PREFIX,
+    DOMAIN,
+    KIND_ELECTRICITY,
+    KIND_GAS,
+    KIND_STATE,
+)
+
+TIME_ZONE = "Europe/London"
+
+
+@contextmanager
+def patched(patches: Iterable[tuple[Any, str, Any]]) -> Iterator[None]:
+    """Set each (target, name, value) for the duration of the block, then restore them."""
+    patches = list(patches)
+    originals = [(target, name, getattr(target, name)) for target, name, _ in patches]
+    for target, name, value in patches:
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for target, name, value in reversed(originals):
+            setattr(target, name, value)
+
+
+@contextmanager
+def controlled_clock(clock: dict[str, float]) -> Iterator[None]:
+    """Run the integration's wall and monotonic clocks on clock["now"] for the block."""
+    with patched(
+        [
+            (sensor, "monotonic", lambda: clock["now"]),
+            (sensor, "time", lambda: clock["now"]),
+            (hub, "time", lambda: clock["now"]),
+            (hub, "monotonic_ns", lambda: int(clock["now"] * 1e9)),
+            (dt_util, "utcnow", lambda: datetime.fromtimestamp(clock["now"], UTC)),
+        ]
+    ):
+        yield
+
+
+class LocalMqtt:
+    """Stand-in for the MQTT component that delivers messages in process."""
+
+    def __init__(self) -> None:
+        """Initialize the stand-in."""
+        self.subscriptions: list[tuple[str, Callable, str | None]] = []
+
+    async def async_subscribe(self, hass, topic, msg_callback, qos=0, encoding="utf-8"):
+        """Record a subscription and return its unsubscribe callback."""
+        subscription = (topic, msg_callback, encoding)
+        self.subscriptions.append(subscription)
+        return lambda: self.subscriptions.remove(subscription)
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        """Deliver a message to every matching subscription."""
+        for pattern, msg_callback, encoding in list(self.subscriptions):
+            if topic_matches(pattern, topic):
+                msg_callback(
+                    SimpleNamespace(
+                        topic=topic,
+                        payload=payload.decode(encoding) if encoding else payload,
+                        qos=1,
+                        retain=False,
+                    )
+                )
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """Return True if an MQTT topic matches a subscription pattern."""
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    for index, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if index >= len(topic_parts) or (part != "+" and part != topic_parts[index]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+class MemoryStore:
+    """Stand-in for the storage helper that keeps the data in memory."""
+
+    def __init__(self, hass, version: int, key: str) -> None:
+        """Initialize the store."""
+        self.key = key
+        self.data: Any = None
+
+    async def async_load(self) -> Any:
+        """Return the saved data."""
+        return self.data
+
+    def async_delay_save(self, data_func: Callable[[], Any], delay: float = 0) -> None:
+        """Save the data right away."""
+        self.data = data_func()
+
+
+class StubEntry:
+    """Minimal config entry."""
+
+    def __init__(self, entry_id: str, data: dict[str, Any], options: dict[str, Any] | None = None) -> None:
+        """Initialize the entry."""
+        self.entry_id = entry_id
+        self.data = data
+        self.options = options or {}
+        self._on_unload: list[Callable] = []
+
+    def async_on_unload(self, func: Callable) -> None:
+        """Remember a callback to run on unload."""
+        self._on_unload.append(func)
+
+    def unload(self) -> None:
+        """Run the unload callbacks."""
+        while self._on_unload:
+            self._on_unload.pop()()
+
+
+class Pipeline:
+    """The sensor platform of one config entry, wired to a LocalMqtt.
+
+    Use it as a context manager: the MQTT component, the registries, the
+    storage and the entity writes are stubbed out inside the block, and
+    the entry is unloaded and the stubs are removed on exit.
+    """
+
+    def __init__(self, device_id: str = "+", **options: Any) -> None:
+        """Initialize the stubbed hass and the MQTT stand-in.
+
+        Must be called from a running event loop.
+        """
+        self.mqtt = LocalMqtt()
+        loop = asyncio.get_running_loop()
+        self.hass = SimpleNamespace(
+            data={DOMAIN: {}},
+            config=SimpleNamespace(time_zone=TIME_ZONE),
+            loop=loop,
+            async_create_task=lambda target, name=None: loop.create_task(target, name=name),
+            bus=SimpleNamespace(async_listen_once=lambda event_type, listener: lambda: None),
+        )
+        self.hass.data[DOMAIN][DATA_HUB] = hub.GlowMqttHub(self.hass)
+        self.entities: list[sensor.HildebrandGlowMqttSensor] = []
+        self.state_writes = 0
+        self.on_write: Callable[[sensor.HildebrandGlowMqttSensor], None] | None = None
+        self.entry = StubEntry(
+            "bench",
+            {CONF_DEVICE_ID: device_id, CONF_TOPIC_PREFIX: DEFAULT_TOPIC_PREFIX},
+        )
+        self.hass.data[DOMAIN][self.entry.entry_id] = {
+            CONF_DEVICE_ID: device_id,
+            CONF_TOPIC_PREFIX: DEFAULT_TOPIC_PREFIX,
+            CONF_TIME_ZONE_ELECTRICITY: TIME_ZONE,
+            CONF_TIME_ZONE_GAS: TIME_ZONE,
+            CONF_HEARTBEAT_INTERVAL: 0,
+            CONF_POWER_INTERVAL: 0,
+            CONF_COUNTER_INTERVAL: 0,
+            CONF_COALESCE_WINDOW: 0,
+            CONF_DEBUG_SENSORS: False,
+            CONF_ALLOWED_DEVICES: None,
+            CONF_DENIED_DEVICES: None,
+            CONF_STALE_TIMEOUT: 0,
+            CONF_STALE_ACTION: DEFAULT_STALE_ACTION,
+            CONF_STATISTICS_IMPORT: False,
+            CONF_SENSORS: None,
+            CONF_ELECTRICITY_MAX_POWER: DEFAULT_ELECTRICITY_MAX_POWER,
+            CONF_GAS_MAX_POWER: DEFAULT_GAS_MAX_POWER,
+            **options,
+        }
+
+        self._exit_stack = ExitStack()
+
+    def __enter__(self) -> Pipeline:
+        """Stub out what the platform needs from a running Home Assistant."""
+        pipeline = self
+
+        def count_write(entity, *args, **kwargs) -> None:
+            pipeline.state_writes += 1
+            if pipeline.on_write is not None:
+                pipeline.on_write(entity)
+
+        self._exit_stack.enter_context(
+            patched(
+                [
+                    (hub, "mqtt", self.mqtt),
+                    (sensor.HildebrandGlowMqttSensor, "async_schedule_update_ha_state", count_write),
+                    (sensor.HildebrandGlowMqttSensor, "async_write_ha_state", count_write),
+                    # There is no entity registry, so every group is created on first contact.
+                    (sensor, "async_get_registered_groups", lambda hass, config_entry: []),
+                    (
+                        sensor,
+                        "async_remove_unselected_entities",
+                        lambda hass, config_entry, sensor_groups: None,
+                    ),
+                    (sensor, "Store", MemoryStore),
+                    (sensor, "async_track_time_interval", lambda hass, action, interval: lambda: None),
+                ]
+            )
+        )
+        self._exit_stack.callback(self.entry.unload)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Unload the entry and remove the stubs."""
+        self._exit_stack.close()
+
+    def add_entities(self, entities, update_before_add=False) -> None:
+        """Stand in for async_add_entities."""
+        for entity in entities:
+            entity.hass = self.hass
+            self.entities.append(entity)
+
+    async def async_setup(self) -> None:
+        """Set up the sensor platform."""
+        await sensor.async_setup_entry(self.hass, self.entry, self.add_entities)
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        """Publish a message through the MQTT stand-in."""
+        self.mqtt.publish(topic, payload)
+
+    async def async_publish(self, topic: str, payload: bytes) -> None:
+        """Publish a message and let it through the ingest queue and write flush."""
+        self.mqtt.publish(topic, payload)
+        # One loop iteration drains the ingest queue, the next flushes the writes.
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+
+def device_ids(count: int) -> list[str]:
+    """Return count synthetic device ids."""
+    return [f"{index:012X}" for index in range(1, count + 1)]
+
+
+def synthetic_messages(device_id: str, step: int, start: datetime | None = None) -> list[tuple[str, bytes]]:
+    """Return the messages one device publishes at a 10 second step.
+
+    Electricity is published every step, gas every sixth step and STATE
+    every thirtieth, roughly matching a real IHD.
+    """
+    timestamp = (start or datetime(2024, 3, 31, tzinfo=UTC)) + timedelta(seconds=10 * step)
+    iso = timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+    power = 0.2 + (step * 37 % 300) / 100
+    cumulative = 6613.405 + step * 0.003
+    messages = [
+        (
+            f"{DEFAULT_TOPIC_PREFIX}/{device_id}/SENSOR/{KIND_ELECTRICITY}",
+            {
+                "electricitymeter": {
+                    "timestamp": iso,
+                    "energy": {
+                        "export": {"cumulative": 0.0, "units": "kWh"},
+                        "import": {
+                            "cumulative": round(cumulative, 3),
+                            "day": round(step * 0.003 % 30, 3),
+                            "week": round(step * 0.003 % 150, 3),
+                            "month": round(step * 0.003 % 600, 3),
+                            "units": "kWh",
+                            "mpan": "1234",
+                            "supplier": "ABC ENERGY",
+                            "price": {"unitrate": 0.24998, "standingcharge": 0.54030},
+                        },
+                    },
+                    "power": {"value": round(power, 3), "units": "kW"},
+                }
+            },
+        )
+    ]
+    if step % 6 == 0:
+        messages.append(
+            (
+                f"{DEFAULT_TOPIC_PREFIX}/{device_id}/SENSOR/{KIND_GAS}",
+                {
+                    "gasmeter": {
+                        "timestamp": iso,
+                        "energy": {
+                            "export": {"cumulative": 0.0, "units": "kWh"},
+                            "import": {
+                                "cumulative": round(17940.852 + step * 0.01, 3),
+                                "day": round(step * 0.01 % 60, 3),
+                                "week": round(step * 0.01 % 300, 3),
+                                "month": round(step * 0.01 % 1200, 3),
+                                "cumulativevol": round(1612.4 + step * 0.001, 3),
+                                "dayvol": round(step * 0.001 % 6, 3),
+                                "weekvol": round(step * 0.001 % 30, 3),
+                                "monthvol": round(step * 0.001 % 120, 3),
+                                "units": "kWh",
+                                "mprn": "1234",
+                                "supplier": "---",
+                                "price": {"unitrate": 0.0732, "standingcharge": 0.1785},
+                            },
+                        },
+                        "power": {"value": 0.0, "units": "kW"},
+                    }
+                },
+            )
+        )
+    if step % 30 == 0:
+        messages.append(
+            (
+                f"{DEFAULT_TOPIC_PREFIX}/{device_id}/{KIND_STATE}",
+                {
+                    "software": "v1.8.12",
+                    "timestamp": iso,
+                    "hardware": "GLOW-IHD-01-1v4-SMETS2",
+                    "ethmac": device_id,
+                    "smetsversion": "SMETS2",
+                    "eui": "12:34:56:78:91:23:45",
+                    "zigbee": "1.2.5",
+                    "han": {"rssi": -75 + step % 5, "status": "joined", "lqi": 100},
+                },
+            )
+        )
+    return [(topic, json.dumps(payload).encode()) for topic, payload in messages]
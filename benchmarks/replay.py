@@ -0,0 +1,96 @@
+"""Replay a Glow MQTT capture through the sensor pipeline offline.
+
+Messages are fed through the same MQTT callback a live broker would hit,
+using the local MQTT stand-in from ``harness``, and every state write is
+dumped as one JSON line of the resulting timeline::
+
+    python benchmarks/replay.py glow.ndjson.gz                 # as fast as possible
+    python benchmarks/replay.py glow.ndjson.gz --speed 1       # real time
+    python benchmarks/replay.py glow.ndjson.gz --speed 60 --output timeline.ndjson
+
+The capture is streamed from disk, so multi-day captures replay in constant
+memory. The integration's clocks follow the capture's receive times, so
+throttling, heartbeats, latency and the time of messages without a
+timestamp come out as they did when it was recorded, on every run.
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from capture import read_capture
+from harness import Pipeline, controlled_clock
+
+
+async def replay(path: str, speed: float, output, device_id: str) -> int:
+    """Replay a capture and return the number of messages fed."""
+    clock = {"now": 0.0}
+    # The integration's clocks run on the capture time.
+    with controlled_clock(clock), Pipeline(device_id) as pipeline:
+        return await _replay(pipeline, path, speed, output, clock)
+
+
+async def _replay(
+    pipeline: Pipeline, path: str, speed: float, output, clock: dict[str, float]
+) -> int:
+    """Replay a capture through pipeline on clock and return the number of messages fed."""
+
+    def write_timeline(entity) -> None:
+        last_reset = getattr(entity, "_attr_last_reset", None)
+        output.write(
+            json.dumps(
+                {
+                    "t": clock["now"],
+                    "entity": entity.unique_id,
+                    "state": entity.native_value,
+                    "last_reset": last_reset.isoformat() if last_reset else None,
+                },
+                default=str,
+            )
+        )
+        output.write("\n")
+
+    pipeline.on_write = write_timeline
+    await pipeline.async_setup()
+
+    count = 0
+    first_received = None
+    started = time.monotonic()
+    for record in read_capture(path):
+        if first_received is None:
+            first_received = record.received
+        if speed > 0:
+            delay = (record.received - first_received) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        clock["now"] = record.received
+        await pipeline.async_publish(record.topic, record.payload)
+        count += 1
+    return count
+
+
+def main() -> None:
+    """Replay a capture."""
+    parser = argparse.ArgumentParser(description="Replay a Glow MQTT capture offline.")
+    parser.add_argument("capture")
+    parser.add_argument(
+        "--speed", type=float, default=0, help="1 for real time, N for N times faster, 0 for as fast as possible"
+    )
+    parser.add_argument("--device-id", default="+")
+    parser.add_argument("--output", help="timeline file, defaults to stdout")
+    args = parser.parse_args()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        count = asyncio.run(replay(args.capture, args.speed, output, args.device_id))
+    finally:
+        if args.output:
+            output.close()
+    print(f"Replayed {count} messages", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,23 +2,92 @@
 import logging
 
 from awesomeversion.awesomeversion import AwesomeVersion
+import voluptuous as vol
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import __version__ as HA_VERSION, CONF_DEVICE_ID  # noqa: N812
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
 
 from .const import (
+    ATTR_DATE,
+    ATTR_ENABLED,
+    ATTR_METER,
+    CONF_ALLOWED_DEVICES,
+    CONF_COALESCE_WINDOW,
+    CONF_COUNTER_INTERVAL,
+    CONF_DEBUG_SENSORS,
+    CONF_DENIED_DEVICES,
+    CONF_ELECTRICITY_MAX_POWER,
+    CONF_GAS_MAX_POWER,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_POWER_INTERVAL,
+    CONF_SENSORS,
+    CONF_STALE_ACTION,
+    CONF_STALE_TIMEOUT,
+    CONF_STATISTICS_IMPORT,
     CONF_TIME_ZONE_ELECTRICITY,
     CONF_TIME_ZONE_GAS,
     CONF_TOPIC_PREFIX,
+    DATA_HUB,
+    DATA_RECONFIGURE,
+    DATA_ROUTER,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_COUNTER_INTERVAL,
+    DEFAULT_DEBUG_SENSORS,
+    DEFAULT_ELECTRICITY_MAX_POWER,
+    DEFAULT_GAS_MAX_POWER,
+    DEFAULT_HEARTBEAT_INTERVAL,
+    DEFAULT_POWER_INTERVAL,
+    DEFAULT_STALE_ACTION,
+    DEFAULT_STALE_TIMEOUT,
+    DEFAULT_STATISTICS_IMPORT,
     DEFAULT_TOPIC_PREFIX,
     DOMAIN,
+    KIND_ELECTRICITY,
+    KIND_GAS,
+    METER_ELECTRICITY,
+    METER_GAS,
     MIN_HA_VERSION,
+    SERVICE_GET_CONSUMPTION,
+    SERVICE_SET_TIMING,
 )
+from .hub import GlowMqttHub
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["sensor"]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+SET_TIMING_SCHEMA = vol.Schema({vol.Required(ATTR_ENABLED): cv.boolean})
+
+# Options applied to the running entry without reloading it.
+LIVE_OPTIONS = {
+    CONF_ALLOWED_DEVICES,
+    CONF_DENIED_DEVICES,
+    CONF_DEVICE_ID,
+    CONF_TIME_ZONE_ELECTRICITY,
+    CONF_TIME_ZONE_GAS,
+    CONF_TOPIC_PREFIX,
+}
+
+METER_KINDS = {METER_ELECTRICITY: KIND_ELECTRICITY, METER_GAS: KIND_GAS}
+
+GET_CONSUMPTION_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_DEVICE_ID): cv.string,
+        vol.Required(ATTR_METER): vol.In(METER_KINDS),
+        vol.Optional(ATTR_DATE): cv.date,
+    }
+)
+
+def normalize_device_id(device_id: str) -> str:
+    """Return a device id in the form used in the Glow topics."""
+    return device_id.strip().upper().replace(":", "").replace(" ", "")
+
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the Hildebrand Glow IHD MQTT integration."""
 
@@ -34,21 +103,123 @@ async def async_setup(hass: HomeAssistant, config: dict):
     if DOMAIN not in hass.data:
         hass.data[DOMAIN] = {}
 
+    if DATA_HUB not in hass.data[DOMAIN]:
+        hass.data[DOMAIN][DATA_HUB] = GlowMqttHub(hass)
+
+    async def async_set_timing(call: ServiceCall) -> None:
+        """Switch the dispatch path timers on or off."""
+        hass.data[DOMAIN][DATA_HUB].stats.timing_enabled = call.data[ATTR_ENABLED]
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_TIMING, async_set_timing, schema=SET_TIMING_SCHEMA
+    )
+
+    async def async_get_consumption(call: ServiceCall) -> ServiceResponse:
+        """Return a day's half-hourly and hourly consumption of a meter."""
+        device_id = normalize_device_id(call.data[CONF_DEVICE_ID])
+        kind = METER_KINDS[call.data[ATTR_METER]]
+        buckets = next(
+            (
+                update_group.consumption_buckets
+                for entry_data in hass.data[DOMAIN].values()
+                if isinstance(entry_data, dict) and DATA_ROUTER in entry_data
+                if (update_group := entry_data[DATA_ROUTER].get(device_id, kind)) is not None
+                # An entry may have the meter without its consumption sensors selected.
+                if update_group.consumption_buckets is not None
+            ),
+            None,
+        )
+        if buckets is None:
+            raise ServiceValidationError(
+                f"No {call.data[ATTR_METER]} meter readings from {device_id}"
+            )
+        day = call.data.get(ATTR_DATE) or dt_util.now(buckets.time_zone).date()
+        return {
+            CONF_DEVICE_ID: device_id,
+            ATTR_METER: call.data[ATTR_METER],
+            ATTR_DATE: day.isoformat(),
+            "half_hours": [
+                {"start": start.isoformat(), "consumption": consumption}
+                for start, consumption in buckets.half_hours(day)
+            ],
+            "hours": [
+                {"start": start.isoformat(), "consumption": consumption}
+                for start, consumption in buckets.hours(day)
+            ],
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_CONSUMPTION,
+        async_get_consumption,
+        schema=GET_CONSUMPTION_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
     return True
 
+def entry_settings(entry: ConfigEntry) -> dict:
+    """Return an entry's settings, its options taking precedence over its data."""
+    settings = {
+        CONF_DEVICE_ID: normalize_device_id(
+            entry.options.get(CONF_DEVICE_ID, entry.data[CONF_DEVICE_ID])
+        ),
+        CONF_TOPIC_PREFIX: entry.options.get(
+            CONF_TOPIC_PREFIX, entry.data.get(CONF_TOPIC_PREFIX, DEFAULT_TOPIC_PREFIX)
+        ).strip().replace("#", "").replace(" ", ""),
+    }
+    for option, default in (
+        (CONF_TIME_ZONE_ELECTRICITY, None),
+        (CONF_TIME_ZONE_GAS, None),
+        (CONF_HEARTBEAT_INTERVAL, DEFAULT_HEARTBEAT_INTERVAL),
+        (CONF_POWER_INTERVAL, DEFAULT_POWER_INTERVAL),
+        (CONF_COUNTER_INTERVAL, DEFAULT_COUNTER_INTERVAL),
+        (CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW),
+        (CONF_DEBUG_SENSORS, DEFAULT_DEBUG_SENSORS),
+        (CONF_STALE_TIMEOUT, DEFAULT_STALE_TIMEOUT),
+        (CONF_STALE_ACTION, DEFAULT_STALE_ACTION),
+        (CONF_STATISTICS_IMPORT, DEFAULT_STATISTICS_IMPORT),
+        (CONF_ELECTRICITY_MAX_POWER, DEFAULT_ELECTRICITY_MAX_POWER),
+        (CONF_GAS_MAX_POWER, DEFAULT_GAS_MAX_POWER),
+    ):
+        settings[option] = entry.options.get(option, entry.data.get(option, default))
+    for option in (CONF_ALLOWED_DEVICES, CONF_DENIED_DEVICES):
+        device_ids = entry.options.get(option, entry.data.get(option, ""))
+        settings[option] = {
+            normalize_device_id(device_id) for device_id in device_ids.split(",") if device_id.strip()
+        } or None
+    # Entries from before the sensor selection keep every sensor.
+    sensors = entry.options.get(CONF_SENSORS, entry.data.get(CONF_SENSORS))
+    settings[CONF_SENSORS] = None if sensors is None else frozenset(sensors)
+    return settings
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     _LOGGER.debug("Setting up Hildebrand Glow IHD MQTT integration")
 
-    if entry.entry_id not in hass.data[DOMAIN]:
-        hass.data[DOMAIN][entry.entry_id] = {}
-
-    hass.data[DOMAIN][entry.entry_id][CONF_DEVICE_ID] = entry.data[CONF_DEVICE_ID].strip().upper().replace(":", "").replace(" ", "")
-    hass.data[DOMAIN][entry.entry_id][CONF_TOPIC_PREFIX] = entry.data.get(CONF_TOPIC_PREFIX, DEFAULT_TOPIC_PREFIX).strip().replace("#", "").replace(" ", "")
-    hass.data[DOMAIN][entry.entry_id][CONF_TIME_ZONE_ELECTRICITY] = entry.data.get(CONF_TIME_ZONE_ELECTRICITY)
-    hass.data[DOMAIN][entry.entry_id][CONF_TIME_ZONE_GAS] = entry.data.get(CONF_TIME_ZONE_GAS)
+    hass.data[DOMAIN][entry.entry_id] = entry_settings(entry)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     _LOGGER.debug("Finished setting up Hildebrand Glow IHD MQTT integration")
     return True
 
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options, live where possible and by reloading otherwise."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    settings = entry_settings(entry)
+    if any(
+        entry_data[option] != value
+        for option, value in settings.items()
+        if option not in LIVE_OPTIONS
+    ):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    entry_data.update(settings)
+    await entry_data[DATA_RECONFIGURE]()
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Unload a config entry."""
+    if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        hass.data[DOMAIN].pop(entry.entry_id)
+    return unload_ok
@@ -0,0 +1,165 @@
+"""Half-hourly consumption derived from cumulative meter readings."""
+
+from __future__ import annotations
+from array import array
+from datetime import date, datetime, time, timedelta, tzinfo
+from math import isnan, nan
+from typing import Any
+
+HALF_HOUR = 1800
+
+
+class ConsumptionBuckets:
+    """Consumption of one meter per half hour of the meter's local day.
+
+    Each local day is an array of its half hours, 46 or 50 on the days the
+    clocks change. The difference between two successive cumulative
+    readings is shared between the half hours they span, pro rata to time.
+    Half hours without readings hold NaN. Only the last retention_days days
+    are kept.
+    """
+
+    __slots__ = (
+        "_day",
+        "_day_end",
+        "_day_start",
+        "_days",
+        "_last_time",
+        "_last_value",
+        "_retention",
+        "time_zone",
+    )
+
+    def __init__(self, time_zone: tzinfo, retention_days: int = 7) -> None:
+        """Initialize the buckets of a meter in time_zone."""
+        self.time_zone = time_zone
+        self._retention = retention_days
+        self._days: dict[date, array] = {}
+        self._last_time: float | None = None
+        self._last_value: float | None = None
+        self._day: date | None = None
+        self._day_start = 0.0
+        self._day_end = 0.0
+
+    def set_time_zone(self, time_zone: tzinfo) -> None:
+        """Move the meter to time_zone; the days already kept are not rebucketed."""
+        self.time_zone = time_zone
+        self._day = None
+        self._day_start = self._day_end = 0.0
+
+    def add(self, timestamp: float, cumulative: float) -> None:
+        """Add a cumulative reading taken at timestamp."""
+        last_time, last_value = self._last_time, self._last_value
+        if last_time is not None and timestamp < last_time:
+            return
+        self._last_time = timestamp
+        self._last_value = cumulative
+        if last_value is None or cumulative < last_value:
+            return
+        delta = cumulative - last_value
+        if timestamp == last_time:
+            self._add_to_slot(self._slot(timestamp)[0], delta)
+            return
+        elapsed = timestamp - last_time
+        if elapsed > self._retention * 86400:
+            return
+        start = last_time
+        while start < timestamp:
+            index, slot_end = self._slot(start)
+            slot_end = min(slot_end, timestamp)
+            self._add_to_slot(index, delta * (slot_end - start) / elapsed)
+            start = slot_end
+
+    def _slot(self, timestamp: float) -> tuple[int, float]:
+        """Select the day holding timestamp and return its half hour and when it ends."""
+        if not self._day_start <= timestamp < self._day_end:
+            self._select_day(timestamp)
+        index = int((timestamp - self._day_start) // HALF_HOUR)
+        return index, min(self._day_start + (index + 1) * HALF_HOUR, self._day_end)
+
+    def _add_to_slot(self, index: int, amount: float) -> None:
+        """Add amount to a half hour of the selected day."""
+        slots = self._days.get(self._day)
+        if slots is None:
+            slots = self._days[self._day] = array("d", [nan]) * round(
+                (self._day_end - self._day_start) / HALF_HOUR
+            )
+            self._prune()
+        slots[index] = amount if isnan(slots[index]) else slots[index] + amount
+
+    def _select_day(self, timestamp: float) -> None:
+        """Make the local day holding timestamp the current one."""
+        day = datetime.fromtimestamp(timestamp, self.time_zone).date()
+        self._day = day
+        self._day_start = datetime.combine(day, time.min, self.time_zone).timestamp()
+        self._day_end = datetime.combine(
+            day + timedelta(days=1), time.min, self.time_zone
+        ).timestamp()
+
+    def _prune(self) -> None:
+        """Drop the days older than the retention."""
+        newest = max(self._days)
+        for day in [day for day in self._days if (newest - day).days >= self._retention]:
+            del self._days[day]
+
+    def current(self, timestamp: float) -> tuple[float | None, float | None]:
+        """Return the consumption of the half hour and of the hour holding timestamp."""
+        index, _ = self._slot(timestamp)
+        slots = self._days.get(self._day)
+        if slots is None:
+            return None, None
+        first = index - index % 2
+        return _value(slots[index]), _sum(slots[first : first + 2])
+
+    def half_hours(self, day: date) -> list[tuple[datetime, float | None]]:
+        """Return the start and consumption of each half hour of a local day."""
+        slots = self._days.get(day)
+        day_start = datetime.combine(day, time.min, self.time_zone).timestamp()
+        day_end = datetime.combine(day + timedelta(days=1), time.min, self.time_zone).timestamp()
+        count = round((day_end - day_start) / HALF_HOUR)
+        return [
+            (
+                datetime.fromtimestamp(day_start + index * HALF_HOUR, self.time_zone),
+                _value(slots[index]) if slots is not None else None,
+            )
+            for index in range(count)
+        ]
+
+    def hours(self, day: date) -> list[tuple[datetime, float | None]]:
+        """Return the start and consumption of each hour of a local day."""
+        half_hours = self.half_hours(day)
+        return [
+            (half_hours[index][0], _sum([value for _, value in half_hours[index : index + 2]]))
+            for index in range(0, len(half_hours), 2)
+        ]
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the last reading and the kept days in a JSON friendly form."""
+        return {
+            "last": [self._last_time, self._last_value],
+            "days": {
+                day.isoformat(): [None if isnan(value) else value for value in slots]
+                for day, slots in self._days.items()
+            },
+        }
+
+    def restore(self, snapshot: dict[str, Any]) -> None:
+        """Load a snapshot."""
+        self._last_time, self._last_value = snapshot["last"]
+        for day, values in snapshot["days"].items():
+            self._days[date.fromisoformat(day)] = array(
+                "d", [nan if value is None else value for value in values]
+            )
+        if self._days:
+            self._prune()
+
+
+def _value(value: float) -> float | None:
+    """Return a slot's consumption rounded to Wh, or None without readings."""
+    return None if isnan(value) else round(value, 3)
+
+
+def _sum(values) -> float | None:
+    """Return the sum of the slots with readings, or None if there were none."""
+    known = [value for value in values if value is not None and not isnan(value)]
+    return round(sum(known), 3) if known else None
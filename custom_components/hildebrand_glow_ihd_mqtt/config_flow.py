@@ -11,27 +11,74 @@ from homeassistant.config_entries import (
 from homeassistant.const import CONF_DEVICE_ID
 from homeassistant.core import callback
 from homeassistant.helpers.selector import (
+    SelectOptionDict,
     SelectSelector,
     SelectSelectorConfig,
     SelectSelectorMode,
 )
 
 from .const import (
+    CONF_ALLOWED_DEVICES,
+    CONF_COALESCE_WINDOW,
+    CONF_COUNTER_INTERVAL,
+    CONF_DEBUG_SENSORS,
+    CONF_DENIED_DEVICES,
+    CONF_ELECTRICITY_MAX_POWER,
+    CONF_GAS_MAX_POWER,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_POWER_INTERVAL,
+    CONF_SENSORS,
+    CONF_STALE_ACTION,
+    CONF_STALE_TIMEOUT,
+    CONF_STATISTICS_IMPORT,
     CONF_TIME_ZONE_ELECTRICITY,
     CONF_TIME_ZONE_GAS,
     CONF_TOPIC_PREFIX,
     DEFAULT_DEVICE_ID,
+    DEFAULT_COALESCE_WINDOW,
+    DEFAULT_COUNTER_INTERVAL,
+    DEFAULT_DEBUG_SENSORS,
+    DEFAULT_ELECTRICITY_MAX_POWER,
+    DEFAULT_GAS_MAX_POWER,
+    DEFAULT_HEARTBEAT_INTERVAL,
+    DEFAULT_POWER_INTERVAL,
+    DEFAULT_STALE_ACTION,
+    DEFAULT_STALE_TIMEOUT,
+    DEFAULT_STATISTICS_IMPORT,
     DEFAULT_TOPIC_PREFIX,
     DOMAIN,
+    STALE_ACTION_EVICT,
+    STALE_ACTION_UNAVAILABLE,
 )
+from .descriptions import ALL_SENSORS, DEFAULT_SENSORS, SENSOR_GROUPS
 
 _LOGGER = logging.getLogger(__name__)
 
+def sensors_schema(default: list[str]) -> vol.Schema:
+    """Return the schema of the sensor selection step."""
+    return vol.Schema({
+        vol.Required(CONF_SENSORS, default=default): SelectSelector(
+            SelectSelectorConfig(
+                options=[
+                    SelectOptionDict(value=description.key, label=description.name)
+                    for descriptions in SENSOR_GROUPS.values()
+                    for description in descriptions
+                ],
+                multiple=True,
+                mode=SelectSelectorMode.LIST,
+            )
+        ),
+    })
+
 class HildebrandGlowIHDMQTTConfigFlow(ConfigFlow, domain=DOMAIN):
     VERSION = 1
     MINOR_VERSION = 1
     CONNECTION_CLASS = CONN_CLASS_LOCAL_PUSH
-    
+
+    def __init__(self):
+        """Initialize the flow."""
+        self._data = {}
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
         errors = {}
@@ -45,14 +92,13 @@ class HildebrandGlowIHDMQTTConfigFlow(ConfigFlow, domain=DOMAIN):
             await self.async_set_unique_id('{}_{}'.format(DOMAIN, device_id))
             self._abort_if_unique_id_configured()
 
-            return self.async_create_entry(
-                title="",
-                data={
-                    CONF_DEVICE_ID: device_id,
-                    CONF_TOPIC_PREFIX: topic_prefix,
-                    CONF_TIME_ZONE_ELECTRICITY: time_zone_electricity,
-                    CONF_TIME_ZONE_GAS: time_zone_gas,
-                })
+            self._data = {
+                CONF_DEVICE_ID: device_id,
+                CONF_TOPIC_PREFIX: topic_prefix,
+                CONF_TIME_ZONE_ELECTRICITY: time_zone_electricity,
+                CONF_TIME_ZONE_GAS: time_zone_gas,
+            }
+            return await self.async_step_sensors()
 
         get_timezones: list[str] = list(
             await self.hass.async_add_executor_job(
@@ -76,6 +122,21 @@ class HildebrandGlowIHDMQTTConfigFlow(ConfigFlow, domain=DOMAIN):
             }), errors=errors
         )
 
+    async def async_step_sensors(self, user_input=None):
+        """Choose the sensors to create."""
+        errors = {}
+
+        if user_input is not None:
+            if user_input[CONF_SENSORS]:
+                return self.async_create_entry(
+                    title="", data={**self._data, CONF_SENSORS: user_input[CONF_SENSORS]}
+                )
+            errors["base"] = "no_sensors"
+
+        return self.async_show_form(
+            step_id="sensors", data_schema=sensors_schema(DEFAULT_SENSORS), errors=errors
+        )
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -85,10 +146,15 @@ class HildebrandGlowIHDMQTTConfigFlow(ConfigFlow, domain=DOMAIN):
 class HildebrandGlowIHDMQTTOptionsFlowHandler(OptionsFlow):
     """Handle a option flow for HildebrandGlowIHDMQTT."""
 
+    def __init__(self):
+        """Initialize the options flow."""
+        self._options = {}
+
     async def async_step_init(self, user_input=None):
         """Handle options flow."""
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            self._options = user_input
+            return await self.async_step_sensors()
 
         get_timezones: list[str] = list(
             await self.hass.async_add_executor_job(
@@ -96,17 +162,68 @@ class HildebrandGlowIHDMQTTOptionsFlowHandler(OptionsFlow):
             )
         )
         data_schema=vol.Schema({
-            vol.Required(CONF_DEVICE_ID, default=self.config_entry.options.get(CONF_DEVICE_ID, DEFAULT_DEVICE_ID)):str,
-            vol.Required(CONF_TOPIC_PREFIX, default=self.config_entry.options.get(CONF_TOPIC_PREFIX, DEFAULT_TOPIC_PREFIX)):str,
-            vol.Required(CONF_TIME_ZONE_ELECTRICITY, default=self.config_entry.options.get(CONF_TIME_ZONE_ELECTRICITY, self.hass.config.time_zone)): SelectSelector(
+            vol.Required(CONF_DEVICE_ID, default=self.config_entry.options.get(CONF_DEVICE_ID, self.config_entry.data.get(CONF_DEVICE_ID) or DEFAULT_DEVICE_ID)):str,
+            vol.Required(CONF_TOPIC_PREFIX, default=self.config_entry.options.get(CONF_TOPIC_PREFIX, self.config_entry.data.get(CONF_TOPIC_PREFIX) or DEFAULT_TOPIC_PREFIX)):str,
+            vol.Required(CONF_TIME_ZONE_ELECTRICITY, default=self.config_entry.options.get(CONF_TIME_ZONE_ELECTRICITY, self.config_entry.data.get(CONF_TIME_ZONE_ELECTRICITY) or self.hass.config.time_zone)): SelectSelector(
                 SelectSelectorConfig(
                     options=get_timezones, mode=SelectSelectorMode.DROPDOWN, sort=True
                 )
             ),
-            vol.Required(CONF_TIME_ZONE_GAS, default=self.config_entry.options.get(CONF_TIME_ZONE_GAS, self.hass.config.time_zone)): SelectSelector(
+            vol.Required(CONF_TIME_ZONE_GAS, default=self.config_entry.options.get(CONF_TIME_ZONE_GAS, self.config_entry.data.get(CONF_TIME_ZONE_GAS) or self.hass.config.time_zone)): SelectSelector(
                 SelectSelectorConfig(
                     options=get_timezones, mode=SelectSelectorMode.DROPDOWN, sort=True
                 )
             ),
+            vol.Required(CONF_HEARTBEAT_INTERVAL, default=self.config_entry.options.get(CONF_HEARTBEAT_INTERVAL, DEFAULT_HEARTBEAT_INTERVAL)): vol.All(
+                vol.Coerce(int), vol.Range(min=0)
+            ),
+            vol.Required(CONF_POWER_INTERVAL, default=self.config_entry.options.get(CONF_POWER_INTERVAL, DEFAULT_POWER_INTERVAL)): vol.All(
+                vol.Coerce(int), vol.Range(min=0)
+            ),
+            vol.Required(CONF_COUNTER_INTERVAL, default=self.config_entry.options.get(CONF_COUNTER_INTERVAL, DEFAULT_COUNTER_INTERVAL)): vol.All(
+                vol.Coerce(int), vol.Range(min=0)
+            ),
+            vol.Required(CONF_COALESCE_WINDOW, default=self.config_entry.options.get(CONF_COALESCE_WINDOW, DEFAULT_COALESCE_WINDOW)): vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            ),
+            vol.Required(CONF_DEBUG_SENSORS, default=self.config_entry.options.get(CONF_DEBUG_SENSORS, DEFAULT_DEBUG_SENSORS)): bool,
+            vol.Optional(CONF_ALLOWED_DEVICES, default=self.config_entry.options.get(CONF_ALLOWED_DEVICES, "")): str,
+            vol.Optional(CONF_DENIED_DEVICES, default=self.config_entry.options.get(CONF_DENIED_DEVICES, "")): str,
+            vol.Required(CONF_STATISTICS_IMPORT, default=self.config_entry.options.get(CONF_STATISTICS_IMPORT, DEFAULT_STATISTICS_IMPORT)): bool,
+            vol.Required(CONF_STALE_TIMEOUT, default=self.config_entry.options.get(CONF_STALE_TIMEOUT, DEFAULT_STALE_TIMEOUT)): vol.All(
+                vol.Coerce(int), vol.Range(min=0)
+            ),
+            vol.Required(CONF_STALE_ACTION, default=self.config_entry.options.get(CONF_STALE_ACTION, DEFAULT_STALE_ACTION)): SelectSelector(
+                SelectSelectorConfig(
+                    options=[STALE_ACTION_UNAVAILABLE, STALE_ACTION_EVICT],
+                    mode=SelectSelectorMode.DROPDOWN,
+                    translation_key=CONF_STALE_ACTION,
+                )
+            ),
+            vol.Required(CONF_ELECTRICITY_MAX_POWER, default=self.config_entry.options.get(CONF_ELECTRICITY_MAX_POWER, DEFAULT_ELECTRICITY_MAX_POWER)): vol.All(
+                vol.Coerce(float), vol.Range(min=1)
+            ),
+            vol.Required(CONF_GAS_MAX_POWER, default=self.config_entry.options.get(CONF_GAS_MAX_POWER, DEFAULT_GAS_MAX_POWER)): vol.All(
+                vol.Coerce(float), vol.Range(min=1)
+            ),
         })
         return self.async_show_form(step_id="init", data_schema=data_schema)
+
+    async def async_step_sensors(self, user_input=None):
+        """Choose the sensors to create."""
+        errors = {}
+
+        if user_input is not None:
+            if user_input[CONF_SENSORS]:
+                return self.async_create_entry(
+                    title="", data={**self._options, CONF_SENSORS: user_input[CONF_SENSORS]}
+                )
+            errors["base"] = "no_sensors"
+
+        # Entries from before the sensor selection have every sensor.
+        default = self.config_entry.options.get(
+            CONF_SENSORS, self.config_entry.data.get(CONF_SENSORS, ALL_SENSORS)
+        )
+        return self.async_show_form(
+            step_id="sensors", data_schema=sensors_schema(default), errors=errors
+        )
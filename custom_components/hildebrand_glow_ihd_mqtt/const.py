@@ -15,14 +15,62 @@ ATTR_OPERATING_HOURS = "operating_hours"
 ATTR_LAST_ERROR = "last_error"
 ATTR_ERROR = "error"
 ATTR_STATE = "state"
+ATTR_MIN = "min"
+ATTR_MAX = "max"
+ATTR_ENABLED = "enabled"
+ATTR_METER = "meter"
+ATTR_DATE = "date"
 
+CONF_ALLOWED_DEVICES = "allowed_devices"
+CONF_COALESCE_WINDOW = "coalesce_window"
+CONF_COUNTER_INTERVAL = "counter_interval"
+CONF_DEBUG_SENSORS = "debug_sensors"
+CONF_DENIED_DEVICES = "denied_devices"
+CONF_ELECTRICITY_MAX_POWER = "electricity_max_power"
+CONF_GAS_MAX_POWER = "gas_max_power"
+CONF_HEARTBEAT_INTERVAL = "heartbeat_interval"
+CONF_POWER_INTERVAL = "power_interval"
+CONF_SENSORS = "sensors"
+CONF_STALE_ACTION = "stale_action"
+CONF_STALE_TIMEOUT = "stale_timeout"
+CONF_STATISTICS_IMPORT = "statistics_import"
 CONF_TIME_ZONE_ELECTRICITY = "time_zone_electricity"
 CONF_TIME_ZONE_GAS = "time_zone_gas"
 CONF_TOPIC_PREFIX = "topic_prefix"
 
+DATA_HUB = "hub"
+DATA_ROUTER = "router"
+DATA_RECONFIGURE = "reconfigure"
+
 DEFAULT_DEVICE_ID = "+"
+DEFAULT_COALESCE_WINDOW = 0
+DEFAULT_COUNTER_INTERVAL = 0
+DEFAULT_DEBUG_SENSORS = False
+# The most a home can plausibly draw, in kW: a 100 A supply and a large
+# boiler, with room to spare.
+DEFAULT_ELECTRICITY_MAX_POWER = 30.0
+DEFAULT_GAS_MAX_POWER = 60.0
+DEFAULT_HEARTBEAT_INTERVAL = 0
+DEFAULT_POWER_INTERVAL = 0
+DEFAULT_STALE_TIMEOUT = 0
+DEFAULT_STATISTICS_IMPORT = False
+
+STALE_ACTION_UNAVAILABLE = "unavailable"
+STALE_ACTION_EVICT = "evict"
+DEFAULT_STALE_ACTION = STALE_ACTION_UNAVAILABLE
 DEFAULT_TOPIC_PREFIX= "glow"
 
+SERVICE_GET_CONSUMPTION = "get_consumption"
+SERVICE_SET_TIMING = "set_timing"
+
+METER_ELECTRICITY = "electricity"
+METER_GAS = "gas"
+
+# Message kinds, taken from the topic: <prefix>/<id>/STATE or <prefix>/<id>/SENSOR/<kind>
+KIND_STATE = "STATE"
+KIND_ELECTRICITY = "electricitymeter"
+KIND_GAS = "gasmeter"
+
 # Meter intervals
 class MeterInterval(Enum):
     """Meter intervals."""
@@ -0,0 +1,179 @@
+"""Incremental, tariff-aware energy cost."""
+
+from __future__ import annotations
+from datetime import datetime, tzinfo
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from .const import MeterInterval
+from .periods import get_period_tracker
+
+COST_INTERVALS = (MeterInterval.DAY, MeterInterval.WEEK, MeterInterval.MONTH)
+
+
+class CostEngine:
+    """Today's, this week's and this month's cost of one meter.
+
+    Each reading's energy delta is priced at the unit rate of the previous
+    reading, the rate in force while that energy was used, so a rate change
+    during the day only applies from then on. When a reading starts a new
+    period, only the part of the delta the meter's own usage counter puts
+    in that period is counted, or, without the counter, the part of the
+    delta in proportion to the time since the period began. The standing
+    charge is added for each of the meter's local days as it rolls over,
+    including days skipped by a gap in the readings. Before the first
+    delta the totals are estimated from the meter's own day, week and month
+    usage at the current rate.
+    """
+
+    __slots__ = (
+        "_last_cumulative",
+        "_last_time",
+        "_last_unit_rate",
+        "_standing_days_due",
+        "_starts",
+        "_time_zone",
+        "_trackers",
+        "totals",
+    )
+
+    def __init__(self, time_zone: tzinfo) -> None:
+        """Initialize the engine of a meter in time_zone."""
+        self._time_zone = time_zone
+        self._trackers = {
+            interval: get_period_tracker(time_zone, interval) for interval in COST_INTERVALS
+        }
+        self._starts: dict[MeterInterval, datetime | None] = dict.fromkeys(COST_INTERVALS)
+        self.totals: dict[MeterInterval, float | None] = dict.fromkeys(COST_INTERVALS)
+        self._last_time: datetime | None = None
+        self._last_cumulative: float | None = None
+        self._last_unit_rate: float | None = None
+        # Days whose standing charge is owed, added once it is known.
+        self._standing_days_due = 0
+
+    def set_time_zone(self, time_zone: tzinfo) -> None:
+        """Move the meter to time_zone, keeping the totals of the current periods."""
+        self._time_zone = time_zone
+        self._trackers = {
+            interval: get_period_tracker(time_zone, interval) for interval in COST_INTERVALS
+        }
+        if self._last_time is not None and self._starts[MeterInterval.DAY] is not None:
+            self._starts = {
+                interval: tracker.period_start(self._last_time)
+                for interval, tracker in self._trackers.items()
+            }
+
+    def add(
+        self,
+        message_datetime: datetime,
+        cumulative: float | None,
+        unit_rate: float | None,
+        standing_charge: float | None,
+        usage: dict[MeterInterval, float | None],
+    ) -> None:
+        """Add a reading; usage is the meter's own usage so far in each interval."""
+        if self._last_time is not None and message_datetime < self._last_time:
+            return
+        last_time, self._last_time = self._last_time, message_datetime
+        starts = {
+            interval: tracker.period_start(message_datetime)
+            for interval, tracker in self._trackers.items()
+        }
+        if self._starts[MeterInterval.DAY] is None:
+            self._estimate(message_datetime, starts, unit_rate, standing_charge, usage)
+        else:
+            delta = 0.0
+            if (
+                cumulative is not None
+                and self._last_cumulative is not None
+                and cumulative >= self._last_cumulative
+            ):
+                delta = cumulative - self._last_cumulative
+            rate = self._last_unit_rate if self._last_unit_rate is not None else unit_rate
+            for interval in COST_INTERVALS:
+                if starts[interval] == self._starts[interval]:
+                    self.totals[interval] += delta * (rate or 0)
+                    continue
+                # Only the energy used since the period began belongs to it.
+                if usage.get(interval) is not None:
+                    period_delta = min(delta, usage[interval])
+                else:
+                    gap = (message_datetime - last_time).total_seconds()
+                    since_start = (message_datetime - starts[interval]).total_seconds()
+                    period_delta = delta * min(1.0, since_start / gap) if gap > 0 else 0.0
+                self.totals[interval] = period_delta * (rate or 0)
+            self._standing_days_due += self._days_between(
+                self._starts[MeterInterval.DAY], starts[MeterInterval.DAY]
+            )
+            if self._standing_days_due and standing_charge is not None:
+                self._add_standing_charge(message_datetime, starts, standing_charge)
+        self._starts = starts
+        if cumulative is not None:
+            self._last_cumulative = cumulative
+        if unit_rate is not None:
+            self._last_unit_rate = unit_rate
+
+    def _estimate(
+        self,
+        message_datetime: datetime,
+        starts: dict[MeterInterval, datetime],
+        unit_rate: float | None,
+        standing_charge: float | None,
+        usage: dict[MeterInterval, float | None],
+    ) -> None:
+        """Estimate the totals so far from the meter's usage counters."""
+        for interval in COST_INTERVALS:
+            self.totals[interval] = (usage.get(interval) or 0) * (unit_rate or 0)
+        # Every day of the month so far is owed; each period takes its own days.
+        self._standing_days_due = (
+            self._days_between(starts[MeterInterval.MONTH], starts[MeterInterval.DAY]) + 1
+        )
+        if standing_charge is not None:
+            self._add_standing_charge(message_datetime, starts, standing_charge)
+
+    def _days_between(self, start: datetime, end: datetime) -> int:
+        """Return the number of the meter's local days from start to end."""
+        return (
+            end.astimezone(self._time_zone).date() - start.astimezone(self._time_zone).date()
+        ).days
+
+    def _add_standing_charge(
+        self,
+        message_datetime: datetime,
+        starts: dict[MeterInterval, datetime],
+        standing_charge: float,
+    ) -> None:
+        """Add the owed days' standing charge to each period, up to the days it has had."""
+        for interval in COST_INTERVALS:
+            days = self._days_between(starts[interval], message_datetime) + 1
+            self.totals[interval] += standing_charge * min(self._standing_days_due, days)
+        self._standing_days_due = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the totals and the last reading in a JSON friendly form."""
+        return {
+            "last_time": self._last_time.isoformat() if self._last_time else None,
+            "last_cumulative": self._last_cumulative,
+            "last_unit_rate": self._last_unit_rate,
+            "standing_days_due": self._standing_days_due,
+            "starts": {
+                interval.value: start.isoformat() if start else None
+                for interval, start in self._starts.items()
+            },
+            "totals": {interval.value: total for interval, total in self.totals.items()},
+        }
+
+    def restore(self, snapshot: dict[str, Any]) -> None:
+        """Load a snapshot."""
+        self._last_time = dt_util.parse_datetime(snapshot["last_time"] or "")
+        self._last_cumulative = snapshot["last_cumulative"]
+        self._last_unit_rate = snapshot["last_unit_rate"]
+        # Snapshots from before gaps were charged only flag one day as due.
+        self._standing_days_due = int(
+            snapshot.get("standing_days_due", snapshot.get("standing_charge_due", 0))
+        )
+        for interval in COST_INTERVALS:
+            start = snapshot["starts"][interval.value]
+            self._starts[interval] = dt_util.parse_datetime(start) if start else None
+            self.totals[interval] = snapshot["totals"][interval.value]
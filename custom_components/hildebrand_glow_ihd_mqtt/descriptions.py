@@ -0,0 +1,510 @@
+"""Descriptions of the Glow sensors, shared by every device.
+
+Kept apart from the sensor platform so the config flow can list the
+sensors without importing the platform and the recorder.
+"""
+
+from __future__ import annotations
+from collections.abc import Collection
+from dataclasses import dataclass, replace
+from typing import Iterable
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    SIGNAL_STRENGTH_DECIBELS,
+    UnitOfEnergy,
+    UnitOfPower,
+    UnitOfVolume,
+)
+from homeassistant.helpers.entity import EntityCategory
+
+from .const import (
+    DEFAULT_ELECTRICITY_MAX_POWER,
+    DEFAULT_GAS_MAX_POWER,
+    KIND_ELECTRICITY,
+    KIND_GAS,
+    KIND_STATE,
+    MeterInterval,
+)
+from .hourly import STATISTIC_MEAN, STATISTIC_SUM
+from .quality import CounterRules
+from .rolling import STAT_MEAN, STAT_PEAK_TIME, STATS
+
+ROLLING_POWER_WINDOWS = (1, 5, 15, 60)
+BUCKET_HALF_HOUR = "half_hour"
+BUCKET_HOUR = "hour"
+
+# The gas flow of the default gas power limit, in m³/h.
+GAS_MAX_FLOW = 6.0
+
+# glow/XXXXXXYYYYYY/STATE                   {"software":"v1.8.12","timestamp":"2022-06-11T20:54:53Z","hardware":"GLOW-IHD-01-1v4-SMETS2","ethmac":"1234567890AB","smetsversion":"SMETS2","eui":"12:34:56:78:91:23:45","zigbee":"1.2.5","han":{"rssi":-75,"status":"joined","lqi":100}}
+# glow/XXXXXXYYYYYY/SENSOR/electricitymeter {"electricitymeter":{"timestamp":"2022-06-11T20:38:00Z","energy":{"export":{"cumulative":0.000,"units":"kWh"},"import":{"cumulative":6613.405,"day":13.252,"week":141.710,"month":293.598,"units":"kWh","mpan":"1234","supplier":"ABC ENERGY","price":{"unitrate":0.04998,"standingcharge":0.24030}}},"power":{"value":0.951,"units":"kW"}}}
+# glow/XXXXXXYYYYYY/SENSOR/gasmeter         {"gasmeter":{"timestamp":"2022-06-11T20:53:52Z","energy":{"export":{"cumulative":0.000,"units":"kWh"},"import":{"cumulative":17940.852,"day":11.128,"week":104.749,"month":217.122,"units":"kWh","mprn":"1234","supplier":"---","price":{"unitrate":0.07320,"standingcharge":0.17850}}},"power":{"value":0.000,"units":"kW"}}}
+
+
+@dataclass(frozen=True, slots=True)
+class CostSources:
+    """The keys of the sensors a meter's cost is worked out from."""
+
+    cumulative: str
+    unit_rate: str
+    standing_charge: str
+    # The meter's own usage counter of each interval.
+    usage: tuple[tuple[MeterInterval, str], ...]
+
+
+@dataclass(frozen=True, kw_only=True)
+class GlowSensorEntityDescription(SensorEntityDescription):
+    """Describes a Glow sensor; one description is shared by every device.
+
+    A sensor is either read from the payload at path, or derived from other
+    sensors of its group: the rolling window statistic (source, minutes,
+    statistic), the consumption bucket (source, period) or the cost
+    (interval, sources). Readings of a sensor with counter_rules that
+    break them are dropped before anything else sees them.
+    """
+
+    path: tuple[str, ...] | None = None
+    ignore_zero_values: bool = False
+    error_response_values: tuple[float, ...] = ()
+    meter_interval: MeterInterval | None = None
+    time_weighted: bool = False
+    rolling: tuple[str, int, str] | None = None
+    buckets: tuple[str, str] | None = None
+    cost: tuple[MeterInterval, CostSources] | None = None
+    statistic: str | None = None
+    counter_rules: CounterRules | None = None
+
+    @property
+    def sources(self) -> set[str]:
+        """Return the keys of the sensors of the group this sensor is worked out from."""
+        sources = set()
+        if self.rolling is not None:
+            sources.add(self.rolling[0])
+        if self.buckets is not None:
+            sources.add(self.buckets[0])
+        if self.cost is not None:
+            cost_sources = self.cost[1]
+            sources.update(
+                (cost_sources.cumulative, cost_sources.unit_rate, cost_sources.standing_charge)
+            )
+            sources.update(key for _, key in cost_sources.usage)
+        if self.counter_rules is not None and self.counter_rules.power is not None:
+            sources.add(self.counter_rules.power)
+        return sources
+
+
+def cost_sensors(
+    key_prefix: str, prefix: str, sources: CostSources
+) -> list[GlowSensorEntityDescription]:
+    """Return the today, this week and this month cost sensors of a meter.
+
+    sources are the keys of the sensors the cost is worked out from: the
+    cumulative reading, unit rate, standing charge and, by interval, the
+    meter's own usage counters.
+    """
+    periods = {
+        MeterInterval.DAY: ("today", "Today"),
+        MeterInterval.WEEK: ("week", "This week"),
+        MeterInterval.MONTH: ("month", "This month"),
+    }
+    return [
+        GlowSensorEntityDescription(
+            key=f"{key_prefix}_cost_{period}",
+            name=f"{prefix} ({label})",
+            device_class=SensorDeviceClass.MONETARY,
+            native_unit_of_measurement="GBP",
+            state_class=SensorStateClass.TOTAL,
+            icon="mdi:cash",
+            meter_interval=interval,
+            cost=(interval, sources),
+            statistic=STATISTIC_SUM if interval == MeterInterval.DAY else None,
+        )
+        for interval, (period, label) in periods.items()
+    ]
+
+
+def rolling_power_sensors(source: str, prefix: str, icon: str) -> list[GlowSensorEntityDescription]:
+    """Return the rolling average, min, max and peak time sensors of a power sensor.
+
+    Only the averages are enabled by default.
+    """
+    labels = {"mean": "average", "min": "minimum", "max": "maximum", "peak_time": "peak time"}
+    return [
+        GlowSensorEntityDescription(
+            key=f"{source}_{stat}_{minutes}m",
+            name=f"{prefix} ({minutes} min {labels[stat]})",
+            device_class=SensorDeviceClass.TIMESTAMP if stat == STAT_PEAK_TIME else SensorDeviceClass.POWER,
+            native_unit_of_measurement=None if stat == STAT_PEAK_TIME else UnitOfPower.KILO_WATT,
+            state_class=None if stat == STAT_PEAK_TIME else SensorStateClass.MEASUREMENT,
+            icon=icon,
+            rolling=(source, minutes, stat),
+            entity_registry_enabled_default=stat == STAT_MEAN,
+        )
+        for minutes in ROLLING_POWER_WINDOWS
+        for stat in STATS
+    ]
+
+
+def consumption_bucket_sensors(
+    source: str, prefix: str, icon: str
+) -> list[GlowSensorEntityDescription]:
+    """Return the half-hourly and hourly consumption sensors of a cumulative sensor."""
+    return [
+        GlowSensorEntityDescription(
+            key=f"{source}_{period}",
+            name=f"{prefix} (This {period.replace('_', ' ')})",
+            device_class=SensorDeviceClass.ENERGY,
+            native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            icon=icon,
+            buckets=(source, period),
+        )
+        for period in (BUCKET_HALF_HOUR, BUCKET_HOUR)
+    ]
+
+
+STATE_SENSORS = [
+    GlowSensorEntityDescription(
+        key="software_version",
+        name="Smart Meter IHD Software Version",
+        device_class=None,
+        native_unit_of_measurement=None,
+        state_class=None,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:information-outline",
+        path=("software",),
+    ),
+    GlowSensorEntityDescription(
+        key="hardware",
+        name="Smart Meter IHD Hardware",
+        device_class=None,
+        native_unit_of_measurement=None,
+        state_class=None,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:information-outline",
+        path=("hardware",),
+    ),
+    GlowSensorEntityDescription(
+        key="han_status",
+        name="Smart Meter IHD HAN Status",
+        device_class=None,
+        native_unit_of_measurement=None,
+        state_class=None,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:information-outline",
+        path=("han", "status"),
+    ),
+    GlowSensorEntityDescription(
+        key="han_rssi",
+        name="Smart Meter IHD HAN RSSI",
+        device_class=SensorDeviceClass.SIGNAL_STRENGTH,
+        native_unit_of_measurement=SIGNAL_STRENGTH_DECIBELS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:wifi-strength-outline",
+        path=("han", "rssi"),
+    ),
+    GlowSensorEntityDescription(
+        key="han_lqi",
+        name="Smart Meter IHD HAN LQI",
+        device_class=None,
+        native_unit_of_measurement=None,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:wifi-strength-outline",
+        path=("han", "lqi"),
+    ),
+]
+
+ELECTRICITY_SENSORS = [
+    GlowSensorEntityDescription(
+        key="electricity_export",
+        name="Smart Meter Electricity: Export",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:flash",
+        path=("electricitymeter", "energy", "export", "cumulative"),
+        statistic=STATISTIC_SUM,
+        counter_rules=CounterRules(max_rate=DEFAULT_ELECTRICITY_MAX_POWER),
+    ),
+    GlowSensorEntityDescription(
+        key="electricity_import",
+        name="Smart Meter Electricity: Import",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:flash",
+        path=("electricitymeter", "energy", "import", "cumulative"),
+        ignore_zero_values=True,
+        statistic=STATISTIC_SUM,
+        counter_rules=CounterRules(
+            max_rate=DEFAULT_ELECTRICITY_MAX_POWER, power="electricity_power"
+        ),
+    ),
+    GlowSensorEntityDescription(
+        key="electricity_import_today",
+        name="Smart Meter Electricity: Import (Today)",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:flash",
+        path=("electricitymeter", "energy", "import", "day"),
+    ),
+    GlowSensorEntityDescription(
+        key="electricity_import_week",
+        name="Smart Meter Electricity: Import (This week)",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:flash",
+        path=("electricitymeter", "energy", "import", "week"),
+    ),
+    GlowSensorEntityDescription(
+        key="electricity_import_month",
+        name="Smart Meter Electricity: Import (This month)",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:flash",
+        path=("electricitymeter", "energy", "import", "month"),
+    ),
+    GlowSensorEntityDescription(
+        key="electricity_unit_rate",
+        name="Smart Meter Electricity: Import Unit Rate",
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="GBP/kWh",
+        state_class=SensorStateClass.TOTAL,
+        icon="mdi:cash",
+        path=("electricitymeter", "energy", "import", "price", "unitrate"),
+        ignore_zero_values=True,
+    ),
+    GlowSensorEntityDescription(
+        key="electricity_standing_charge",
+        name="Smart Meter Electricity: Import Standing Charge",
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="GBP",
+        state_class=SensorStateClass.TOTAL,
+        icon="mdi:cash",
+        path=("electricitymeter", "energy", "import", "price", "standingcharge"),
+        ignore_zero_values=True,
+    ),
+    GlowSensorEntityDescription(
+        key="electricity_power",
+        name="Smart Meter Electricity: Power",
+        device_class=SensorDeviceClass.POWER,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:flash",
+        path=("electricitymeter", "power", "value"),
+        error_response_values=(-8388.608,),
+        time_weighted=True,
+        statistic=STATISTIC_MEAN,
+    ),
+    *cost_sensors(
+        "electricity",
+        "Smart Meter Electricity: Cost",
+        CostSources(
+            cumulative="electricity_import",
+            unit_rate="electricity_unit_rate",
+            standing_charge="electricity_standing_charge",
+            usage=(
+                (MeterInterval.DAY, "electricity_import_today"),
+                (MeterInterval.WEEK, "electricity_import_week"),
+                (MeterInterval.MONTH, "electricity_import_month"),
+            ),
+        ),
+    ),
+    *rolling_power_sensors("electricity_power", "Smart Meter Electricity: Power", "mdi:flash"),
+    *consumption_bucket_sensors("electricity_import", "Smart Meter Electricity: Import", "mdi:flash"),
+]
+
+GAS_SENSORS = [
+    GlowSensorEntityDescription(
+        key="gas_import",
+        name="Smart Meter Gas: Import",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:fire",
+        path=("gasmeter", "energy", "import", "cumulative"),
+        ignore_zero_values=True,
+        statistic=STATISTIC_SUM,
+        counter_rules=CounterRules(max_rate=DEFAULT_GAS_MAX_POWER),
+    ),
+    GlowSensorEntityDescription(
+        key="gas_import_vol",
+        name="Smart Meter Gas: Import Vol",
+        device_class=SensorDeviceClass.GAS,
+        native_unit_of_measurement=UnitOfVolume.CUBIC_METERS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:fire",
+        path=("gasmeter", "energy", "import", "cumulativevol"),
+        ignore_zero_values=True,
+        counter_rules=CounterRules(max_rate=GAS_MAX_FLOW),
+    ),
+    GlowSensorEntityDescription(
+        key="gas_import_vol_today",
+        name="Smart Meter Gas: Import Vol (Today)",
+        device_class=SensorDeviceClass.GAS,
+        native_unit_of_measurement=UnitOfVolume.CUBIC_METERS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:fire",
+        path=("gasmeter", "energy", "import", "dayvol"),
+    ),
+    GlowSensorEntityDescription(
+        key="gas_import_vol_week",
+        name="Smart Meter Gas: Import Vol (This week)",
+        device_class=SensorDeviceClass.GAS,
+        native_unit_of_measurement=UnitOfVolume.CUBIC_METERS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:fire",
+        path=("gasmeter", "energy", "import", "weekvol"),
+    ),
+    GlowSensorEntityDescription(
+        key="gas_import_vol_month",
+        name="Smart Meter Gas: Import Vol (This month)",
+        device_class=SensorDeviceClass.GAS,
+        native_unit_of_measurement=UnitOfVolume.CUBIC_METERS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:fire",
+        path=("gasmeter", "energy", "import", "monthvol"),
+    ),
+    GlowSensorEntityDescription(
+        key="gas_import_today",
+        name="Smart Meter Gas: Import (Today)",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:fire",
+        path=("gasmeter", "energy", "import", "day"),
+    ),
+    GlowSensorEntityDescription(
+        key="gas_import_week",
+        name="Smart Meter Gas: Import (This week)",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:fire",
+        path=("gasmeter", "energy", "import", "week"),
+    ),
+    GlowSensorEntityDescription(
+        key="gas_import_month",
+        name="Smart Meter Gas: Import (This month)",
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:fire",
+        path=("gasmeter", "energy", "import", "month"),
+    ),
+    GlowSensorEntityDescription(
+        key="gas_unit_rate",
+        name="Smart Meter Gas: Import Unit Rate",
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="GBP/kWh",
+        state_class=SensorStateClass.TOTAL,
+        icon="mdi:cash",
+        path=("gasmeter", "energy", "import", "price", "unitrate"),
+        ignore_zero_values=True,
+    ),
+    GlowSensorEntityDescription(
+        key="gas_standing_charge",
+        name="Smart Meter Gas: Import Standing Charge",
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="GBP",
+        state_class=SensorStateClass.TOTAL,
+        icon="mdi:cash",
+        path=("gasmeter", "energy", "import", "price", "standingcharge"),
+        ignore_zero_values=True,
+    ),
+    # Removed June 2022 in IHD software update 1.8.13
+    # GlowSensorEntityDescription(
+    #   name="Smart Meter Gas: Power",
+    #   device_class=SensorDeviceClass.POWER,
+    #   native_unit_of_measurement=UnitOfPower.KILO_WATT,
+    #   state_class=SensorStateClass.MEASUREMENT,
+    #   icon="mdi:fire",
+    #   path=("gasmeter", "power", "value"),
+    # ),
+    *cost_sensors(
+        "gas",
+        "Smart Meter Gas: Cost",
+        CostSources(
+            cumulative="gas_import",
+            unit_rate="gas_unit_rate",
+            standing_charge="gas_standing_charge",
+            usage=(
+                (MeterInterval.DAY, "gas_import_today"),
+                (MeterInterval.WEEK, "gas_import_week"),
+                (MeterInterval.MONTH, "gas_import_month"),
+            ),
+        ),
+    ),
+    *consumption_bucket_sensors("gas_import", "Smart Meter Gas: Import", "mdi:fire"),
+]
+
+SENSOR_GROUPS = {
+    KIND_STATE: STATE_SENSORS,
+    KIND_ELECTRICITY: ELECTRICITY_SENSORS,
+    KIND_GAS: GAS_SENSORS,
+}
+
+
+def select_sensors(
+    descriptions: Iterable[GlowSensorEntityDescription], selected: Collection[str] | None
+) -> tuple[list[GlowSensorEntityDescription], frozenset[str]]:
+    """Return the descriptions a group needs for the selected sensors, and the selected keys.
+
+    The group needs the selected sensors and, recursively, the sensors they
+    are worked out from; those are extracted and computed but get no
+    entity. None selects every sensor.
+    """
+    by_key = {description.key: description for description in descriptions}
+    keys = frozenset(by_key if selected is None else by_key.keys() & set(selected))
+    needed = set(keys)
+    pending = list(keys)
+    while pending:
+        for source in by_key[pending.pop()].sources - needed:
+            needed.add(source)
+            pending.append(source)
+    return [description for description in by_key.values() if description.key in needed], keys
+
+
+def scale_counter_rules(
+    descriptions: Iterable[GlowSensorEntityDescription], factor: float
+) -> list[GlowSensorEntityDescription]:
+    """Return the descriptions with the max rates of their counter rules scaled by factor.
+
+    The rules are written for the default power limits; a configured limit
+    scales every counter of its meter, gas volume along with gas energy.
+    """
+    if factor == 1:
+        return list(descriptions)
+    return [
+        description
+        if description.counter_rules is None
+        else replace(
+            description,
+            counter_rules=replace(
+                description.counter_rules, max_rate=description.counter_rules.max_rate * factor
+            ),
+        )
+        for description in descriptions
+    ]
+
+
+ALL_SENSORS = [
+    description.key for descriptions in SENSOR_GROUPS.values() for description in descriptions
+]
+# The sensors a new entry starts with: those not disabled by default.
+DEFAULT_SENSORS = [
+    description.key
+    for descriptions in SENSOR_GROUPS.values()
+    for description in descriptions
+    if description.entity_registry_enabled_default
+]
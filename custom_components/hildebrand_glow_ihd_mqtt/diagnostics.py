@@ -0,0 +1,41 @@
+"""Diagnostics support for Hildebrand Glow IHD MQTT."""
+
+from __future__ import annotations
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_HUB, DATA_ROUTER, DOMAIN
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    entry_data = hass.data[DOMAIN].get(entry.entry_id, {})
+    router = entry_data.get(DATA_ROUTER)
+    stats = hass.data[DOMAIN][DATA_HUB].stats
+
+    devices: dict[str, Any] = {}
+    if router is not None:
+        for update_group in router.update_groups:
+            message_stats = stats.message_stats(update_group.device_id, update_group.kind)
+            devices.setdefault(update_group.device_id, {})[update_group.kind] = {
+                **message_stats.as_dict(),
+                "state_writes": update_group.state_writes,
+                "suppressed_writes": update_group.suppressed_writes,
+                "errors": update_group.errors,
+                "rejected_readings": update_group.rejected,
+            }
+
+    return {
+        "data": dict(entry.data),
+        "options": dict(entry.options),
+        "startup": router.startup.as_dict() if router is not None and router.startup else None,
+        "timing_enabled": stats.timing_enabled,
+        "unmatched_topics": stats.unmatched_topics,
+        "ignored_messages": stats.ignored_messages,
+        "ingest": stats.ingest.as_dict(),
+        "devices": devices,
+    }
@@ -0,0 +1,77 @@
+"""Compiled extraction plans for Glow MQTT payloads."""
+
+from __future__ import annotations
+from collections.abc import Iterable, Mapping
+from typing import Any, Final
+
+MISSING: Final = object()
+"""Marker for a value whose path is not present in the payload."""
+
+FieldPath = tuple[str, ...]
+
+
+class ExtractionPlan:
+    """Extract a set of field paths from a decoded payload in one walk.
+
+    The paths are merged into a trie when the plan is compiled, so a prefix
+    such as ``electricitymeter/energy/import`` shared by several sensors is
+    only looked up once per message.
+    """
+
+    def __init__(self, fields: Iterable[tuple[str, FieldPath]]) -> None:
+        """Compile the plan."""
+        self._slots: dict[FieldPath, int] = {}
+        self._keys: list[tuple[str, int]] = []
+        self._trie: dict[str, tuple[dict, int | None]] = {}
+
+        for key, path in fields:
+            self._keys.append((key, self._slot(path)))
+
+    def _slot(self, path: FieldPath) -> int:
+        """Return the slot for a path, adding it to the trie if needed."""
+        slot = self._slots.get(path)
+        if slot is not None:
+            return slot
+        slot = len(self._slots)
+        self._slots[path] = slot
+        node = self._trie
+        for depth, key in enumerate(path):
+            child, leaf = node.get(key, ({}, None))
+            if depth == len(path) - 1:
+                leaf = slot
+            node[key] = (child, leaf)
+            node = child
+        return slot
+
+    @property
+    def paths(self) -> Iterable[FieldPath]:
+        """Return every path read by the plan."""
+        return self._slots.keys()
+
+    def extract(self, data: Mapping[str, Any]) -> tuple[dict[str, Any], list[FieldPath]]:
+        """Return the values by key and the paths missing from the payload."""
+        slots: list[Any] = [MISSING] * len(self._slots)
+        missing: list[FieldPath] = []
+        self._walk(self._trie, data, slots, missing, ())
+
+        return {key: slots[slot] for key, slot in self._keys}, missing
+
+    def _walk(
+        self,
+        node: dict[str, tuple[dict, int | None]],
+        data: Any,
+        slots: list[Any],
+        missing: list[FieldPath],
+        path: FieldPath,
+    ) -> None:
+        """Visit each node of the trie once."""
+        for key, (child, leaf) in node.items():
+            try:
+                value = data[key]
+            except (KeyError, TypeError, IndexError):
+                missing.append((*path, key))
+                continue
+            if leaf is not None:
+                slots[leaf] = value
+            if child:
+                self._walk(child, value, slots, missing, (*path, key))
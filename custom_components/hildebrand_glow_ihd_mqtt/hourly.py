@@ -0,0 +1,123 @@
+"""Hourly long-term statistics accumulated in memory."""
+
+from __future__ import annotations
+from typing import Any
+
+HOUR = 3600
+
+STATISTIC_MEAN = "mean"
+STATISTIC_SUM = "sum"
+
+
+class HourlyStatistics:
+    """Hourly sum, or mean, min and max, of a set of values.
+
+    Sum statistics follow a value that only grows until it resets, like a
+    cumulative reading or a daily total: each increase is added to a
+    running sum and a decrease is taken as a reset to zero. Mean statistics
+    are sampled values such as power. Hours are UTC, the way the recorder
+    keeps them, and a closed hour waits in pending until it is imported.
+    """
+
+    __slots__ = ("_hour", "_last", "_means", "_sums", "_touched", "metrics", "pending", "seeded")
+
+    def __init__(self, metrics: dict[str, str]) -> None:
+        """Initialize the statistics of metrics, a statistic type by key."""
+        self.metrics = metrics
+        self._hour: float | None = None
+        self._sums = {key: 0.0 for key, statistic in metrics.items() if statistic == STATISTIC_SUM}
+        self._last: dict[str, float] = {}
+        self._touched: set[str] = set()
+        self._means: dict[str, list[float]] = {}
+        self.pending: dict[str, list[dict[str, float]]] = {key: [] for key in metrics}
+        # False until the running sums continue from the recorder's last ones.
+        self.seeded = False
+
+    def add(self, timestamp: float, values: dict[str, Any]) -> None:
+        """Add the values of a message taken at timestamp; None values are skipped."""
+        hour = timestamp // HOUR * HOUR
+        if self._hour is None:
+            self._hour = hour
+        elif hour > self._hour:
+            self._close()
+            self._hour = hour
+        elif hour < self._hour:
+            return
+        for key, statistic in self.metrics.items():
+            value = values.get(key)
+            if value is None:
+                continue
+            if statistic == STATISTIC_SUM:
+                last = self._last.get(key)
+                if last is not None:
+                    self._sums[key] += value - last if value >= last else value
+                self._last[key] = value
+                self._touched.add(key)
+            elif (mean := self._means.get(key)) is None:
+                self._means[key] = [value, 1, value, value]
+            else:
+                mean[0] += value
+                mean[1] += 1
+                if value < mean[2]:
+                    mean[2] = value
+                if value > mean[3]:
+                    mean[3] = value
+
+    def close_before(self, timestamp: float) -> None:
+        """Close the open hour if it ended before timestamp."""
+        if self._hour is not None and self._hour + HOUR <= timestamp:
+            self._close()
+            self._hour = timestamp // HOUR * HOUR
+
+    def _close(self) -> None:
+        """Move the open hour's statistics to pending."""
+        for key in self._touched:
+            self.pending[key].append(
+                {"start": self._hour, "state": self._last[key], "sum": self._sums[key]}
+            )
+        for key, (total, count, minimum, maximum) in self._means.items():
+            self.pending[key].append(
+                {"start": self._hour, "mean": total / count, "min": minimum, "max": maximum}
+            )
+        self._touched = set()
+        self._means = {}
+
+    def seed(self, key: str, last_sum: float) -> None:
+        """Continue a running sum, and its pending hours, from the recorder's last sum."""
+        self._sums[key] += last_sum
+        for row in self.pending[key]:
+            row["sum"] += last_sum
+
+    def pending_rows(self) -> dict[str, list[dict[str, float]]]:
+        """Return the closed hours, by key, leaving them pending until imported."""
+        return {key: list(rows) for key, rows in self.pending.items() if rows}
+
+    def imported(self, key: str, count: int) -> None:
+        """Drop the first count pending hours of key once they are imported."""
+        del self.pending[key][:count]
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the open hour, running sums and pending hours in a JSON friendly form."""
+        return {
+            "hour": self._hour,
+            "sums": self._sums,
+            "last": self._last,
+            "touched": sorted(self._touched),
+            "means": self._means,
+            "pending": self.pending,
+            "seeded": self.seeded,
+        }
+
+    def restore(self, snapshot: dict[str, Any]) -> None:
+        """Load a snapshot."""
+        self._hour = snapshot["hour"]
+        self._sums.update(
+            (key, value) for key, value in snapshot["sums"].items() if key in self._sums
+        )
+        self._last = {key: value for key, value in snapshot["last"].items() if key in self.metrics}
+        self._touched = {key for key in snapshot["touched"] if key in self._last}
+        self._means = {key: value for key, value in snapshot["means"].items() if key in self.metrics}
+        for key, rows in snapshot["pending"].items():
+            if key in self.pending:
+                self.pending[key] = rows
+        self.seeded = snapshot["seeded"]
@@ -0,0 +1,291 @@
+"""Shared MQTT subscription hub for Hildebrand Glow IHD MQTT."""
+
+from __future__ import annotations
+import asyncio
+from collections.abc import Callable
+import json
+import logging
+from math import isfinite
+from time import monotonic_ns, perf_counter_ns, time
+from typing import Any
+
+from homeassistant.components import mqtt
+from homeassistant.components.mqtt.models import ReceiveMessage
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import DEFAULT_DEVICE_ID, KIND_STATE
+from .stats import GlowStats
+
+
+def _reject_constant(constant: str) -> float:
+    """Reject NaN and Infinity, which are not JSON."""
+    raise ValueError(f"Invalid JSON constant {constant}")
+
+
+def _finite_float(number: str) -> float:
+    """Parse a JSON number, rejecting one too large for a float."""
+    value = float(number)
+    if not isfinite(value):
+        raise ValueError(f"JSON number out of range {number}")
+    return value
+
+
+def stdlib_json_loads(payload: bytes | str) -> Any:
+    """Parse JSON with the stdlib decoder, as strictly as orjson does about numbers."""
+    return json.loads(payload, parse_constant=_reject_constant, parse_float=_finite_float)
+
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover
+    json_loads = stdlib_json_loads
+
+_LOGGER = logging.getLogger(__name__)
+
+GlowMessageListener = Callable[[str, str, dict[str, Any]], bool]
+
+# Messages handled per event loop iteration when draining the ingest queue.
+DRAIN_BATCH_SIZE = 100
+# Most (device id, kind) slots the ingest queue holds before dropping messages.
+MAX_PENDING = 10000
+
+
+def parse_topic(topic_root: str, topic: str) -> tuple[str, str] | None:
+    """Split a topic into (device id, kind), or None if it is not ours.
+
+    Topics look like ``<prefix>/<device id>/STATE`` or
+    ``<prefix>/<device id>/SENSOR/<meter>``.
+    """
+    if not topic.startswith(topic_root):
+        return None
+    parts = topic[len(topic_root) :].split("/")
+    if len(parts) == 2 and parts[1] == KIND_STATE:
+        return parts[0], KIND_STATE
+    if len(parts) == 3 and parts[1] == "SENSOR":
+        return parts[0], parts[2]
+    return None
+
+
+class GlowMqttHub:
+    """Hold one MQTT subscription per topic prefix for all config entries.
+
+    Each payload is decoded once and the parsed document is handed to the
+    listeners registered for its device id, so the cost of a message does
+    not grow with the number of config entries.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the hub."""
+        self._hass = hass
+        self._subscriptions: dict[str, GlowPrefixSubscription] = {}
+        self.stats = GlowStats()
+
+    async def async_register(
+        self, topic_prefix: str, device_id: str, listener: GlowMessageListener
+    ) -> CALLBACK_TYPE:
+        """Register a listener for a device id (or + for all devices)."""
+        topic_prefix = topic_prefix.rstrip("/")
+        subscription = self._subscriptions.get(topic_prefix)
+        if subscription is None:
+            subscription = GlowPrefixSubscription(topic_prefix, self.stats)
+            self._subscriptions[topic_prefix] = subscription
+            await subscription.async_subscribe(self._hass)
+        subscription.add_listener(device_id, listener)
+
+        @callback
+        def async_unregister() -> None:
+            subscription.remove_listener(device_id, listener)
+            if subscription.is_empty and self._subscriptions.get(topic_prefix) is subscription:
+                subscription.async_unsubscribe()
+                del self._subscriptions[topic_prefix]
+
+        return async_unregister
+
+
+class GlowPrefixSubscription:
+    """A single subscription to the Glow topics under one prefix.
+
+    Messages are not handled in the MQTT callback. Each one replaces the
+    pending payload of its device and kind, and a drain callback decodes
+    and dispatches the pending payloads DRAIN_BATCH_SIZE at a time,
+    yielding to the event loop between batches. A burst of retained or
+    queued messages after a broker restart therefore costs one decode per
+    device and kind, and intermediate values are never written.
+    """
+
+    def __init__(self, topic_prefix: str, stats: GlowStats) -> None:
+        """Initialize the subscription."""
+        self.topic_prefix = topic_prefix.rstrip("/")
+        self._stats = stats
+        self._topic_root = f"{self.topic_prefix}/"
+        self._listeners: dict[str, list[GlowMessageListener]] = {}
+        self._unsubscribes: list[CALLBACK_TYPE] = []
+        self._hass: HomeAssistant | None = None
+        # Payload, monotonic and wall clock receipt times, and the number of
+        # messages it stands for, by device id and kind.
+        self._pending: dict[tuple[str, str], tuple[bytes, int, float | None, int]] = {}
+        self._drain_handle: asyncio.Handle | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        """Return True when no listeners are registered."""
+        return not self._listeners
+
+    def add_listener(self, device_id: str, listener: GlowMessageListener) -> None:
+        """Add a listener for a device id."""
+        self._listeners.setdefault(device_id, []).append(listener)
+
+    def remove_listener(self, device_id: str, listener: GlowMessageListener) -> None:
+        """Remove a listener for a device id."""
+        listeners = self._listeners.get(device_id)
+        if listeners and listener in listeners:
+            listeners.remove(listener)
+            if not listeners:
+                del self._listeners[device_id]
+
+    async def async_subscribe(self, hass: HomeAssistant) -> None:
+        """Subscribe to the STATE and SENSOR topics of every device.
+
+        Payloads are delivered as raw bytes (encoding=None) and parsed
+        directly, skipping the intermediate str decode.
+        """
+        self._hass = hass
+        for data_topic in (
+            f"{self.topic_prefix}/+/{KIND_STATE}",
+            f"{self.topic_prefix}/+/SENSOR/+",
+        ):
+            self._unsubscribes.append(
+                await mqtt.async_subscribe(
+                    hass, data_topic, self.async_message_received, 1, encoding=None
+                )
+            )
+
+    @callback
+    def async_unsubscribe(self) -> None:
+        """Drop the MQTT subscriptions."""
+        while self._unsubscribes:
+            self._unsubscribes.pop()()
+        if self._drain_handle is not None:
+            self._drain_handle.cancel()
+            self._drain_handle = None
+        self._pending.clear()
+        self._stats.ingest.depth = 0
+
+    @callback
+    def async_message_received(self, message: ReceiveMessage) -> None:
+        """Queue a message as the latest payload of its device and kind."""
+        parsed_topic = parse_topic(self._topic_root, message.topic)
+        if parsed_topic is None:
+            self._stats.unmatched_topics += 1
+            return
+        if parsed_topic[0] not in self._listeners and DEFAULT_DEVICE_ID not in self._listeners:
+            self._count_ignored(parsed_topic, 1)
+            return
+        _LOGGER.debug("Received message: %s", message.topic)
+        _LOGGER.debug("  Payload: %s", message.payload)
+        ingest = self._stats.ingest
+        count = 1
+        if (pending := self._pending.get(parsed_topic)) is not None:
+            ingest.overwrites += 1
+            count += pending[3]
+        elif len(self._pending) >= MAX_PENDING:
+            ingest.dropped += 1
+            return
+        # Retained messages were published before we subscribed, so their
+        # receipt time says nothing about the latency.
+        self._pending[parsed_topic] = (
+            message.payload,
+            monotonic_ns(),
+            None if message.retain else time(),
+            count,
+        )
+        ingest.depth = len(self._pending)
+        if ingest.depth > ingest.max_depth:
+            ingest.max_depth = ingest.depth
+        if self._drain_handle is None:
+            self._drain_handle = self._hass.loop.call_soon(self._async_drain)
+
+    @callback
+    def _async_drain(self) -> None:
+        """Dispatch a batch of pending messages and reschedule while any are left."""
+        self._drain_handle = None
+        ingest = self._stats.ingest
+        now = monotonic_ns()
+        try:
+            for _ in range(min(DRAIN_BATCH_SIZE, len(self._pending))):
+                parsed_topic = next(iter(self._pending))
+                payload, received, received_time, count = self._pending.pop(parsed_topic)
+                ingest.lag.add(now - received)
+                self._dispatch(*parsed_topic, payload, received_time, count)
+        finally:
+            ingest.depth = len(self._pending)
+            if self._pending:
+                self._drain_handle = self._hass.loop.call_soon(self._async_drain)
+
+    def _count_ignored(self, parsed_topic: tuple[str, str], count: int) -> None:
+        """Count ignored messages on their device and kind, if it has counters.
+
+        Counters are only created for messages a listener accepts, so
+        traffic from devices without entities does not grow the stats.
+        """
+        message_stats = self._stats.messages.get(parsed_topic)
+        if message_stats is None:
+            self._stats.ignored_messages += count
+        else:
+            message_stats.received += count
+            message_stats.ignored += count
+
+    def _dispatch(
+        self,
+        device_id: str,
+        kind: str,
+        payload: bytes,
+        received_time: float | None = None,
+        count: int = 1,
+    ) -> None:
+        """Decode a payload once and fan it out to the matching listeners.
+
+        Payloads that are not a JSON object are ignored. received_time is
+        the wall clock time the message arrived, left on the stats for the
+        listeners' latency tracking, and count the number of messages the
+        payload replaced in the queue, itself included.
+        """
+        listeners = self._listeners.get(device_id, []) + self._listeners.get(
+            DEFAULT_DEVICE_ID, []
+        )
+        if not listeners:
+            self._count_ignored((device_id, kind), count)
+            return
+        decode_time = None
+        try:
+            if self._stats.timing_enabled:
+                started = perf_counter_ns()
+                parsed_data = json_loads(payload)
+                decode_time = perf_counter_ns() - started
+            else:
+                parsed_data = json_loads(payload)
+        except ValueError:
+            _LOGGER.debug("Invalid JSON from %s/%s", device_id, kind)
+            self._count_ignored((device_id, kind), count)
+            return
+        if not isinstance(parsed_data, dict):
+            _LOGGER.debug("JSON from %s/%s is not an object", device_id, kind)
+            self._count_ignored((device_id, kind), count)
+            return
+        self._stats.received_time = received_time
+        accepted = False
+        for listener in listeners:
+            # One listener's failure must not keep the message from the others.
+            try:
+                if listener(device_id, kind, parsed_data):
+                    accepted = True
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error handling %s message from %s", kind, device_id)
+        if not accepted:
+            self._count_ignored((device_id, kind), count)
+            return
+        message_stats = self._stats.message_stats(device_id, kind)
+        message_stats.received += count
+        message_stats.matched += 1
+        if decode_time is not None:
+            message_stats.decode.add(decode_time)
@@ -0,0 +1,108 @@
+"""Meter reset periods for Hildebrand Glow IHD MQTT."""
+
+from __future__ import annotations
+from datetime import UTC, date, datetime, time, timedelta, tzinfo
+from typing import Any
+
+from .const import MeterInterval
+
+
+def get_message_datetime(mqtt_data: dict[str, Any]) -> datetime:
+    """Return the message timestamp as an aware datetime.
+
+    Raises ValueError when there is none, including when the payload or
+    its meter node is not a dict.
+    """
+    if not isinstance(mqtt_data, dict):
+        raise ValueError("MQTT data is not an object.")
+    timestamp = mqtt_data.get("timestamp")
+    for meter in ("electricitymeter", "gasmeter"):
+        if timestamp:
+            break
+        meter_data = mqtt_data.get(meter)
+        if isinstance(meter_data, dict):
+            timestamp = meter_data.get("timestamp")
+    try:
+        message_datetime = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError) as err:
+        raise ValueError("Valid timestamp not present in MQTT data.") from err
+    if message_datetime.tzinfo is None:
+        return message_datetime.replace(tzinfo=UTC)
+    return message_datetime
+
+
+def determine_last_reset(
+    message_datetime: datetime, meter_timezone: tzinfo, meter_interval: MeterInterval
+) -> datetime:
+    """Return midnight of the meter's reset interval in UTC."""
+    meter_datetime = message_datetime.astimezone(meter_timezone)
+    meter_midnight = datetime.combine(
+        meter_datetime.date(), time.min, meter_datetime.tzinfo
+    )
+    if meter_interval == MeterInterval.DAY:
+        last_reset = meter_midnight
+    elif meter_interval == MeterInterval.WEEK:
+        last_reset = meter_midnight - timedelta(days=meter_midnight.weekday())
+    elif meter_interval == MeterInterval.MONTH:
+        last_reset = meter_midnight.replace(day=1)
+    elif meter_interval == MeterInterval.YEAR:
+        last_reset = meter_midnight.replace(day=1, month=1)
+    return last_reset.astimezone(UTC)
+
+
+def next_period_date(start: date, meter_interval: MeterInterval) -> date:
+    """Return the first local date of the period after the one starting at start."""
+    if meter_interval == MeterInterval.DAY:
+        return start + timedelta(days=1)
+    if meter_interval == MeterInterval.WEEK:
+        return start + timedelta(days=7)
+    if meter_interval == MeterInterval.MONTH:
+        if start.month == 12:
+            return date(start.year + 1, 1, 1)
+        return date(start.year, start.month + 1, 1)
+    return date(start.year + 1, 1, 1)
+
+
+class PeriodTracker:
+    """Cache the current reset period of one time zone and interval.
+
+    The period start and the next boundary are kept in UTC, so a message
+    inside the current period costs two comparisons. The boundaries are
+    only recomputed, with ``determine_last_reset``, when a message falls
+    outside them.
+    """
+
+    __slots__ = ("_meter_interval", "_meter_timezone", "_start", "_end")
+
+    def __init__(self, meter_timezone: tzinfo, meter_interval: MeterInterval) -> None:
+        """Initialize the tracker."""
+        self._meter_timezone = meter_timezone
+        self._meter_interval = meter_interval
+        self._start: datetime | None = None
+        self._end: datetime | None = None
+
+    def period_start(self, message_datetime: datetime) -> datetime:
+        """Return the start of the period containing message_datetime, in UTC."""
+        if self._start is not None and self._start <= message_datetime < self._end:
+            return self._start
+        start = determine_last_reset(
+            message_datetime, self._meter_timezone, self._meter_interval
+        )
+        end_date = next_period_date(
+            start.astimezone(self._meter_timezone).date(), self._meter_interval
+        )
+        self._start = start
+        self._end = datetime.combine(end_date, time.min, self._meter_timezone).astimezone(UTC)
+        return start
+
+
+_PERIOD_TRACKERS: dict[tuple[str, MeterInterval], PeriodTracker] = {}
+
+
+def get_period_tracker(meter_timezone: tzinfo, meter_interval: MeterInterval) -> PeriodTracker:
+    """Return the shared tracker for a time zone and interval."""
+    key = (str(meter_timezone), meter_interval)
+    tracker = _PERIOD_TRACKERS.get(key)
+    if tracker is None:
+        tracker = _PERIOD_TRACKERS[key] = PeriodTracker(meter_timezone, meter_interval)
+    return tracker
@@ -0,0 +1,154 @@
+"""Plausibility checks of cumulative meter readings."""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from math import isfinite
+from typing import Any
+
+REJECT_SENTINEL = "sentinel"
+REJECT_STALE = "stale"
+REJECT_DECREASE = "decrease"
+REJECT_SPIKE = "spike"
+
+REJECT_REASONS = (REJECT_SENTINEL, REJECT_STALE, REJECT_DECREASE, REJECT_SPIKE)
+
+# Rejected readings that agree with each other at this many meter timestamps
+# in a row are taken as the meter's real count, after a meter exchange or a
+# bad baseline.
+CONFIRMATIONS = 5
+# The most the counter may advance is the peak power seen since it last
+# advanced, times the margin plus the headroom, over the time since then.
+POWER_MARGIN = 2.0
+POWER_HEADROOM = 1.0
+# Allowance for the rounding of the readings, in counter units.
+RESOLUTION = 0.01
+
+
+@dataclass(frozen=True, slots=True)
+class CounterRules:
+    """Plausibility rules of a cumulative counter.
+
+    max_rate is the most the counter can plausibly advance in an hour, in
+    its own units; power is the key of the meter's power sensor, in kW,
+    which narrows that down when it is known. sentinels are values the
+    IHD reports instead of a reading.
+    """
+
+    max_rate: float
+    power: str | None = None
+    sentinels: tuple[float, ...] = ()
+
+
+class CounterValidator:
+    """Streaming validation of one cumulative counter.
+
+    Each reading is checked in O(1) against the last accepted one: it must
+    not be a sentinel, older than it, lower than it, or higher than the
+    meter could have used since the counter last advanced. Rejected
+    readings are counted by reason.
+    """
+
+    __slots__ = (
+        "_advanced_time",
+        "_candidate",
+        "_candidate_count",
+        "_last_time",
+        "_last_value",
+        "_peak_power",
+        "rejected",
+        "rules",
+    )
+
+    def __init__(self, rules: CounterRules) -> None:
+        """Initialize the validator of a counter following rules."""
+        self.rules = rules
+        self._last_time: float | None = None
+        self._last_value: float | None = None
+        self._advanced_time: float | None = None
+        self._peak_power = 0.0
+        self._candidate: tuple[float, float] | None = None
+        self._candidate_count = 0
+        self.rejected = dict.fromkeys(REJECT_REASONS, 0)
+
+    def check(self, timestamp: float, value: Any, power: float | None = None) -> str | None:
+        """Check a reading taken at timestamp; return why it is rejected, or None."""
+        if power is not None and power > self._peak_power:
+            self._peak_power = power
+        reason = self._reason(timestamp, value)
+        if reason in (REJECT_DECREASE, REJECT_SPIKE) and self._confirmed(timestamp, value):
+            reason = None
+        if reason is not None:
+            self.rejected[reason] += 1
+            return reason
+        if self._last_value is None or value != self._last_value:
+            self._advanced_time = timestamp
+            self._peak_power = max(power or 0.0, 0.0)
+        self._last_time = timestamp
+        self._last_value = value
+        self._candidate = None
+        self._candidate_count = 0
+        return None
+
+    def _reason(self, timestamp: float, value: Any) -> str | None:
+        """Return the rule a reading breaks, if any."""
+        if (
+            not isinstance(value, (int, float))
+            or not isfinite(value)
+            or value < 0
+            or value in self.rules.sentinels
+        ):
+            return REJECT_SENTINEL
+        if self._last_value is None:
+            return None
+        if timestamp < self._last_time:
+            return REJECT_STALE
+        if value < self._last_value:
+            return REJECT_DECREASE
+        if value - self._last_value > self._limit(timestamp - self._advanced_time):
+            return REJECT_SPIKE
+        return None
+
+    def _limit(self, elapsed: float) -> float:
+        """Return the most the counter can have advanced in elapsed seconds."""
+        rate = self.rules.max_rate
+        if self.rules.power is not None and self._peak_power:
+            rate = min(rate, self._peak_power * POWER_MARGIN + POWER_HEADROOM)
+        return rate * elapsed / 3600 + RESOLUTION
+
+    def _confirmed(self, timestamp: float, value: float) -> bool:
+        """Track a rejected reading; return True once enough agree to be accepted.
+
+        A reading agrees with the previous rejected one if it is newer,
+        not lower and within max_rate of it. Repeats of a meter timestamp
+        only count once.
+        """
+        candidate = self._candidate
+        self._candidate = (timestamp, value)
+        if candidate is None or timestamp < candidate[0]:
+            self._candidate_count = 1
+        elif not 0 <= value - candidate[1] <= (
+            self.rules.max_rate * (timestamp - candidate[0]) / 3600 + RESOLUTION
+        ):
+            self._candidate_count = 1
+        elif timestamp > candidate[0]:
+            self._candidate_count += 1
+        return self._candidate_count >= CONFIRMATIONS
+
+    @property
+    def total_rejected(self) -> int:
+        """Return the number of rejected readings."""
+        return sum(self.rejected.values())
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the last accepted reading in a JSON friendly form."""
+        return {
+            "last": [self._last_time, self._last_value],
+            "advanced_time": self._advanced_time,
+            "peak_power": self._peak_power,
+        }
+
+    def restore(self, snapshot: dict[str, Any]) -> None:
+        """Load a snapshot."""
+        self._last_time, self._last_value = snapshot["last"]
+        self._advanced_time = snapshot["advanced_time"]
+        self._peak_power = snapshot["peak_power"]
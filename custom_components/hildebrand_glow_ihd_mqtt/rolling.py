@@ -0,0 +1,154 @@
+"""Rolling window statistics over a fixed-size ring buffer."""
+
+from __future__ import annotations
+from array import array
+from typing import Any
+
+BUCKET_SECONDS = 60
+
+STAT_MEAN = "mean"
+STAT_MIN = "min"
+STAT_MAX = "max"
+STAT_PEAK_TIME = "peak_time"
+
+# The statistics of a window, in the order RollingWindowStats.window returns them.
+STATS = (STAT_MEAN, STAT_MIN, STAT_MAX, STAT_PEAK_TIME)
+
+
+class RollingWindowStats:
+    """Mean, min, max and time of the max of a sampled value over trailing windows.
+
+    Samples are summed into one-minute buckets held in a ring buffer sized
+    for the longest window, so memory is fixed however many samples
+    arrive. Each sample only touches the current bucket. When a new
+    minute starts the closed buckets are folded once into a running
+    aggregate per window, so reading a window is O(1) as well.
+
+    Windows are whole buckets: the 5 minute window covers the current
+    minute and the four before it. Times are POSIX timestamps. Samples
+    older than the current bucket are dropped.
+    """
+
+    __slots__ = (
+        "_bucket",
+        "_closed",
+        "_count",
+        "_current",
+        "_max",
+        "_min",
+        "_peak_time",
+        "_size",
+        "_sum",
+        "windows",
+    )
+
+    def __init__(self, windows: tuple[int, ...]) -> None:
+        """Initialize an empty buffer for windows given in minutes."""
+        self.windows = tuple(sorted(windows))
+        self._size = size = self.windows[-1]
+        self._bucket = array("q", [-1]) * size
+        self._sum = array("d", [0.0]) * size
+        self._count = array("L", [0]) * size
+        self._min = array("d", [0.0]) * size
+        self._max = array("d", [0.0]) * size
+        self._peak_time = array("d", [0.0]) * size
+        self._current = -1
+        self._closed: dict[int, tuple[float, int, float, float, float]] = {}
+
+    def add(self, timestamp: float, value: float | None) -> None:
+        """Add a sample taken at timestamp; None only moves the clock on."""
+        bucket = int(timestamp // BUCKET_SECONDS)
+        if bucket < self._current:
+            return
+        slot = bucket % self._size
+        if bucket > self._current:
+            self._current = bucket
+            self._bucket[slot] = bucket
+            self._sum[slot] = 0.0
+            self._count[slot] = 0
+            self._fold_closed()
+        if value is None:
+            return
+        if self._count[slot] == 0 or value < self._min[slot]:
+            self._min[slot] = value
+        if self._count[slot] == 0 or value > self._max[slot]:
+            self._max[slot] = value
+            self._peak_time[slot] = timestamp
+        self._sum[slot] += value
+        self._count[slot] += 1
+
+    def _fold_closed(self) -> None:
+        """Aggregate the closed buckets of every window, newest first."""
+        self._closed = {}
+        total, count, minimum, maximum, peak_time = 0.0, 0, 0.0, 0.0, 0.0
+        windows = iter(self.windows)
+        window = next(windows)
+        for age in range(1, self._size + 1):
+            while window == age:
+                self._closed[window] = (total, count, minimum, maximum, peak_time)
+                window = next(windows, None)
+            if window is None:
+                return
+            bucket = self._current - age
+            slot = bucket % self._size
+            if self._bucket[slot] != bucket or not self._count[slot]:
+                continue
+            if not count or self._min[slot] < minimum:
+                minimum = self._min[slot]
+            if not count or self._max[slot] > maximum:
+                maximum = self._max[slot]
+                peak_time = self._peak_time[slot]
+            total += self._sum[slot]
+            count += self._count[slot]
+
+    def window(self, minutes: int) -> tuple[float, float, float, float] | None:
+        """Return the mean, min, max and peak time of a window, or None if empty."""
+        total, count, minimum, maximum, peak_time = self._closed.get(
+            minutes, (0.0, 0, 0.0, 0.0, 0.0)
+        )
+        slot = self._current % self._size
+        if self._current >= 0 and self._count[slot]:
+            if not count or self._min[slot] < minimum:
+                minimum = self._min[slot]
+            if not count or self._max[slot] >= maximum:
+                maximum = self._max[slot]
+                peak_time = self._peak_time[slot]
+            total += self._sum[slot]
+            count += self._count[slot]
+        if not count:
+            return None
+        return total / count, minimum, maximum, peak_time
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the buffer's occupied buckets in a JSON friendly form."""
+        return {
+            "current": self._current,
+            "buckets": [
+                [
+                    self._bucket[slot],
+                    self._sum[slot],
+                    self._count[slot],
+                    self._min[slot],
+                    self._max[slot],
+                    self._peak_time[slot],
+                ]
+                for slot in range(self._size)
+                if self._count[slot] and self._current - self._bucket[slot] < self._size
+            ],
+        }
+
+    def restore(self, snapshot: dict[str, Any]) -> None:
+        """Load the buckets of a snapshot, ignoring the ones out of range."""
+        current = snapshot["current"]
+        for bucket, total, count, minimum, maximum, peak_time in snapshot["buckets"]:
+            if not 0 <= current - bucket < self._size:
+                continue
+            slot = bucket % self._size
+            self._bucket[slot] = bucket
+            self._sum[slot] = total
+            self._count[slot] = count
+            self._min[slot] = minimum
+            self._max[slot] = maximum
+            self._peak_time[slot] = peak_time
+        self._current = current
+        self._fold_closed()
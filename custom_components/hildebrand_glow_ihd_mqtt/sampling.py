@@ -0,0 +1,51 @@
+"""Downsampling helpers for high-rate Glow readings."""
+
+from __future__ import annotations
+
+
+class TimeWeightedWindow:
+    """Accumulate the time-weighted mean, min and max of a sampled value.
+
+    Each sample is held until the next one arrives, so a reading that was
+    current for 30 seconds weighs three times as much as one that was
+    current for 10. Samples of None (error responses) leave a gap.
+    """
+
+    __slots__ = ("_area", "_covered", "_last_time", "_last_value", "maximum", "minimum", "start")
+
+    def __init__(self) -> None:
+        """Initialize an empty window."""
+        self._area = 0.0
+        self._covered = 0.0
+        self._last_time: float | None = None
+        self._last_value: float | None = None
+        self.start: float | None = None
+        self.minimum: float | None = None
+        self.maximum: float | None = None
+
+    def add(self, now: float, value: float | None) -> None:
+        """Add a sample taken at now."""
+        if self._last_time is not None and self._last_value is not None:
+            elapsed = now - self._last_time
+            self._area += self._last_value * elapsed
+            self._covered += elapsed
+        self._last_time = now
+        self._last_value = value
+        if value is not None:
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+
+    def mean(self) -> float | None:
+        """Return the time-weighted mean of the window so far."""
+        if self._covered > 0:
+            return self._area / self._covered
+        return self._last_value
+
+    def restart(self, now: float) -> None:
+        """Start a new window at now, carrying the current sample into it."""
+        self._area = 0.0
+        self._covered = 0.0
+        self.start = now
+        self.minimum = self.maximum = self._last_value
@@ -1,519 +1,1364 @@
 """Support for hildebrand glow MQTT sensors."""
 
 from __future__ import annotations
-from datetime import datetime, time, timedelta, tzinfo
-import json
+import asyncio
+from collections.abc import Callable, Collection
+from dataclasses import dataclass
+from datetime import datetime, timedelta, tzinfo
 import logging
-import re
+from time import monotonic, perf_counter_ns, time
 from typing import Iterable
-from zoneinfo import ZoneInfo
 
-from homeassistant.components import mqtt
-from homeassistant.components.mqtt.models import ReceiveMessage
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
 from homeassistant.components.sensor import (
+    ATTR_LAST_RESET,
+    RestoreSensor,
     SensorEntity,
+    SensorEntityDescription,
     SensorDeviceClass,
     SensorStateClass,
 )
 from homeassistant.const import (
     ATTR_DEVICE_ID,
     CONF_DEVICE_ID,
-    SIGNAL_STRENGTH_DECIBELS,
-    UnitOfEnergy,
-    UnitOfPower,
-    UnitOfVolume,
+    EVENT_HOMEASSISTANT_STOP,
+    UnitOfTime,
 )
 from homeassistant.core import callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
 from homeassistant.helpers.entity import DeviceInfo, EntityCategory
-from homeassistant.util import slugify
+from homeassistant.helpers.event import async_track_time_interval, async_track_utc_time_change
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
 
 from .const import (
+    ATTR_MAX,
+    ATTR_MIN,
+    CONF_ALLOWED_DEVICES,
+    CONF_COALESCE_WINDOW,
+    CONF_COUNTER_INTERVAL,
+    CONF_DEBUG_SENSORS,
+    CONF_DENIED_DEVICES,
+    CONF_ELECTRICITY_MAX_POWER,
+    CONF_GAS_MAX_POWER,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_POWER_INTERVAL,
+    CONF_SENSORS,
+    CONF_STALE_ACTION,
+    CONF_STALE_TIMEOUT,
+    CONF_STATISTICS_IMPORT,
     CONF_TIME_ZONE_ELECTRICITY,
     CONF_TIME_ZONE_GAS,
     CONF_TOPIC_PREFIX,
+    DATA_HUB,
+    DATA_RECONFIGURE,
+    DATA_ROUTER,
     DEFAULT_DEVICE_ID,
+    DEFAULT_ELECTRICITY_MAX_POWER,
+    DEFAULT_GAS_MAX_POWER,
     DEFAULT_TOPIC_PREFIX,
     DOMAIN,
-    MeterInterval,
+    KIND_ELECTRICITY,
+    KIND_GAS,
+    KIND_STATE,
+    STALE_ACTION_EVICT,
+)
+from .buckets import ConsumptionBuckets
+from .cost import CostEngine
+from .descriptions import (
+    BUCKET_HALF_HOUR,
+    SENSOR_GROUPS,
+    GlowSensorEntityDescription,
+    scale_counter_rules,
+    select_sensors,
 )
+from .extraction import MISSING, ExtractionPlan, FieldPath
+from .hourly import STATISTIC_MEAN, STATISTIC_SUM, HourlyStatistics
+from .periods import get_message_datetime, get_period_tracker
+from .quality import CounterValidator
+from .rolling import STAT_PEAK_TIME, STATS, RollingWindowStats
+from .sampling import TimeWeightedWindow
+from .stats import GlowStats, LatencyHistogram, StartupStats
 
 _LOGGER = logging.getLogger(__name__)
 
-# glow/XXXXXXYYYYYY/STATE                   {"software":"v1.8.12","timestamp":"2022-06-11T20:54:53Z","hardware":"GLOW-IHD-01-1v4-SMETS2","ethmac":"1234567890AB","smetsversion":"SMETS2","eui":"12:34:56:78:91:23:45","zigbee":"1.2.5","han":{"rssi":-75,"status":"joined","lqi":100}}
-# glow/XXXXXXYYYYYY/SENSOR/electricitymeter {"electricitymeter":{"timestamp":"2022-06-11T20:38:00Z","energy":{"export":{"cumulative":0.000,"units":"kWh"},"import":{"cumulative":6613.405,"day":13.252,"week":141.710,"month":293.598,"units":"kWh","mpan":"1234","supplier":"ABC ENERGY","price":{"unitrate":0.04998,"standingcharge":0.24030}}},"power":{"value":0.951,"units":"kW"}}}
-# glow/XXXXXXYYYYYY/SENSOR/gasmeter         {"gasmeter":{"timestamp":"2022-06-11T20:53:52Z","energy":{"export":{"cumulative":0.000,"units":"kWh"},"import":{"cumulative":17940.852,"day":11.128,"week":104.749,"month":217.122,"units":"kWh","mprn":"1234","supplier":"---","price":{"unitrate":0.07320,"standingcharge":0.17850}}},"power":{"value":0.000,"units":"kW"}}}
-
-STATE_SENSORS = [
-    {
-        "name": "Smart Meter IHD Software Version",
-        "device_class": None,
-        "unit_of_measurement": None,
-        "state_class": None,
-        "entity_category": EntityCategory.DIAGNOSTIC,
-        "icon": "mdi:information-outline",
-        "func": lambda js: js["software"],
-    },
-    {
-        "name": "Smart Meter IHD Hardware",
-        "device_class": None,
-        "unit_of_measurement": None,
-        "state_class": None,
-        "entity_category": EntityCategory.DIAGNOSTIC,
-        "icon": "mdi:information-outline",
-        "func": lambda js: js["hardware"],
-    },
-    {
-        "name": "Smart Meter IHD HAN Status",
-        "device_class": None,
-        "unit_of_measurement": None,
-        "state_class": None,
-        "entity_category": EntityCategory.DIAGNOSTIC,
-        "icon": "mdi:information-outline",
-        "func": lambda js: js["han"]["status"],
-    },
-    {
-        "name": "Smart Meter IHD HAN RSSI",
-        "device_class": SensorDeviceClass.SIGNAL_STRENGTH,
-        "unit_of_measurement": SIGNAL_STRENGTH_DECIBELS,
-        "state_class": SensorStateClass.MEASUREMENT,
-        "entity_category": EntityCategory.DIAGNOSTIC,
-        "icon": "mdi:wifi-strength-outline",
-        "func": lambda js: js["han"]["rssi"],
-    },
-    {
-        "name": "Smart Meter IHD HAN LQI",
-        "device_class": None,
-        "unit_of_measurement": None,
-        "state_class": SensorStateClass.MEASUREMENT,
-        "entity_category": EntityCategory.DIAGNOSTIC,
-        "icon": "mdi:wifi-strength-outline",
-        "func": lambda js: js["han"]["lqi"],
-    },
-]
+STALE_CHECK_INTERVAL = timedelta(minutes=1)
 
-ELECTRICITY_SENSORS = [
-    {
-        "name": "Smart Meter Electricity: Export",
-        "device_class": SensorDeviceClass.ENERGY,
-        "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:flash",
-        "func": lambda js: js["electricitymeter"]["energy"]["export"]["cumulative"],
-    },
-    {
-        "name": "Smart Meter Electricity: Import",
-        "device_class": SensorDeviceClass.ENERGY,
-        "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:flash",
-        "func": lambda js: js["electricitymeter"]["energy"]["import"]["cumulative"],
-        "ignore_zero_values": True,
-    },
-    {
-        "name": "Smart Meter Electricity: Import (Today)",
-        "device_class": SensorDeviceClass.ENERGY,
-        "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:flash",
-        "func": lambda js: js["electricitymeter"]["energy"]["import"]["day"],
-    },
-    {
-        "name": "Smart Meter Electricity: Import (This week)",
-        "device_class": SensorDeviceClass.ENERGY,
-        "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:flash",
-        "func": lambda js: js["electricitymeter"]["energy"]["import"]["week"],
-    },
-    {
-        "name": "Smart Meter Electricity: Import (This month)",
-        "device_class": SensorDeviceClass.ENERGY,
-        "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:flash",
-        "func": lambda js: js["electricitymeter"]["energy"]["import"]["month"],
-    },
-    {
-        "name": "Smart Meter Electricity: Import Unit Rate",
-        "device_class": SensorDeviceClass.MONETARY,
-        "unit_of_measurement": "GBP/kWh",
-        "state_class": SensorStateClass.TOTAL,
-        "icon": "mdi:cash",
-        "func": lambda js: js["electricitymeter"]["energy"]["import"]["price"][
-            "unitrate"
-        ],
-        "ignore_zero_values": True,
-    },
-    {
-        "name": "Smart Meter Electricity: Import Standing Charge",
-        "device_class": SensorDeviceClass.MONETARY,
-        "unit_of_measurement": "GBP",
-        "state_class": SensorStateClass.TOTAL,
-        "icon": "mdi:cash",
-        "func": lambda js: js["electricitymeter"]["energy"]["import"]["price"][
-            "standingcharge"
-        ],
-        "ignore_zero_values": True,
-    },
-    {
-        "name": "Smart Meter Electricity: Power",
-        "device_class": SensorDeviceClass.POWER,
-        "unit_of_measurement": UnitOfPower.KILO_WATT,
-        "state_class": SensorStateClass.MEASUREMENT,
-        "icon": "mdi:flash",
-        "func": lambda js: js["electricitymeter"]["power"]["value"],
-        "error_response_values": [-8388.608],
-    },
-    {
-        "name": "Smart Meter Electricity: Cost (Today)",
-        "device_class": SensorDeviceClass.MONETARY,
-        "unit_of_measurement": "GBP",
-        "state_class": SensorStateClass.TOTAL,
-        "icon": "mdi:cash",
-        "meter_interval": MeterInterval.DAY,
-        "func": lambda js: round(
-            js["electricitymeter"]["energy"]["import"]["price"]["standingcharge"]
-            + (
-                js["electricitymeter"]["energy"]["import"]["day"]
-                * js["electricitymeter"]["energy"]["import"]["price"]["unitrate"]
-            ),
-            2,
-        ),
-    },
-]
+BUFFER_SAVE_INTERVAL = timedelta(minutes=15)
+BUFFER_STORAGE_VERSION = 1
+# Minutes past the hour to import the last hour, late enough for its last readings.
+STATISTICS_IMPORT_MINUTE = 5
 
-GAS_SENSORS = [
-    {
-        "name": "Smart Meter Gas: Import",
-        "device_class": SensorDeviceClass.ENERGY,
-        "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:fire",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["cumulative"],
-        "ignore_zero_values": True,
-    },
-    {
-        "name": "Smart Meter Gas: Import Vol",
-        "device_class": SensorDeviceClass.GAS,
-        "unit_of_measurement": UnitOfVolume.CUBIC_METERS,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:fire",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["cumulativevol"],
-        "ignore_zero_values": True,
-    },
-    {
-        "name": "Smart Meter Gas: Import Vol (Today)",
-        "device_class": SensorDeviceClass.GAS,
-        "unit_of_measurement": UnitOfVolume.CUBIC_METERS,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:fire",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["dayvol"],
-    },
-    {
-        "name": "Smart Meter Gas: Import Vol (This week)",
-        "device_class": SensorDeviceClass.GAS,
-        "unit_of_measurement": UnitOfVolume.CUBIC_METERS,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:fire",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["weekvol"],
-    },
-    {
-        "name": "Smart Meter Gas: Import Vol (This month)",
-        "device_class": SensorDeviceClass.GAS,
-        "unit_of_measurement": UnitOfVolume.CUBIC_METERS,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:fire",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["monthvol"],
-    },
-    {
-        "name": "Smart Meter Gas: Import (Today)",
-        "device_class": SensorDeviceClass.ENERGY,
-        "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:fire",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["day"],
-    },
-    {
-        "name": "Smart Meter Gas: Import (This week)",
-        "device_class": SensorDeviceClass.ENERGY,
-        "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:fire",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["week"],
-    },
-    {
-        "name": "Smart Meter Gas: Import (This month)",
-        "device_class": SensorDeviceClass.ENERGY,
-        "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-        "state_class": SensorStateClass.TOTAL_INCREASING,
-        "icon": "mdi:fire",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["month"],
-    },
-    {
-        "name": "Smart Meter Gas: Import Unit Rate",
-        "device_class": SensorDeviceClass.MONETARY,
-        "unit_of_measurement": "GBP/kWh",
-        "state_class": SensorStateClass.TOTAL,
-        "icon": "mdi:cash",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["price"]["unitrate"],
-        "ignore_zero_values": True,
-    },
-    {
-        "name": "Smart Meter Gas: Import Standing Charge",
-        "device_class": SensorDeviceClass.MONETARY,
-        "unit_of_measurement": "GBP",
-        "state_class": SensorStateClass.TOTAL,
-        "icon": "mdi:cash",
-        "func": lambda js: js["gasmeter"]["energy"]["import"]["price"][
-            "standingcharge"
-        ],
-        "ignore_zero_values": True,
-    },
-    # Removed June 2022 in IHD software update 1.8.13
-    # {
-    #   "name": "Smart Meter Gas: Power",
-    #   "device_class": SensorDeviceClass.POWER,
-    #   "unit_of_measurement": UnitOfPower.KILO_WATT,
-    #   "state_class": SensorStateClass.MEASUREMENT,
-    #   "icon": "mdi:fire",
-    #   "func": lambda js : js['gasmeter']['power']['value'],
-    # },
-    {
-        "name": "Smart Meter Gas: Cost (Today)",
-        "device_class": SensorDeviceClass.MONETARY,
-        "unit_of_measurement": "GBP",
-        "state_class": SensorStateClass.TOTAL,
-        "icon": "mdi:cash",
-        "meter_interval": MeterInterval.DAY,
-        "func": lambda js: round(
-            (js["gasmeter"]["energy"]["import"]["price"]["standingcharge"] or 0)
-            + (
-                (js["gasmeter"]["energy"]["import"]["day"] or 0)
-                * (js["gasmeter"]["energy"]["import"]["price"]["unitrate"] or 0)
-            ),
-            2,
-        ),
-    },
-]
+
+@dataclass(frozen=True, kw_only=True)
+class GlowDebugSensorEntityDescription(SensorEntityDescription):
+    """Describes a runtime counter, worked out from a device's message stats and groups."""
+
+    state_class: SensorStateClass | str | None = SensorStateClass.MEASUREMENT
+    value_fn: Callable[[Iterable, list], float | int | str | None]
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the Smart Meter sensors."""
+    startup = StartupStats(monotonic())
 
     # the config is defaulted to + which happens to mean we will subscribe to all devices
     device_mac = hass.data[DOMAIN][config_entry.entry_id][CONF_DEVICE_ID]
     topic_prefix = hass.data[DOMAIN][config_entry.entry_id][CONF_TOPIC_PREFIX] or DEFAULT_TOPIC_PREFIX
-    time_zone_electricity = hass.data[DOMAIN][config_entry.entry_id][
-        CONF_TIME_ZONE_ELECTRICITY
-    ]
-    time_zone_gas = hass.data[DOMAIN][config_entry.entry_id][CONF_TIME_ZONE_GAS]
+    time_zones = get_time_zones(hass, hass.data[DOMAIN][config_entry.entry_id])
+    heartbeat_minutes = hass.data[DOMAIN][config_entry.entry_id][CONF_HEARTBEAT_INTERVAL]
+    group_options = {
+        "heartbeat_interval": timedelta(minutes=heartbeat_minutes) if heartbeat_minutes else None,
+        "power_interval": hass.data[DOMAIN][config_entry.entry_id][CONF_POWER_INTERVAL],
+        "counter_interval": hass.data[DOMAIN][config_entry.entry_id][CONF_COUNTER_INTERVAL],
+        "stats": hass.data[DOMAIN][DATA_HUB].stats,
+        "startup": startup,
+        "coalesce_window": hass.data[DOMAIN][config_entry.entry_id][CONF_COALESCE_WINDOW],
+    }
+    buffer_store = Store(
+        hass, BUFFER_STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}.buffers"
+    )
+    group_options["snapshots"] = await buffer_store.async_load() or {}
+    statistics_import = hass.data[DOMAIN][config_entry.entry_id][CONF_STATISTICS_IMPORT]
+    if statistics_import and "recorder" not in hass.config.components:
+        _LOGGER.warning("The recorder is not loaded, long-term statistics will not be imported")
+        statistics_import = False
+    group_options["hourly_statistics"] = statistics_import
+    debug_sensors = hass.data[DOMAIN][config_entry.entry_id][CONF_DEBUG_SENSORS]
+    # The plausibility limits of each meter's counters, relative to the defaults.
+    counter_scales = {
+        KIND_ELECTRICITY: hass.data[DOMAIN][config_entry.entry_id][CONF_ELECTRICITY_MAX_POWER]
+        / DEFAULT_ELECTRICITY_MAX_POWER,
+        KIND_GAS: hass.data[DOMAIN][config_entry.entry_id][CONF_GAS_MAX_POWER]
+        / DEFAULT_GAS_MAX_POWER,
+    }
+    # Message kinds without selected sensors get no group and are ignored.
+    sensor_groups = {}
+    for kind, descriptions in SENSOR_GROUPS.items():
+        descriptions, sensor_keys = select_sensors(
+            scale_counter_rules(descriptions, counter_scales.get(kind, 1)),
+            hass.data[DOMAIN][config_entry.entry_id][CONF_SENSORS],
+        )
+        if sensor_keys:
+            sensor_groups[kind] = (descriptions, sensor_keys)
+    async_remove_unselected_entities(hass, config_entry, sensor_groups)
+
+    router = HildebrandGlowMqttRouter(
+        hass.data[DOMAIN][config_entry.entry_id][CONF_ALLOWED_DEVICES],
+        hass.data[DOMAIN][config_entry.entry_id][CONF_DENIED_DEVICES],
+        device_mac,
+    )
+    router.startup = startup
+    hass.data[DOMAIN][config_entry.entry_id][DATA_ROUTER] = router
 
-    deviceUpdateGroups = {}
+    @callback
+    def add_update_group(device_id: str, kind: str) -> HildebrandGlowMqttSensorUpdateGroup:
+        """Create the update group for a device's message kind."""
+        descriptions, sensor_keys = sensor_groups[kind]
+        return async_add_update_group(
+            router,
+            async_add_entities,
+            device_id,
+            kind,
+            descriptions,
+            time_zones.get(kind),
+            debug_sensors,
+            sensor_keys=sensor_keys,
+            **group_options,
+        )
+
+    # Re-create the groups that already have entities, without waiting for traffic.
+    for device_id, kind in async_get_registered_groups(hass, config_entry):
+        if router.is_allowed(device_id) and kind in sensor_groups:
+            startup.expected_entities += async_count_added_sensors(
+                hass, add_update_group(device_id, kind).all_sensors
+            )
 
     @callback
-    async def mqtt_message_received(message: ReceiveMessage):
-        """Handle received MQTT message."""
-        topic = message.topic
-        payload = message.payload
-        device_id = topic.split("/")[1]
-        if device_mac == DEFAULT_DEVICE_ID or device_id == device_mac:
-            updateGroups = await async_get_device_groups(
-                deviceUpdateGroups,
-                async_add_entities,
-                device_id,
-                time_zone_electricity,
-                time_zone_gas,
+    def mqtt_message_received(device_id: str, kind: str, parsed_data: dict) -> bool:
+        """Handle a decoded MQTT message, returning whether one of our groups took it."""
+        if startup.first_message is None:
+            startup.first_message = monotonic() - startup.started
+        if not router.is_allowed(device_id):
+            return False
+        updateGroup = router.get(device_id, kind)
+        if updateGroup is None:
+            if kind not in sensor_groups:
+                return False
+            if (held := router.removing.get(device_id)) is not None:
+                # The evicted entities still hold their unique ids; wait until they are gone.
+                held[kind] = parsed_data
+                return True
+            updateGroup = add_update_group(device_id, kind)
+        updateGroup.process_update(parsed_data)
+        return True
+
+    hub = hass.data[DOMAIN][DATA_HUB]
+    unregister = await hub.async_register(topic_prefix, device_mac, mqtt_message_received)
+
+    async def async_reconfigure() -> None:
+        """Apply a changed topic prefix, device filter or time zones to the live entities."""
+        nonlocal device_mac, topic_prefix, unregister
+        entry_data = hass.data[DOMAIN][config_entry.entry_id]
+        new_device_mac = entry_data[CONF_DEVICE_ID]
+        new_topic_prefix = entry_data[CONF_TOPIC_PREFIX] or DEFAULT_TOPIC_PREFIX
+        if (new_device_mac, new_topic_prefix) != (device_mac, topic_prefix):
+            # Register the new listener first, so a shared subscription is kept.
+            old_unregister = unregister
+            unregister = await hub.async_register(
+                new_topic_prefix, new_device_mac, mqtt_message_received
             )
-            _LOGGER.debug("Received message: %s", topic)
-            _LOGGER.debug("  Payload: %s", payload)
-            for updateGroup in updateGroups:
-                updateGroup.process_update(message)
+            old_unregister()
+            device_mac, topic_prefix = new_device_mac, new_topic_prefix
+        router.set_filters(
+            device_mac, entry_data[CONF_ALLOWED_DEVICES], entry_data[CONF_DENIED_DEVICES]
+        )
+        time_zones.update(get_time_zones(hass, entry_data))
+        for update_group in router.update_groups:
+            if update_group.available and not router.is_allowed(update_group.device_id):
+                _LOGGER.debug("%s is filtered out, marking unavailable", update_group.device_id)
+                update_group.set_available(False)
+            if update_group.kind in time_zones:
+                update_group.set_time_zone(time_zones[update_group.kind])
+
+    hass.data[DOMAIN][config_entry.entry_id][DATA_RECONFIGURE] = async_reconfigure
+
+    @callback
+    def async_unload() -> None:
+        """Stop listening and drop the states waiting to be written."""
+        unregister()
+        router.removing.clear()
+        for update_group in router.update_groups:
+            update_group.async_shutdown()
+
+    config_entry.async_on_unload(async_unload)
+
+    @callback
+    def buffer_snapshot() -> dict:
+        """Return the rolling window and consumption buffers of every device."""
+        snapshots: dict[str, dict] = {}
+        for update_group in router.update_groups:
+            if snapshot := update_group.snapshot():
+                snapshots.setdefault(update_group.device_id, {}).update(snapshot)
+        return snapshots
+
+    @callback
+    def async_save_buffers(*_) -> None:
+        """Save the buffers, flushed at the latest when Home Assistant stops."""
+        buffer_store.async_delay_save(buffer_snapshot)
+
+    config_entry.async_on_unload(async_save_buffers)
+    config_entry.async_on_unload(
+        async_track_time_interval(hass, async_save_buffers, BUFFER_SAVE_INTERVAL)
+    )
+    config_entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_save_buffers)
+    )
+
+    if statistics_import:
+
+        async def async_import_statistics(now: datetime) -> None:
+            """Import the hours that closed since the last import."""
+            for update_group in list(router.update_groups):
+                try:
+                    await update_group.async_import_statistics(hass, now)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception(
+                        "Error importing %s statistics of %s", update_group.kind, update_group.device_id
+                    )
+
+        config_entry.async_on_unload(
+            async_track_utc_time_change(
+                hass, async_import_statistics, minute=STATISTICS_IMPORT_MINUTE, second=0
+            )
+        )
+
+    stale_timeout = hass.data[DOMAIN][config_entry.entry_id][CONF_STALE_TIMEOUT]
+    stale_action = hass.data[DOMAIN][config_entry.entry_id][CONF_STALE_ACTION]
+    if stale_timeout:
+
+        async def async_remove_evicted(device_id: str, entities: list[SensorEntity]) -> None:
+            """Remove an evicted device's entities, then take the messages held back meanwhile."""
+            await asyncio.gather(
+                *(entity.async_remove() for entity in entities), return_exceptions=True
+            )
+            for kind, parsed_data in router.removing.pop(device_id, {}).items():
+                mqtt_message_received(device_id, kind, parsed_data)
+
+        @callback
+        def async_check_stale_devices(now: datetime) -> None:
+            """Mark unavailable, or evict, devices that have gone silent."""
+            for device in router.stale_devices(monotonic() - stale_timeout * 60):
+                if stale_action == STALE_ACTION_EVICT:
+                    _LOGGER.debug("Evicting silent device %s", device.device_id)
+                    entities = [
+                        entity for entity in router.evict(device.device_id) if entity.hass is not None
+                    ]
+                    if entities:
+                        router.removing[device.device_id] = {}
+                        hass.async_create_task(async_remove_evicted(device.device_id, entities))
+                    group_options["stats"].forget_device(device.device_id)
+                else:
+                    for updateGroup in router.device_groups(device.device_id):
+                        if updateGroup.available:
+                            _LOGGER.debug(
+                                "No %s from %s, marking unavailable", updateGroup.kind, device.device_id
+                            )
+                            updateGroup.set_available(False)
+
+        config_entry.async_on_unload(
+            async_track_time_interval(hass, async_check_stale_devices, STALE_CHECK_INTERVAL)
+        )
+
+
+def get_time_zones(hass, entry_data: dict) -> dict[str, tzinfo]:
+    """Return the configured time zone of each meter, by message kind."""
+    return {
+        KIND_ELECTRICITY: dt_util.get_time_zone(
+            entry_data[CONF_TIME_ZONE_ELECTRICITY] or hass.config.time_zone
+        ),
+        KIND_GAS: dt_util.get_time_zone(entry_data[CONF_TIME_ZONE_GAS] or hass.config.time_zone),
+    }
+
+
+@callback
+def async_get_registered_device_ids(hass, config_entry) -> list[str]:
+    """Return the device ids, as used in the topics, of the entry's registered devices.
+
+    The device registry stores mac connections formatted as
+    12:34:56:78:90:ab; the topics and unique ids use 1234567890AB.
+    """
+    device_registry = dr.async_get(hass)
+    return [
+        connection.replace(":", "").upper()
+        for device in dr.async_entries_for_config_entry(device_registry, config_entry.entry_id)
+        for connection_type, connection in device.connections
+        if connection_type == dr.CONNECTION_NETWORK_MAC
+    ]
+
 
-    data_topic = f"{topic_prefix}/#"
+@callback
+def async_count_added_sensors(hass, sensors) -> int:
+    """Return how many of the sensors the platform will add, restoring their state.
 
-    await mqtt.async_subscribe(hass, data_topic, mqtt_message_received, 1)
+    Sensors disabled in the registry, or new ones disabled by default, are
+    never added.
+    """
+    entity_registry = er.async_get(hass)
+    count = 0
+    for sensor in sensors:
+        entity_id = entity_registry.async_get_entity_id("sensor", DOMAIN, sensor.unique_id)
+        if entity_id is None:
+            count += sensor.entity_registry_enabled_default
+        else:
+            count += not entity_registry.async_get(entity_id).disabled
+    return count
 
 
-async def async_get_device_groups(
-    deviceUpdateGroups,
+@callback
+def async_get_registered_groups(hass, config_entry) -> list[tuple[str, str]]:
+    """Return the (device id, kind) of each group with entities in the registry."""
+    entity_registry = er.async_get(hass)
+    unique_ids = {
+        entity.unique_id
+        for entity in er.async_entries_for_config_entry(entity_registry, config_entry.entry_id)
+    }
+    return [
+        (device_id, kind)
+        for device_id in async_get_registered_device_ids(hass, config_entry)
+        for kind, descriptions in SENSOR_GROUPS.items()
+        if any(
+            slugify(device_id + "_" + description.name) in unique_ids
+            for description in descriptions
+        )
+    ]
+
+
+@callback
+def async_remove_unselected_entities(hass, config_entry, sensor_groups: dict) -> None:
+    """Remove the registry entries of the sensors that are no longer selected."""
+    unselected_names = [
+        description.name
+        for kind, descriptions in SENSOR_GROUPS.items()
+        for description in descriptions
+        if kind not in sensor_groups or description.key not in sensor_groups[kind][1]
+    ]
+    if not unselected_names:
+        return
+    unique_ids = {
+        slugify(device_id + "_" + name)
+        for device_id in async_get_registered_device_ids(hass, config_entry)
+        for name in unselected_names
+    }
+    entity_registry = er.async_get(hass)
+    for entity in er.async_entries_for_config_entry(entity_registry, config_entry.entry_id):
+        if entity.unique_id in unique_ids:
+            _LOGGER.debug("Removing unselected sensor %s", entity.entity_id)
+            entity_registry.async_remove(entity.entity_id)
+
+
+@callback
+def async_add_update_group(
+    router,
     async_add_entities,
     device_id,
-    time_zone_electricity,
-    time_zone_gas,
-):
-    # add to update groups if not already there
-    if device_id not in deviceUpdateGroups:
+    kind,
+    descriptions,
+    time_zone,
+    debug_sensors=False,
+    **group_options,
+) -> HildebrandGlowMqttSensorUpdateGroup:
+    """Create the update group for a device's message kind and add its entities.
+
+    Groups are only created for the kinds a device actually publishes, so an
+    electricity-only site never gets gas entities.
+    """
+    entities = []
+    device = router.devices.get(device_id)
+    if device is None:
         _LOGGER.debug("New device found: %s", device_id)
-        groups = [
-            HildebrandGlowMqttSensorUpdateGroup(device_id, "STATE", STATE_SENSORS),
-            HildebrandGlowMqttSensorUpdateGroup(
-                device_id,
-                "electricitymeter",
-                ELECTRICITY_SENSORS,
-                time_zone_electricity,
-            ),
-            HildebrandGlowMqttSensorUpdateGroup(
-                device_id, "gasmeter", GAS_SENSORS, time_zone_gas
-            ),
-        ]
-        async_add_entities(
-            [
-                sensorEntity
-                for updateGroup in groups
-                for sensorEntity in updateGroup.all_sensors
-            ],
-            # True
+        device = router.add_device(device_id)
+        if debug_sensors and group_options.get("stats") is not None:
+            device.debug_sensors = [
+                HildebrandGlowMqttDebugSensor(device, router, group_options["stats"], description)
+                for description in DEBUG_SENSORS
+            ]
+            entities.extend(device.debug_sensors)
+    _LOGGER.debug("New %s group for %s", kind, device_id)
+    updateGroup = HildebrandGlowMqttSensorUpdateGroup(
+        device_id, kind, descriptions, time_zone, device=device, **group_options
+    )
+    router.register(updateGroup)
+    entities.extend(updateGroup.all_sensors)
+    async_add_entities(entities)
+    return updateGroup
+
+
+class GlowDevice:
+    """Per-device state shared by all of a device's update groups and entities."""
+
+    __slots__ = ("debug_sensors", "device_id", "device_info", "last_seen", "state_attributes")
+
+    def __init__(self, device_id: str) -> None:
+        """Initialize the device."""
+        self.device_id = device_id
+        self.device_info = DeviceInfo(
+            connections={("mac", device_id)},
+            manufacturer="Hildebrand Technology Limited",
+            model="Glow Smart Meter IHD",
+            name=f"Glow Smart Meter {device_id}",
         )
-        deviceUpdateGroups[device_id] = groups
+        # The extra state attributes of the device's sensors, only ever replaced.
+        self.state_attributes = {ATTR_DEVICE_ID: device_id}
+        self.last_seen = monotonic()
+        self.debug_sensors: list[HildebrandGlowMqttDebugSensor] = []
+
+
+class HildebrandGlowMqttRouter:
+    """Look up the update group for a device id and message kind."""
+
+    def __init__(
+        self, allowed_devices=None, denied_devices=None, device_id: str = DEFAULT_DEVICE_ID
+    ) -> None:
+        """Initialize the router.
+
+        allowed_devices, if given, is the only set of device ids that get
+        entities; denied_devices are always ignored. device_id is the
+        configured device, or + for all of them.
+        """
+        self._handlers: dict[tuple[str, str], HildebrandGlowMqttSensorUpdateGroup] = {}
+        # The same groups by device id and kind, so a device's groups are found without a scan.
+        self._device_handlers: dict[str, dict[str, HildebrandGlowMqttSensorUpdateGroup]] = {}
+        self.set_filters(device_id, allowed_devices, denied_devices)
+        self.devices: dict[str, GlowDevice] = {}
+        # The latest message of each kind from evicted devices whose entities are being removed.
+        self.removing: dict[str, dict[str, dict]] = {}
+        self.startup: StartupStats | None = None
 
-    return deviceUpdateGroups[device_id]
+    def set_filters(self, device_id: str, allowed_devices=None, denied_devices=None) -> None:
+        """Replace the configured device and the allow and deny lists."""
+        self._device_id = device_id
+        self._allowed_devices = allowed_devices
+        self._denied_devices = denied_devices or set()
+
+    def is_allowed(self, device_id: str) -> bool:
+        """Return True if the configured device and the allow and deny lists let a device through."""
+        if self._device_id not in (DEFAULT_DEVICE_ID, device_id) or device_id in self._denied_devices:
+            return False
+        return self._allowed_devices is None or device_id in self._allowed_devices
+
+    def add_device(self, device_id: str) -> GlowDevice:
+        """Add a device."""
+        device = self.devices[device_id] = GlowDevice(device_id)
+        return device
+
+    def register(self, update_group: HildebrandGlowMqttSensorUpdateGroup) -> None:
+        """Register an update group for its device and kind."""
+        self._handlers[(update_group.device_id, update_group.kind)] = update_group
+        self._device_handlers.setdefault(update_group.device_id, {})[update_group.kind] = update_group
+        if update_group.device_id not in self.devices:
+            self.add_device(update_group.device_id)
+
+    def evict(self, device_id: str) -> list[SensorEntity]:
+        """Forget a device, shutting its groups down, and return the entities it had."""
+        device = self.devices.pop(device_id, None)
+        entities: list[SensorEntity] = list(device.debug_sensors) if device else []
+        for kind, update_group in self._device_handlers.pop(device_id, {}).items():
+            del self._handlers[(device_id, kind)]
+            update_group.async_shutdown()
+            entities.extend(update_group.all_sensors)
+        return entities
+
+    def stale_devices(self, seen_before: float) -> list[GlowDevice]:
+        """Return the devices that have not published since seen_before."""
+        return [device for device in self.devices.values() if device.last_seen < seen_before]
+
+    def get(self, device_id: str, kind: str) -> HildebrandGlowMqttSensorUpdateGroup | None:
+        """Return the update group for a device and kind."""
+        return self._handlers.get((device_id, kind))
+
+    def device_groups(self, device_id: str) -> list[HildebrandGlowMqttSensorUpdateGroup]:
+        """Return the update groups of a device."""
+        return list(self._device_handlers.get(device_id, {}).values())
+
+    @property
+    def update_groups(self) -> Iterable[HildebrandGlowMqttSensorUpdateGroup]:
+        """Return all registered update groups."""
+        return self._handlers.values()
+
+
+_EXTRACTION_PLANS: dict[tuple[str, ...], ExtractionPlan] = {}
+
+
+def get_extraction_plan(descriptions: Iterable[GlowSensorEntityDescription]) -> ExtractionPlan:
+    """Return the compiled plan for a sensor table, shared by every device."""
+    key = tuple(description.key for description in descriptions)
+    plan = _EXTRACTION_PLANS.get(key)
+    if plan is None:
+        plan = _EXTRACTION_PLANS[key] = ExtractionPlan(
+            fields=[
+                (description.key, description.path)
+                for description in descriptions
+                if description.path is not None
+            ]
+        )
+    return plan
 
 
 class HildebrandGlowMqttSensorUpdateGroup:
     """Representation of Hildebrand Glow MQTT Meter Sensors that all get updated together."""
 
     def __init__(
-        self, device_id: str, topic_regex: str, meters: Iterable, time_zone: str | None = None
+        self,
+        device_id: str,
+        kind: str,
+        descriptions: Iterable[GlowSensorEntityDescription],
+        time_zone: tzinfo | None = None,
+        heartbeat_interval: timedelta | None = None,
+        power_interval: float = 0,
+        counter_interval: float = 0,
+        stats: GlowStats | None = None,
+        startup: StartupStats | None = None,
+        device: GlowDevice | None = None,
+        coalesce_window: float = 0,
+        snapshots: dict | None = None,
+        hourly_statistics: bool = False,
+        sensor_keys: Collection[str] | None = None,
     ) -> None:
-        """Initialize the sensor collection."""
-        self._topic_regex = re.compile(topic_regex)
+        """Initialize the sensor collection.
+
+        power_interval and counter_interval are the minimum number of
+        seconds between publishes of the time-weighted power sensors and
+        of the cumulative and interval counters; 0 publishes every sample.
+        State writes are batched and flushed once per message, or once per
+        coalesce_window seconds when that is set. snapshots are the saved
+        rolling window, consumption and cost buffers of all devices, by
+        device id.
+        With hourly_statistics the sensors marked with a statistic are also
+        accumulated into hourly long-term statistics.
+        Only the sensors in sensor_keys, all when None, get an entity; the
+        other descriptions are only extracted and computed for them.
+        """
+        self.device_id = device_id
+        self.kind = kind
+        self.device = device or GlowDevice(device_id)
+        self.available = True
+        self._stats = stats
+        self._message_stats = stats.message_stats(device_id, kind) if stats else None
+        self._plan = get_extraction_plan(descriptions)
+        # The paths the device's last payload lacked, None before the first one.
+        self._missing: list[FieldPath] | None = None
+        # One bound method for all of the group's sensors.
+        stage_write = self.stage_write
         self._sensors = [
-            HildebrandGlowMqttSensor(device_id=device_id, time_zone=time_zone, **meter)
-            for meter in meters
+            HildebrandGlowMqttSensor(
+                self.device,
+                description,
+                heartbeat_interval=heartbeat_interval,
+                publish_interval=self._publish_interval(
+                    description, power_interval, counter_interval
+                ),
+                startup=startup,
+                stage_write=stage_write,
+            )
+            for description in descriptions
+            if sensor_keys is None or description.key in sensor_keys
         ]
+        self._coalesce_window = coalesce_window
+        self._staged: dict[HildebrandGlowMqttSensor, None] = {}
+        self._flush_handle: asyncio.Handle | asyncio.TimerHandle | None = None
+        self._descriptions = {description.key: description for description in descriptions}
+        self._period_trackers = {
+            description.meter_interval: get_period_tracker(time_zone, description.meter_interval)
+            for description in descriptions
+            if description.meter_interval and time_zone is not None
+        }
+        self._rolling_sensors = [
+            (description.key, *description.rolling)
+            for description in descriptions
+            if description.rolling is not None
+        ]
+        rolling_windows: dict[str, set[int]] = {}
+        for _, source, minutes, _ in self._rolling_sensors:
+            rolling_windows.setdefault(source, set()).add(minutes)
+        self._rolling = {
+            source: RollingWindowStats(tuple(windows)) for source, windows in rolling_windows.items()
+        }
+        self._bucket_sensors = [
+            (description.key, *description.buckets)
+            for description in descriptions
+            if description.buckets is not None
+        ]
+        self._buckets = {
+            source: ConsumptionBuckets(time_zone or dt_util.UTC)
+            for _, source, _ in self._bucket_sensors
+        }
+        self._cost_sensors = [
+            (description.key, f"{description.cost[1].cumulative}_cost", description.cost[0])
+            for description in descriptions
+            if description.cost is not None
+        ]
+        self._cost_sources = {
+            f"{description.cost[1].cumulative}_cost": description.cost[1]
+            for description in descriptions
+            if description.cost is not None
+        }
+        self._costs = {
+            key: CostEngine(time_zone or dt_util.UTC) for key in self._cost_sources
+        }
+        self._ignore_zero_values = {
+            description.key for description in descriptions if description.ignore_zero_values
+        }
+        self._validators = {
+            description.key: CounterValidator(description.counter_rules)
+            for description in descriptions
+            if description.counter_rules is not None
+        }
+        statistics = {
+            description.key: description.statistic
+            for description in descriptions
+            if description.statistic is not None
+            and (sensor_keys is None or description.key in sensor_keys)
+        }
+        self._hourly = HourlyStatistics(statistics) if hourly_statistics and statistics else None
+        device_snapshots = (snapshots or {}).get(device_id, {})
+        if self._hourly is not None and "statistics" in device_snapshots:
+            try:
+                self._hourly.restore(device_snapshots["statistics"])
+            except (KeyError, TypeError, ValueError):
+                _LOGGER.warning("Discarding invalid %s statistics snapshot of %s", kind, device_id)
+        buffers = self._rolling | self._buckets | self._costs
+        buffers.update(
+            (f"{key}_validation", validator) for key, validator in self._validators.items()
+        )
+        for source, buffer in buffers.items():
+            if source in device_snapshots:
+                try:
+                    buffer.restore(device_snapshots[source])
+                except (KeyError, TypeError, ValueError):
+                    _LOGGER.warning("Discarding invalid %s snapshot of %s", source, device_id)
+
+    def _publish_interval(
+        self,
+        description: GlowSensorEntityDescription,
+        power_interval: float,
+        counter_interval: float,
+    ) -> float:
+        """Return the minimum publish interval for a sensor of this group."""
+        if self.kind == KIND_STATE:
+            return 0
+        if description.time_weighted or description.rolling is not None:
+            return power_interval
+        if description.state_class in (SensorStateClass.TOTAL, SensorStateClass.TOTAL_INCREASING):
+            return counter_interval
+        return 0
+
+    @callback
+    def stage_write(self, sensor: HildebrandGlowMqttSensor) -> None:
+        """Queue a sensor's state for the next flush.
+
+        A sensor staged several times before the flush is written once,
+        with its latest value.
+        """
+        self._staged[sensor] = None
+        if self._flush_handle is None:
+            if self._coalesce_window:
+                self._flush_handle = sensor.hass.loop.call_later(
+                    self._coalesce_window, self._async_flush
+                )
+            else:
+                self._flush_handle = sensor.hass.loop.call_soon(self._async_flush)
+
+    @callback
+    def _async_flush(self) -> None:
+        """Write the staged states."""
+        self._flush_handle = None
+        staged, self._staged = self._staged, {}
+        written = False
+        for sensor in staged:
+            if sensor.flush_write():
+                written = True
+        if self._message_stats is not None:
+            if written:
+                self._message_stats.latency.written(time())
+            else:
+                self._message_stats.latency.discard()
+
+    @callback
+    def set_available(self, available: bool) -> None:
+        """Mark all of the group's sensors available or unavailable."""
+        self.available = available
+        for sensor in self._sensors:
+            sensor.set_available(available)
+
+    @callback
+    def set_time_zone(self, time_zone: tzinfo) -> None:
+        """Move the meter to another time zone, keeping its sensors and buffers."""
+        self._period_trackers = {
+            description.meter_interval: get_period_tracker(time_zone, description.meter_interval)
+            for description in self._descriptions.values()
+            if description.meter_interval
+        }
+        for buffer in (*self._buckets.values(), *self._costs.values()):
+            buffer.set_time_zone(time_zone)
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Drop the staged states, the entities are being removed."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._staged = {}
 
-    def process_update(self, message: ReceiveMessage) -> None:
-        """Process an update from the MQTT broker."""
-        topic = message.topic
-        payload = message.payload
-        if self._topic_regex.search(topic):
-            _LOGGER.debug("Matched on %s", self._topic_regex.pattern)
-            parsed_data = json.loads(payload)
-            for sensor in self._sensors:
-                sensor.process_update(parsed_data)
+    def process_update(self, parsed_data: dict) -> None:
+        """Process a decoded update from the MQTT broker."""
+        _LOGGER.debug("Matched on %s", self.kind)
+        self.device.last_seen = monotonic()
+        if not self.available:
+            self.set_available(True)
+        if self._stats is not None and self._stats.timing_enabled:
+            started = perf_counter_ns()
+            values = self._extract(parsed_data)
+            self._message_stats.extract.add(perf_counter_ns() - started)
+        else:
+            values = self._extract(parsed_data)
+        period_starts = {}
+        message_datetime = None
+        if (
+            self._message_stats is not None
+            or self._period_trackers
+            or self._validators
+            or self._rolling
+            or self._buckets
+            or self._costs
+            or self._hourly
+        ):
+            try:
+                message_datetime = get_message_datetime(parsed_data)
+            except ValueError:
+                _LOGGER.debug(
+                    "Message for %s on %s has no valid timestamp", self.kind, self.device_id
+                )
+            else:
+                period_starts = {
+                    meter_interval: tracker.period_start(message_datetime)
+                    for meter_interval, tracker in self._period_trackers.items()
+                }
+                if self._message_stats is not None and self._stats.received_time is not None:
+                    self._message_stats.latency.received(
+                        message_datetime.timestamp(), self._stats.received_time
+                    )
+        if self._validators:
+            message_datetime = message_datetime or dt_util.utcnow()
+            self._validate(values, message_datetime.timestamp())
+        if self._rolling or self._buckets or self._costs or self._hourly:
+            message_datetime = message_datetime or dt_util.utcnow()
+            timestamp = message_datetime.timestamp()
+            self._update_rolling(values, timestamp)
+            self._update_buckets(values, timestamp)
+            self._update_costs(values, message_datetime)
+            if self._hourly is not None:
+                self._hourly.add(
+                    timestamp, {key: self._reading(values, key) for key in self._hourly.metrics}
+                )
+        for sensor in self._sensors:
+            description = sensor.entity_description
+            value = values[description.key]
+            if value is MISSING:
+                continue
+            try:
+                sensor.process_update(value, period_starts.get(description.meter_interval))
+            except Exception:  # pylint: disable=broad-except
+                sensor.errors += 1
+                _LOGGER.log(
+                    logging.WARNING if sensor.errors == 1 else logging.DEBUG,
+                    "Error updating %s",
+                    sensor.unique_id,
+                    exc_info=True,
+                )
+        if self._message_stats is not None and self._flush_handle is None:
+            self._message_stats.latency.discard()
+
+    def _extract(self, parsed_data: dict) -> dict:
+        """Extract the sensor values, logging when the paths the payload lacks change."""
+        values, missing = self._plan.extract(parsed_data)
+        if missing != self._missing:
+            if self._missing is not None:
+                _LOGGER.info(
+                    "The %s payload of %s changed shape, now missing: %s",
+                    self.kind,
+                    self.device_id,
+                    ", ".join("/".join(path) for path in missing) or "nothing",
+                )
+            elif missing:
+                _LOGGER.debug(
+                    "The %s payload of %s is missing %s",
+                    self.kind,
+                    self.device_id,
+                    ", ".join("/".join(path) for path in missing),
+                )
+            self._missing = missing
+        return values
+
+    def _sample(self, values: dict, key: str):
+        """Return a sensor's value with its zero and error response filters applied.
+
+        Ignored zeros are MISSING, error responses None.
+        """
+        value = values[key]
+        if value is MISSING or (value == 0 and key in self._ignore_zero_values):
+            return MISSING
+        if value in self._descriptions[key].error_response_values:
+            return None
+        return value
+
+    def _reading(self, values: dict, key: str):
+        """Return a sensor's filtered value, None when there is none."""
+        value = self._sample(values, key)
+        return None if value is MISSING else value
+
+    def _validate(self, values: dict, timestamp: float) -> None:
+        """Drop the counter readings that break their rules, counting them."""
+        for key, validator in self._validators.items():
+            value = self._sample(values, key)
+            if value is MISSING or value is None:
+                continue
+            power = validator.rules.power
+            reason = validator.check(
+                timestamp, value, None if power is None else self._reading(values, power)
+            )
+            if reason is not None:
+                values[key] = MISSING
+                _LOGGER.log(
+                    logging.WARNING if validator.total_rejected == 1 else logging.DEBUG,
+                    "Rejected %s reading %s of %s: %s",
+                    key,
+                    value,
+                    self.device_id,
+                    reason,
+                )
+
+    def _update_rolling(self, values: dict, timestamp: float) -> None:
+        """Add the sampled values to their rolling windows and fill in the window sensors."""
+        for source, buffer in self._rolling.items():
+            if (value := self._sample(values, source)) is not MISSING:
+                buffer.add(timestamp, value)
+        for key, source, minutes, stat in self._rolling_sensors:
+            if values[source] is MISSING:
+                values[key] = MISSING
+            elif (window := self._rolling[source].window(minutes)) is None:
+                values[key] = None
+            else:
+                value = window[STATS.index(stat)]
+                if stat == STAT_PEAK_TIME:
+                    values[key] = dt_util.utc_from_timestamp(value)
+                else:
+                    values[key] = round(value, 3)
+
+    def _update_buckets(self, values: dict, timestamp: float) -> None:
+        """Add the cumulative readings to their buckets and fill in the bucket sensors."""
+        for source, buffer in self._buckets.items():
+            if (value := self._sample(values, source)) not in (MISSING, None):
+                buffer.add(timestamp, value)
+        for key, source, period in self._bucket_sensors:
+            half_hour, hour = self._buckets[source].current(timestamp)
+            values[key] = half_hour if period == BUCKET_HALF_HOUR else hour
+
+    def _update_costs(self, values: dict, message_datetime: datetime) -> None:
+        """Price the readings and fill in the cost sensors."""
+        for key, engine in self._costs.items():
+            sources = self._cost_sources[key]
+            engine.add(
+                message_datetime,
+                self._reading(values, sources.cumulative),
+                self._reading(values, sources.unit_rate),
+                self._reading(values, sources.standing_charge),
+                {interval: self._reading(values, usage) for interval, usage in sources.usage},
+            )
+        for key, engine_key, interval in self._cost_sensors:
+            total = self._costs[engine_key].totals[interval]
+            values[key] = None if total is None else round(total, 2)
+
+    @property
+    def consumption_buckets(self) -> ConsumptionBuckets | None:
+        """Return the half-hourly consumption of the group's meter."""
+        return next(iter(self._buckets.values()), None)
+
+    def snapshot(self) -> dict[str, dict]:
+        """Return the group's rolling window, consumption and cost buffers, by key.
+
+        The hourly statistics, if kept, are under "statistics".
+        """
+        snapshot = {
+            source: buffer.snapshot()
+            for source, buffer in (self._rolling | self._buckets | self._costs).items()
+        }
+        snapshot.update(
+            (f"{key}_validation", validator.snapshot())
+            for key, validator in self._validators.items()
+        )
+        if self._hourly is not None:
+            snapshot["statistics"] = self._hourly.snapshot()
+        return snapshot
+
+    def _statistic_id(self, key: str) -> str:
+        """Return the external statistic id of a sensor."""
+        return f"{DOMAIN}:{slugify(self.device_id + '_' + key)}"
+
+    async def async_import_statistics(self, hass, now: datetime) -> None:
+        """Import the closed hours of the group's statistics into the recorder.
+
+        The first import carries the running sums on from the last ones
+        the recorder has, so they survive a lost snapshot. Hours stay
+        pending until their import is accepted.
+        """
+        if self._hourly is None:
+            return
+        self._hourly.close_before(now.timestamp())
+        if not self._hourly.seeded:
+            for key, statistic in self._hourly.metrics.items():
+                if statistic != STATISTIC_SUM:
+                    continue
+                statistic_id = self._statistic_id(key)
+                last = await get_instance(hass).async_add_executor_job(
+                    get_last_statistics, hass, 1, statistic_id, True, {"sum"}
+                )
+                if last.get(statistic_id):
+                    self._hourly.seed(key, last[statistic_id][0]["sum"] or 0)
+            self._hourly.seeded = True
+        for key, rows in self._hourly.pending_rows().items():
+            description = self._descriptions[key]
+            async_add_external_statistics(
+                hass,
+                StatisticMetaData(
+                    has_mean=self._hourly.metrics[key] == STATISTIC_MEAN,
+                    has_sum=self._hourly.metrics[key] == STATISTIC_SUM,
+                    name=f"{description.name} ({self.device_id})",
+                    source=DOMAIN,
+                    statistic_id=self._statistic_id(key),
+                    unit_of_measurement=description.native_unit_of_measurement,
+                ),
+                [
+                    StatisticData(
+                        start=dt_util.utc_from_timestamp(row["start"]),
+                        **{field: value for field, value in row.items() if field != "start"},
+                    )
+                    for row in rows
+                ],
+            )
+            # Kept until here, so hours whose import raised are tried again next time.
+            self._hourly.imported(key, len(rows))
 
     @property
     def all_sensors(self) -> Iterable[HildebrandGlowMqttSensor]:
         """Return all meters."""
         return self._sensors
 
+    @property
+    def state_writes(self) -> int:
+        """Return the number of state writes issued by the group's sensors."""
+        return sum(sensor.state_writes for sensor in self._sensors)
 
-class HildebrandGlowMqttSensor(SensorEntity):
-    """Representation of a room sensor that is updated via MQTT."""
+    @property
+    def suppressed_writes(self) -> int:
+        """Return the number of unchanged state writes that were skipped."""
+        return sum(sensor.suppressed_writes for sensor in self._sensors)
+
+    @property
+    def errors(self) -> dict[str, int]:
+        """Return the number of failed updates by sensor, for sensors that failed."""
+        return {sensor.unique_id: sensor.errors for sensor in self._sensors if sensor.errors}
+
+    @property
+    def rejected(self) -> dict[str, dict[str, int]]:
+        """Return the rejected readings by sensor and reason, for sensors with rejections."""
+        return {
+            key: dict(validator.rejected)
+            for key, validator in self._validators.items()
+            if validator.total_rejected
+        }
+
+
+class HildebrandGlowMqttSensor(RestoreSensor):
+    """Representation of a room sensor that is updated via MQTT.
+
+    The definition comes from the entity description and the device info
+    from the device, both shared; the sensor itself only keeps its state
+    and write bookkeeping, in slots.
+    """
+
+    __slots__ = (
+        "_heartbeat_interval",
+        "_last_publish_time",
+        "_last_reset_reported",
+        "_last_write_time",
+        "_publish_interval",
+        "_stage_write",
+        "_startup",
+        "_window",
+        "_written_state",
+        "errors",
+        "state_writes",
+        "suppressed_writes",
+    )
+
+    _attr_should_poll = False
+    entity_description: GlowSensorEntityDescription
 
     def __init__(
         self,
-        device_id,
-        time_zone,
-        name,
-        icon,
-        device_class,
-        unit_of_measurement,
-        state_class,
-        func,
-        entity_category=None,
-        ignore_zero_values=False,
-        error_response_values=None,
-        meter_interval: MeterInterval | None = None,
+        device: GlowDevice,
+        description: GlowSensorEntityDescription,
+        heartbeat_interval: timedelta | None = None,
+        publish_interval: float = 0,
+        startup: StartupStats | None = None,
+        stage_write: Callable[[HildebrandGlowMqttSensor], None] | None = None,
     ) -> None:
         """Initialize the sensor."""
-        self._device_id = device_id
-        self._time_zone = time_zone
-        self._attr_name = name
-        self._attr_icon = icon
-        if device_class:
-            self._attr_device_class = device_class
-        if unit_of_measurement:
-            self._attr_native_unit_of_measurement = unit_of_measurement
-        if state_class:
-            self._attr_state_class = state_class
-        self._attr_unique_id = slugify(device_id + "_" + name)
-        self._attr_should_poll = False
-        self._func = func
-        self._attr_entity_category = entity_category
-        self._ignore_zero_values = ignore_zero_values
-        self._error_response_values = error_response_values
-        self._meter_interval = meter_interval
-        self._attr_device_info = DeviceInfo(
-            connections={("mac", device_id)},
-            manufacturer="Hildebrand Technology Limited",
-            model="Glow Smart Meter IHD",
-            name=f"Glow Smart Meter {device_id}",
-        )
+        self.entity_description = description
+        self._attr_unique_id = slugify(device.device_id + "_" + description.name)
+        self._attr_device_info = device.device_info
+        self._attr_extra_state_attributes = device.state_attributes
         self._attr_native_value = None
-        if state_class == SensorStateClass.TOTAL and meter_interval:
+        self._last_reset_reported = bool(
+            description.state_class == SensorStateClass.TOTAL and description.meter_interval
+        )
+        if self._last_reset_reported:
             self._attr_last_reset = None
-            self._last_reset_reported = True
-
-    @staticmethod
-    def determine_last_reset(
-        message_datetime: datetime, meter_timezone: tzinfo, meter_interval: MeterInterval
-    ) -> datetime:
-        """Return midnight of the meter's reset interval in UTC."""
-        meter_datetime = message_datetime.astimezone(meter_timezone)
-        meter_midnight = datetime.combine(
-            meter_datetime.date(), time.min, meter_datetime.tzinfo
+        self._heartbeat_interval = (
+            heartbeat_interval.total_seconds() if heartbeat_interval else None
         )
-        if meter_interval == MeterInterval.DAY:
-            last_reset = meter_midnight
-        elif meter_interval == MeterInterval.WEEK:
-            last_reset = meter_midnight - timedelta(days=meter_midnight.weekday())
-        elif meter_interval == MeterInterval.MONTH:
-            last_reset = meter_midnight.replace(day=1)
-        elif meter_interval == MeterInterval.YEAR:
-            last_reset = meter_midnight.replace(day=1, month=1)
-        return last_reset.astimezone(ZoneInfo("UTC"))
-
-    @staticmethod
-    def get_message_datetime(mqtt_data) -> datetime:
-        """Return the message timestamp as a datetime."""
-        timestamp = (
-            mqtt_data.get("timestamp")
-            or mqtt_data.get("electricitymeter", {}).get("timestamp")
-            or mqtt_data.get("gasmeter", {}).get("timestamp")
+        self._written_state = None
+        self._last_write_time = 0.0
+        self._publish_interval = publish_interval
+        self._last_publish_time: float | None = None
+        self._window = (
+            TimeWeightedWindow() if description.time_weighted and publish_interval else None
         )
-        try:
-            return datetime.fromisoformat(timestamp)
-        except TypeError | ValueError:
-            raise ValueError("Valid timestamp not present in MQTT data.")
-
-    def process_update(self, mqtt_data) -> None:
-        """Update the state of the sensor."""
-        new_value = self._func(mqtt_data)
-        if self._ignore_zero_values and new_value == 0:
+        self.state_writes = 0
+        self.suppressed_writes = 0
+        self.errors = 0
+        self._startup = startup
+        self._stage_write = stage_write
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last native value and last_reset."""
+        await super().async_added_to_hass()
+        if self._attr_native_value is None:
+            if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+                self._attr_native_value = last_sensor_data.native_value
+            if (
+                self._last_reset_reported
+                and (last_state := await self.async_get_last_state()) is not None
+                and (last_reset := last_state.attributes.get(ATTR_LAST_RESET))
+            ):
+                self._attr_last_reset = dt_util.parse_datetime(last_reset)
+            # The platform writes the restored state once we return.
+            self._written_state = (
+                self._attr_native_value,
+                getattr(self, "_attr_last_reset", None),
+                self.available,
+            )
+            self._last_write_time = monotonic()
+        if self._startup is not None:
+            self._startup.entity_restored(monotonic())
+
+    @callback
+    def set_available(self, available: bool) -> None:
+        """Set the availability of the sensor."""
+        self._attr_available = available
+        if self.hass is not None:
+            self._async_stage_write()
+
+    def process_update(self, new_value, last_reset: datetime | None = None) -> None:
+        """Update the state of the sensor from its extracted value."""
+        description = self.entity_description
+        if description.ignore_zero_values and new_value == 0:
             _LOGGER.debug(
                 "Ignored new value of %s on %s.", new_value, self._attr_unique_id
             )
             return
-        if self._error_response_values and new_value in self._error_response_values:
+        if new_value in description.error_response_values:
             _LOGGER.debug(
                 "Received error response value of %s on %s, state unknown.",
                 new_value,
                 self._attr_unique_id,
             )
             new_value = None
+
+        if self._publish_interval:
+            now = monotonic()
+            if self._window is not None:
+                self._window.add(now, new_value)
+                if self._window.start is not None and now - self._window.start < self._publish_interval:
+                    return
+                mean = self._window.mean()
+                new_value = round(mean, 3) if mean is not None else None
+                self._attr_extra_state_attributes = {
+                    ATTR_DEVICE_ID: self._attr_extra_state_attributes[ATTR_DEVICE_ID],
+                    ATTR_MIN: self._window.minimum,
+                    ATTR_MAX: self._window.maximum,
+                }
+                self._window.restart(now)
+            elif (
+                self._last_publish_time is not None
+                and now - self._last_publish_time < self._publish_interval
+                and last_reset == getattr(self, "_attr_last_reset", None)
+            ):
+                return
+            self._last_publish_time = now
+
         self._attr_native_value = new_value
 
-        zoneInfo = None
-        if self._time_zone:
-            zoneInfo = self._time_zone
-        elif (self.hass is not None and 
-              self.hass.config is not None):
-            zoneInfo = self.hass.config.time_zone
-            
-        if zoneInfo and self._last_reset_reported and self._meter_interval:
-            self._attr_last_reset = self.determine_last_reset(
-                self.get_message_datetime(mqtt_data),
-                ZoneInfo(zoneInfo),
-                self._meter_interval
-            )
+        if self._last_reset_reported and last_reset is not None:
+            self._attr_last_reset = last_reset
 
         if (
             self.hass is not None
         ):  # this is a hack to get around the fact that the entity is not yet initialized at first
-            self.async_schedule_update_ha_state()
+            self._async_stage_write()
+
+    @callback
+    def _async_stage_write(self) -> None:
+        """Hand the new state to the update group's batch, or write it now."""
+        if self._stage_write is not None:
+            self._stage_write(self)
+        else:
+            self._async_write_if_changed()
+
+    @callback
+    def flush_write(self) -> bool:
+        """Write the state staged with the update group, returning whether it was written."""
+        return self._async_write_if_changed()
+
+    @callback
+    def _async_write_if_changed(self) -> bool:
+        """Write the state only when it changed or the heartbeat is due, returning whether it was."""
+        written_state = (
+            self._attr_native_value,
+            getattr(self, "_attr_last_reset", None),
+            self.available,
+        )
+        now = monotonic()
+        if written_state == self._written_state and (
+            self._heartbeat_interval is None
+            or now - self._last_write_time < self._heartbeat_interval
+        ):
+            self.suppressed_writes += 1
+            return False
+        self._written_state = written_state
+        self._last_write_time = now
+        self.state_writes += 1
+        self.async_write_ha_state()
+        return True
+
+
+class HildebrandGlowMqttDebugSensor(SensorEntity):
+    """Diagnostic sensor reporting the integration's own runtime counters.
+
+    These are polled rather than pushed, so enabling them does not add a
+    state write per message.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = True
+
+    entity_description: GlowDebugSensorEntityDescription
+
+    def __init__(
+        self, device, router, stats, description: GlowDebugSensorEntityDescription
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._device_id = device.device_id
+        self._router = router
+        self._stats = stats
+        self._attr_unique_id = slugify(device.device_id + "_" + description.name)
+        self._attr_device_info = device.device_info
 
     @property
-    def extra_state_attributes(self):
-        """Return the state attributes."""
-        return {ATTR_DEVICE_ID: self._device_id}
+    def native_value(self):
+        """Return the current value of the counter."""
+        return self.entity_description.value_fn(
+            self._stats.device_stats(self._device_id).values(),
+            self._router.device_groups(self._device_id),
+        )
+
+
+def _mean_us(timers) -> float | None:
+    """Return the mean of a set of timers in microseconds."""
+    count = sum(timer.count for timer in timers)
+    if not count:
+        return None
+    return round(sum(timer.total_ns for timer in timers) / count / 1000, 1)
+
+
+def _latency(stats, histogram: str) -> LatencyHistogram:
+    """Return a latency histogram of all of a device's message kinds together."""
+    merged = LatencyHistogram()
+    for message_stats in stats:
+        merged.merge(getattr(message_stats.latency, histogram))
+    return merged
+
+
+def _clock_offset(stats) -> float | None:
+    """Return the lowest clock offset of a device's message kinds, in seconds."""
+    offsets = [
+        message_stats.latency.clock_offset
+        for message_stats in stats
+        if message_stats.latency.clock_offset is not None
+    ]
+    return round(min(offsets), 3) if offsets else None
+
+
+def _latency_sensors(
+    key: str, name: str, histogram: str
+) -> list[GlowDebugSensorEntityDescription]:
+    """Return the p50, p95 and max sensors of a latency histogram."""
+    return [
+        GlowDebugSensorEntityDescription(
+            key=f"{key}_{label}",
+            name=f"{name} ({label})",
+            icon="mdi:timer-sand",
+            native_unit_of_measurement=UnitOfTime.SECONDS,
+            value_fn=value_fn,
+        )
+        for label, value_fn in (
+            ("p50", lambda stats, groups: _latency(stats, histogram).quantile(0.5)),
+            ("p95", lambda stats, groups: _latency(stats, histogram).quantile(0.95)),
+            ("max", lambda stats, groups: round(_latency(stats, histogram).max, 3)),
+        )
+    ]
+
+
+DEBUG_SENSORS = [
+    GlowDebugSensorEntityDescription(
+        key="messages_received",
+        name="Smart Meter IHD Messages Received",
+        icon="mdi:message-arrow-left-outline",
+        value_fn=lambda stats, groups: sum(s.received for s in stats),
+    ),
+    GlowDebugSensorEntityDescription(
+        key="messages_ignored",
+        name="Smart Meter IHD Messages Ignored",
+        icon="mdi:message-off-outline",
+        value_fn=lambda stats, groups: sum(s.ignored for s in stats),
+    ),
+    GlowDebugSensorEntityDescription(
+        key="state_writes",
+        name="Smart Meter IHD State Writes",
+        icon="mdi:database-arrow-right-outline",
+        value_fn=lambda stats, groups: sum(g.state_writes for g in groups),
+    ),
+    GlowDebugSensorEntityDescription(
+        key="suppressed_writes",
+        name="Smart Meter IHD Suppressed State Writes",
+        icon="mdi:database-off-outline",
+        value_fn=lambda stats, groups: sum(g.suppressed_writes for g in groups),
+    ),
+    GlowDebugSensorEntityDescription(
+        key="sensor_errors",
+        name="Smart Meter IHD Sensor Errors",
+        icon="mdi:alert-circle-outline",
+        value_fn=lambda stats, groups: sum(sum(g.errors.values()) for g in groups),
+    ),
+    GlowDebugSensorEntityDescription(
+        key="rejected_readings",
+        name="Smart Meter IHD Rejected Readings",
+        icon="mdi:filter-remove-outline",
+        value_fn=lambda stats, groups: sum(
+            sum(reasons.values()) for g in groups for reasons in g.rejected.values()
+        ),
+    ),
+    GlowDebugSensorEntityDescription(
+        key="decode_time",
+        name="Smart Meter IHD Decode Time",
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=UnitOfTime.MICROSECONDS,
+        value_fn=lambda stats, groups: _mean_us([s.decode for s in stats]),
+    ),
+    GlowDebugSensorEntityDescription(
+        key="extraction_time",
+        name="Smart Meter IHD Extraction Time",
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=UnitOfTime.MICROSECONDS,
+        value_fn=lambda stats, groups: _mean_us([s.extract for s in stats]),
+    ),
+    # Payload timestamp to MQTT receipt: the HAN, the IHD and the broker.
+    *_latency_sensors("receive_latency", "Smart Meter IHD Receive Latency", "receipt"),
+    # MQTT receipt to state write: the integration and the coalesce window.
+    *_latency_sensors("write_latency", "Smart Meter IHD Write Latency", "write"),
+    GlowDebugSensorEntityDescription(
+        key="clock_offset",
+        name="Smart Meter IHD Clock Offset",
+        icon="mdi:clock-outline",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        value_fn=lambda stats, groups: _clock_offset(stats),
+    ),
+    GlowDebugSensorEntityDescription(
+        key="clock_skew",
+        name="Smart Meter IHD Clock Skew",
+        icon="mdi:clock-alert-outline",
+        device_class=SensorDeviceClass.ENUM,
+        options=["ok", "skewed"],
+        state_class=None,
+        value_fn=lambda stats, groups: (
+            "skewed" if any(s.latency.clock_skewed for s in stats) else "ok"
+        ),
+    ),
+    GlowDebugSensorEntityDescription(
+        key="stale_data",
+        name="Smart Meter IHD Stale Data",
+        icon="mdi:timer-alert-outline",
+        device_class=SensorDeviceClass.ENUM,
+        options=["fresh", "stale"],
+        state_class=None,
+        value_fn=lambda stats, groups: "stale" if any(s.latency.stale for s in stats) else "fresh",
+    ),
+]
@@ -0,0 +1,334 @@
+"""Runtime counters and timers for the Glow dispatch path."""
+
+from __future__ import annotations
+from bisect import bisect_left
+import logging
+from typing import Any
+
+from .const import KIND_ELECTRICITY, KIND_GAS, KIND_STATE
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds, from the event
+# loop's own delays up to an hour behind; one more bucket holds the rest.
+LATENCY_BOUNDS = (
+    0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5,
+    1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 300, 600, 1800, 3600,
+)
+# The clock offset is the lowest latency of the last one to two windows of
+# this many messages: the transport delay varies, a clock offset does not.
+OFFSET_WINDOW = 60
+# A clock offset beyond this many seconds either way is taken as skew.
+CLOCK_SKEW_TOLERANCE = 30
+# Seconds after which the data of a message is stale on receipt, by kind. A
+# battery powered gas meter only reports every half hour.
+STALE_DATA_AFTER = {KIND_STATE: 300, KIND_ELECTRICITY: 300, KIND_GAS: 3600}
+
+
+class TimerStat:
+    """Count, total and max of a timed step, in nanoseconds."""
+
+    __slots__ = ("count", "max_ns", "total_ns")
+
+    def __init__(self) -> None:
+        """Initialize the timer."""
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, elapsed_ns: int) -> None:
+        """Record one measurement."""
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    @property
+    def mean_us(self) -> float | None:
+        """Return the mean in microseconds, or None before any measurement."""
+        if not self.count:
+            return None
+        return round(self.total_ns / self.count / 1000, 1)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the timer as a dict."""
+        return {
+            "count": self.count,
+            "mean_us": self.mean_us,
+            "max_us": round(self.max_ns / 1000, 1),
+        }
+
+
+class LatencyHistogram:
+    """Fixed memory histogram of latencies, in seconds."""
+
+    __slots__ = ("buckets", "count", "max")
+
+    def __init__(self) -> None:
+        """Initialize the histogram."""
+        self.count = 0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BOUNDS) + 1)
+
+    def add(self, latency: float) -> None:
+        """Record one latency; negative ones, from clock skew, count as zero."""
+        latency = max(latency, 0.0)
+        self.count += 1
+        self.buckets[bisect_left(LATENCY_BOUNDS, latency)] += 1
+        if latency > self.max:
+            self.max = latency
+
+    def merge(self, other: LatencyHistogram) -> None:
+        """Add the latencies of another histogram."""
+        self.count += other.count
+        self.max = max(self.max, other.max)
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+
+    def quantile(self, q: float) -> float | None:
+        """Return the upper bound of the bucket holding quantile q, or None before any latency.
+
+        The bound is capped at the highest latency seen.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                if index == len(LATENCY_BOUNDS):
+                    return round(self.max, 3)
+                return min(LATENCY_BOUNDS[index], round(self.max, 3))
+        return round(self.max, 3)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram's summary as a dict."""
+        return {
+            "count": self.count,
+            "p50_s": self.quantile(0.5),
+            "p95_s": self.quantile(0.95),
+            "max_s": round(self.max, 3),
+        }
+
+
+class LatencyStats:
+    """Latency of one device and kind, from the payload timestamp to the state write.
+
+    Receipt latency runs from the timestamp in the payload to the MQTT
+    message reaching Home Assistant, covering the HAN, the IHD and the
+    broker. Write latency runs from receipt to the flush of the message's
+    state writes, covering the integration and any coalesce window. Both
+    include the offset between the IHD's clock and Home Assistant's.
+    """
+
+    __slots__ = (
+        "_offset",
+        "_offset_count",
+        "_offset_previous",
+        "_pending",
+        "last_receipt",
+        "receipt",
+        "stale_after",
+        "total",
+        "write",
+    )
+
+    def __init__(self, stale_after: float | None = None) -> None:
+        """Initialize the stats; data older than stale_after seconds on receipt is stale."""
+        self.stale_after = stale_after
+        self.receipt = LatencyHistogram()
+        self.write = LatencyHistogram()
+        self.total = LatencyHistogram()
+        self.last_receipt: float | None = None
+        self._offset: float | None = None
+        self._offset_previous: float | None = None
+        self._offset_count = 0
+        self._pending: tuple[float, float] | None = None
+
+    def received(self, timestamp: float, received_time: float) -> None:
+        """Record a message with the given payload timestamp received at received_time."""
+        latency = received_time - timestamp
+        self.receipt.add(latency)
+        self.last_receipt = latency
+        if self._offset_count == OFFSET_WINDOW:
+            self._offset_previous = self._offset
+            self._offset = None
+            self._offset_count = 0
+        if self._offset is None or latency < self._offset:
+            self._offset = latency
+        self._offset_count += 1
+        # Messages coalesced into one flush are timed from the earliest.
+        if self._pending is None:
+            self._pending = (timestamp, received_time)
+
+    def written(self, written_time: float) -> None:
+        """Record the state writes of the messages received since the last flush."""
+        if self._pending is None:
+            return
+        timestamp, received_time = self._pending
+        self._pending = None
+        self.write.add(written_time - received_time)
+        self.total.add(written_time - timestamp)
+
+    def discard(self) -> None:
+        """Forget the messages received since the last flush, they wrote no state."""
+        self._pending = None
+
+    @property
+    def clock_offset(self) -> float | None:
+        """Return the lowest recent receipt latency, in seconds, mostly the clock offset."""
+        if self._offset_previous is None:
+            return self._offset
+        if self._offset is None:
+            return self._offset_previous
+        return min(self._offset, self._offset_previous)
+
+    @property
+    def clock_skewed(self) -> bool:
+        """Return whether the IHD's clock is off by more than the tolerance."""
+        offset = self.clock_offset
+        return offset is not None and abs(offset) > CLOCK_SKEW_TOLERANCE
+
+    @property
+    def stale(self) -> bool:
+        """Return whether the last message carried stale data, allowing for clock skew."""
+        if self.stale_after is None or self.last_receipt is None:
+            return False
+        latency = self.last_receipt
+        if self.clock_skewed:
+            latency -= self.clock_offset
+        return latency > self.stale_after
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stats as a dict."""
+        offset = self.clock_offset
+        return {
+            "receipt": self.receipt.as_dict(),
+            "write": self.write.as_dict(),
+            "total": self.total.as_dict(),
+            "clock_offset_s": None if offset is None else round(offset, 3),
+            "clock_skewed": self.clock_skewed,
+            "stale": self.stale,
+        }
+
+
+class MessageStats:
+    """Counters for the messages of one device and kind."""
+
+    __slots__ = ("decode", "extract", "ignored", "latency", "matched", "received")
+
+    def __init__(self, stale_after: float | None = None) -> None:
+        """Initialize the counters."""
+        self.received = 0
+        self.matched = 0
+        self.ignored = 0
+        self.decode = TimerStat()
+        self.extract = TimerStat()
+        self.latency = LatencyStats(stale_after)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as a dict."""
+        return {
+            "received": self.received,
+            "matched": self.matched,
+            "ignored": self.ignored,
+            "decode": self.decode.as_dict(),
+            "extract": self.extract.as_dict(),
+            "latency": self.latency.as_dict(),
+        }
+
+
+class IngestStats:
+    """Depth, overwrites, drops and lag of the ingest queue."""
+
+    __slots__ = ("depth", "dropped", "lag", "max_depth", "overwrites")
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.depth = 0
+        self.max_depth = 0
+        self.overwrites = 0
+        self.dropped = 0
+        self.lag = TimerStat()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as a dict."""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "overwrites": self.overwrites,
+            "dropped": self.dropped,
+            "lag": self.lag.as_dict(),
+        }
+
+
+class GlowStats:
+    """Counters per (device id, kind), shared by the hub and the update groups.
+
+    Counting is always on and costs a dict lookup and a few increments per
+    message, as does latency tracking, which reuses the payload timestamp
+    the update groups parse anyway. Timing needs two clock reads per step
+    and is off until ``timing_enabled`` is set, which can be done at runtime.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the stats."""
+        self.timing_enabled = False
+        self.unmatched_topics = 0
+        # Messages of devices and kinds without counters that no listener accepted.
+        self.ignored_messages = 0
+        # Wall clock time the message being dispatched was received, None when retained.
+        self.received_time: float | None = None
+        self.messages: dict[tuple[str, str], MessageStats] = {}
+        # The same counters by device id and kind, for the per-device debug sensors.
+        self._devices: dict[str, dict[str, MessageStats]] = {}
+        self.ingest = IngestStats()
+
+    def message_stats(self, device_id: str, kind: str) -> MessageStats:
+        """Return the counters for a device and kind, creating them if needed."""
+        stats = self.messages.get((device_id, kind))
+        if stats is None:
+            stats = self.messages[(device_id, kind)] = MessageStats(STALE_DATA_AFTER.get(kind))
+            self._devices.setdefault(device_id, {})[kind] = stats
+        return stats
+
+    def forget_device(self, device_id: str) -> None:
+        """Drop the counters of a device."""
+        for kind in self._devices.pop(device_id, {}):
+            del self.messages[(device_id, kind)]
+
+    def device_stats(self, device_id: str) -> dict[str, MessageStats]:
+        """Return the counters of a device by kind, a view not to be modified."""
+        return self._devices.get(device_id, {})
+
+
+class StartupStats:
+    """Timings of a config entry's startup, in seconds since setup began."""
+
+    __slots__ = ("expected_entities", "first_message", "restored", "restored_entities", "started")
+
+    def __init__(self, started: float) -> None:
+        """Initialize the timings."""
+        self.started = started
+        self.expected_entities = 0
+        self.restored_entities = 0
+        self.restored: float | None = None
+        self.first_message: float | None = None
+
+    def entity_restored(self, now: float) -> None:
+        """Record that an entity has restored its state."""
+        self.restored_entities += 1
+        if self.restored_entities == self.expected_entities:
+            self.restored = now - self.started
+            _LOGGER.debug(
+                "Restored %s entities %.3fs after setup", self.restored_entities, self.restored
+            )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the timings as a dict."""
+        return {
+            "restored_entities": self.restored_entities,
+            "restored_seconds": self.restored,
+            "first_message_seconds": self.first_message,
+        }
@@ -0,0 +1,31 @@
+"""Helpers shared by the tests."""
+
+from homeassistant.config_entries import ConfigEntries, ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from custom_components.hildebrand_glow_ihd_mqtt.const import DOMAIN
+
+
+async def async_registry_hass(config_dir: str) -> HomeAssistant:
+    """Return a Home Assistant with real, empty device and entity registries."""
+    hass = HomeAssistant(config_dir)
+    hass.config_entries = ConfigEntries(hass, {})
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    return hass
+
+
+def add_config_entry(hass: HomeAssistant, data: dict | None = None) -> ConfigEntry:
+    """Add a config entry of the integration, without setting it up."""
+    entry = ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="",
+        data=data or {},
+        source="user",
+        options={},
+    )
+    hass.config_entries._entries[entry.entry_id] = entry
+    return entry
@@ -0,0 +1,6 @@
+"""Shared setup for the tests; Home Assistant itself must be importable."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,117 @@
+"""ConsumptionBuckets across clock changes, gaps and snapshots."""
+
+from datetime import UTC, date, datetime, timedelta
+import json
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.hildebrand_glow_ihd_mqtt.buckets import HALF_HOUR, ConsumptionBuckets
+
+LONDON = dt_util.get_time_zone("Europe/London")
+
+
+def utc(day: date, hour: int, minute: int = 0) -> float:
+    """Return the timestamp of a UTC time."""
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=UTC).timestamp()
+
+
+def read_every_half_hour(buckets: ConsumptionBuckets, start: float, end: float) -> None:
+    """Add a reading every half hour from start to end, using 0.1 kWh per half hour."""
+    cumulative = 100.0
+    timestamp = start
+    while timestamp <= end:
+        buckets.add(timestamp, cumulative)
+        timestamp += HALF_HOUR
+        cumulative += 0.1
+
+
+@pytest.mark.parametrize(
+    ("day", "half_hours", "repeated"),
+    [
+        # The clocks go forward at 01:00 GMT, so 01:00 to 02:00 local never happens.
+        (date(2024, 3, 31), 46, 0),
+        # They go back at 01:00 GMT, so 01:00 to 02:00 local happens twice.
+        (date(2024, 10, 27), 50, 2),
+    ],
+)
+def test_clock_change_days(day: date, half_hours: int, repeated: int):
+    """A day the clocks change has 46 or 50 half hours, each with its own consumption."""
+    buckets = ConsumptionBuckets(LONDON)
+    day_start = datetime.combine(day, datetime.min.time(), LONDON).timestamp()
+    day_end = datetime.combine(day + timedelta(days=1), datetime.min.time(), LONDON).timestamp()
+    read_every_half_hour(buckets, day_start - HALF_HOUR, day_end + HALF_HOUR)
+    slots = buckets.half_hours(day)
+    assert len(slots) == half_hours
+    assert [start.timestamp() for start, _ in slots] == [
+        day_start + index * HALF_HOUR for index in range(half_hours)
+    ]
+    local_times = [start.strftime("%H:%M") for start, _ in slots]
+    assert len(local_times) - len(set(local_times)) == repeated
+    assert all(value == pytest.approx(0.1) for _, value in slots)
+    hours = buckets.hours(day)
+    assert len(hours) == half_hours // 2
+    assert all(value == pytest.approx(0.2) for _, value in hours)
+
+
+def test_reading_shared_pro_rata():
+    """The consumption between two readings is shared between the half hours they span."""
+    buckets = ConsumptionBuckets(UTC)
+    day = date(2024, 6, 10)
+    buckets.add(utc(day, 10, 20), 100.0)
+    buckets.add(utc(day, 11, 20), 106.0)
+    values = {start.strftime("%H:%M"): value for start, value in buckets.half_hours(day)}
+    assert values["10:00"] == pytest.approx(1.0)
+    assert values["10:30"] == pytest.approx(3.0)
+    assert values["11:00"] == pytest.approx(2.0)
+    assert values["09:30"] is None
+    assert buckets.current(utc(day, 11, 20)) == (pytest.approx(2.0), pytest.approx(2.0))
+    assert buckets.current(utc(day, 10, 45)) == (pytest.approx(3.0), pytest.approx(4.0))
+
+
+def test_reading_across_midnight():
+    """A reading spanning midnight is shared between the two days."""
+    buckets = ConsumptionBuckets(UTC)
+    buckets.add(utc(date(2024, 6, 10), 23, 45), 100.0)
+    buckets.add(utc(date(2024, 6, 11), 0, 15), 101.0)
+    assert buckets.half_hours(date(2024, 6, 10))[-1][1] == pytest.approx(0.5)
+    assert buckets.half_hours(date(2024, 6, 11))[0][1] == pytest.approx(0.5)
+
+
+def test_unusable_readings_skipped():
+    """Older readings, decreases and gaps longer than the retention add nothing."""
+    buckets = ConsumptionBuckets(UTC, retention_days=2)
+    day = date(2024, 6, 10)
+    buckets.add(utc(day, 10), 100.0)
+    buckets.add(utc(day, 9), 50.0)
+    buckets.add(utc(day, 10, 10), 90.0)
+    buckets.add(utc(day, 10, 20), 91.0)
+    assert buckets.current(utc(day, 10, 20)) == (pytest.approx(1.0), pytest.approx(1.0))
+    buckets.add(utc(day + timedelta(days=3), 10), 200.0)
+    assert buckets.current(utc(day + timedelta(days=3), 10)) == (None, None)
+
+
+def test_old_days_pruned():
+    """Only the last retention_days days are kept."""
+    buckets = ConsumptionBuckets(UTC, retention_days=2)
+    day = date(2024, 6, 10)
+    for offset in range(3):
+        buckets.add(utc(day + timedelta(days=offset), 12), 100.0 + offset)
+        buckets.add(utc(day + timedelta(days=offset), 12, 10), 100.5 + offset)
+    assert all(value is None for _, value in buckets.half_hours(day))
+    for offset in (1, 2):
+        assert buckets.half_hours(day + timedelta(days=offset))[24][1] is not None
+
+
+def test_snapshot_restore():
+    """A restored meter, saved as JSON, has the same days and carries on from the last reading."""
+    buckets = ConsumptionBuckets(LONDON)
+    day = date(2024, 10, 27)
+    read_every_half_hour(buckets, utc(day, 0), utc(day, 12))
+    restored = ConsumptionBuckets(LONDON)
+    restored.restore(json.loads(json.dumps(buckets.snapshot())))
+    assert restored.half_hours(day) == buckets.half_hours(day)
+    for each in (buckets, restored):
+        each.add(utc(day, 12, 30), 102.5)
+    assert restored.half_hours(day) == buckets.half_hours(day)
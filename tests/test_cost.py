@@ -0,0 +1,134 @@
+"""CostEngine across rate changes, period rollovers and gaps in the readings."""
+
+from datetime import datetime
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.hildebrand_glow_ihd_mqtt.const import MeterInterval
+from custom_components.hildebrand_glow_ihd_mqtt.cost import CostEngine
+
+LONDON = dt_util.get_time_zone("Europe/London")
+STANDING_CHARGE = 0.50
+DAY, WEEK, MONTH = MeterInterval.DAY, MeterInterval.WEEK, MeterInterval.MONTH
+
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    """Return a time in June 2024, London time; the 10th is a Monday."""
+    return datetime(2024, 6, day, hour, minute, tzinfo=LONDON)
+
+
+def usage(day: float | None, week: float | None, month: float | None) -> dict:
+    """Return the meter's own usage counters."""
+    return {DAY: day, WEEK: week, MONTH: month}
+
+
+def started_engine() -> CostEngine:
+    """Return an engine estimated on Tuesday 11 June at 10:00."""
+    engine = CostEngine(LONDON)
+    engine.add(at(11, 10), 100.0, 0.20, STANDING_CHARGE, usage(2.0, 10.0, 30.0))
+    return engine
+
+
+def test_estimate():
+    """The first reading estimates each period from the meter's counters and its days."""
+    engine = started_engine()
+    assert engine.totals[DAY] == pytest.approx(2.0 * 0.20 + STANDING_CHARGE)
+    assert engine.totals[WEEK] == pytest.approx(10.0 * 0.20 + 2 * STANDING_CHARGE)
+    assert engine.totals[MONTH] == pytest.approx(30.0 * 0.20 + 11 * STANDING_CHARGE)
+
+
+def test_rate_change():
+    """Energy is priced at the rate in force while it was used."""
+    engine = started_engine()
+    today = engine.totals[DAY]
+    engine.add(at(11, 11), 101.0, 0.30, STANDING_CHARGE, usage(3.0, 11.0, 31.0))
+    assert engine.totals[DAY] == pytest.approx(today + 1.0 * 0.20)
+    engine.add(at(11, 12), 102.0, 0.30, STANDING_CHARGE, usage(4.0, 12.0, 32.0))
+    assert engine.totals[DAY] == pytest.approx(today + 1.0 * 0.20 + 1.0 * 0.30)
+
+
+def test_period_rollover():
+    """A new day and week only get the energy the meter counted in them, and one standing charge."""
+    engine = CostEngine(LONDON)
+    engine.add(at(9, 23, 50), 100.0, 0.20, STANDING_CHARGE, usage(8.0, 40.0, 60.0))
+    month = engine.totals[MONTH]
+    engine.add(at(10, 0, 10), 100.4, 0.20, STANDING_CHARGE, usage(0.1, 0.1, 60.4))
+    assert engine.totals[DAY] == pytest.approx(0.1 * 0.20 + STANDING_CHARGE)
+    assert engine.totals[WEEK] == pytest.approx(0.1 * 0.20 + STANDING_CHARGE)
+    assert engine.totals[MONTH] == pytest.approx(month + 0.4 * 0.20 + STANDING_CHARGE)
+
+
+def test_multi_day_gap():
+    """After a gap over several midnights the skipped days' standing charges are added."""
+    engine = started_engine()
+    week, month = engine.totals[WEEK], engine.totals[MONTH]
+    # 60 hours later, 40 kWh on, 5 of them today.
+    engine.add(at(13, 22), 140.0, 0.20, STANDING_CHARGE, usage(5.0, 50.0, 70.0))
+    assert engine.totals[DAY] == pytest.approx(5.0 * 0.20 + STANDING_CHARGE)
+    assert engine.totals[WEEK] == pytest.approx(week + 40.0 * 0.20 + 2 * STANDING_CHARGE)
+    assert engine.totals[MONTH] == pytest.approx(month + 40.0 * 0.20 + 2 * STANDING_CHARGE)
+
+
+def test_gap_into_new_month():
+    """A gap into a new month charges only the days of the new month."""
+    engine = CostEngine(LONDON)
+    engine.add(at(29, 12), 100.0, 0.20, STANDING_CHARGE, usage(1.0, 5.0, 50.0))
+    engine.add(
+        datetime(2024, 7, 2, 12, tzinfo=LONDON), 130.0, 0.20, STANDING_CHARGE, usage(4.0, 8.0, 8.0)
+    )
+    assert engine.totals[DAY] == pytest.approx(4.0 * 0.20 + STANDING_CHARGE)
+    # Monday 1 July began a new week too.
+    assert engine.totals[WEEK] == pytest.approx(8.0 * 0.20 + 2 * STANDING_CHARGE)
+    assert engine.totals[MONTH] == pytest.approx(8.0 * 0.20 + 2 * STANDING_CHARGE)
+
+
+def test_gap_without_usage_counters():
+    """Without the meter's counters a new period gets the delta in proportion to its time."""
+    engine = started_engine()
+    # 24 kWh over the 24 hours to 10:00 the next day, 10 hours of which are today.
+    engine.add(at(12, 10), 124.0, 0.20, STANDING_CHARGE, usage(None, None, None))
+    assert engine.totals[DAY] == pytest.approx(10.0 * 0.20 + STANDING_CHARGE)
+
+
+def test_standing_charge_once_known():
+    """Days rolled over while the standing charge was missing are charged once it arrives."""
+    engine = started_engine()
+    engine.add(at(13, 10), 110.0, 0.20, None, usage(1.0, 20.0, 40.0))
+    assert engine.totals[DAY] == pytest.approx(1.0 * 0.20)
+    engine.add(at(13, 11), 111.0, 0.20, STANDING_CHARGE, usage(2.0, 21.0, 41.0))
+    assert engine.totals[DAY] == pytest.approx(2.0 * 0.20 + STANDING_CHARGE)
+    engine.add(at(13, 12), 112.0, 0.20, STANDING_CHARGE, usage(3.0, 22.0, 42.0))
+    assert engine.totals[DAY] == pytest.approx(3.0 * 0.20 + STANDING_CHARGE)
+
+
+def test_older_reading_ignored():
+    """A reading older than the last one changes nothing."""
+    engine = started_engine()
+    totals = dict(engine.totals)
+    engine.add(at(11, 9), 90.0, 0.20, STANDING_CHARGE, usage(1.0, 9.0, 29.0))
+    assert engine.totals == totals
+
+
+def test_snapshot_restore():
+    """A restored engine carries on where the saved one left off."""
+    engine = started_engine()
+    restored = CostEngine(LONDON)
+    restored.restore(engine.snapshot())
+    for each in (engine, restored):
+        each.add(at(12, 10), 124.0, 0.20, STANDING_CHARGE, usage(4.0, 34.0, 54.0))
+    assert restored.totals == engine.totals
+
+
+def test_restore_old_snapshot():
+    """A snapshot that flagged the standing charge as due owes one day."""
+    engine = started_engine()
+    snapshot = engine.snapshot()
+    del snapshot["standing_days_due"]
+    snapshot["standing_charge_due"] = True
+    restored = CostEngine(LONDON)
+    restored.restore(snapshot)
+    today = restored.totals[DAY]
+    restored.add(at(11, 11), 101.0, 0.20, STANDING_CHARGE, usage(3.0, 11.0, 31.0))
+    assert restored.totals[DAY] == pytest.approx(today + 1.0 * 0.20 + STANDING_CHARGE)
@@ -0,0 +1,113 @@
+"""ExtractionPlan over complete, partial and malformed payloads."""
+
+import logging
+
+import orjson
+import pytest
+
+from benchmarks.harness import synthetic_messages
+from custom_components.hildebrand_glow_ihd_mqtt import sensor
+from custom_components.hildebrand_glow_ihd_mqtt.const import KIND_ELECTRICITY
+from custom_components.hildebrand_glow_ihd_mqtt.descriptions import ELECTRICITY_SENSORS
+from custom_components.hildebrand_glow_ihd_mqtt.extraction import MISSING, ExtractionPlan
+
+DEVICE_ID = "1234567890AB"
+PRICE = ("meter", "energy", "price")
+
+FIELDS = [
+    ("cumulative", ("meter", "energy", "cumulative")),
+    ("unit_rate", (*PRICE, "unitrate")),
+    ("standing_charge", (*PRICE, "standingcharge")),
+    ("power", ("meter", "power", "value")),
+    ("same_power", ("meter", "power", "value")),
+    ("price", PRICE),
+]
+
+
+def payload() -> dict:
+    """Return a complete payload for FIELDS."""
+    return {
+        "meter": {
+            "energy": {"cumulative": 12.5, "price": {"unitrate": 0.25, "standingcharge": 0.5}},
+            "power": {"value": 0.9},
+        }
+    }
+
+
+def test_complete_payload():
+    """Every path is read once, shared paths included, and nothing is missing."""
+    plan = ExtractionPlan(FIELDS)
+    assert len(list(plan.paths)) == 5
+    data = payload()
+    values, missing = plan.extract(data)
+    assert missing == []
+    assert values == {
+        "cumulative": 12.5,
+        "unit_rate": 0.25,
+        "standing_charge": 0.5,
+        "power": 0.9,
+        "same_power": 0.9,
+        "price": data["meter"]["energy"]["price"],
+    }
+
+
+def test_missing_paths():
+    """An absent branch is reported once and its values are MISSING."""
+    data = payload()
+    del data["meter"]["energy"]["price"]
+    del data["meter"]["power"]["value"]
+    values, missing = ExtractionPlan(FIELDS).extract(data)
+    assert sorted(missing) == [PRICE, ("meter", "power", "value")]
+    assert values["cumulative"] == 12.5
+    assert all(
+        values[key] is MISSING for key in ("unit_rate", "standing_charge", "power", "price")
+    )
+
+
+@pytest.mark.parametrize("node", [None, [1, 2], "x", 3, 0.5, True])
+def test_intermediate_node_not_an_object(node):
+    """A null or non-object node where the plan expects an object misses the paths below it."""
+    data = payload()
+    data["meter"]["energy"] = node
+    values, missing = ExtractionPlan(FIELDS).extract(data)
+    assert sorted(missing) == [("meter", "energy", "cumulative"), PRICE]
+    assert values["power"] == 0.9
+    assert values["cumulative"] is MISSING
+
+
+@pytest.mark.parametrize("data", [None, [], "x", 1])
+def test_payload_not_an_object(data):
+    """A payload that is not an object misses every top-level path."""
+    values, missing = ExtractionPlan(FIELDS).extract(data)
+    assert missing == [("meter",)]
+    assert all(value is MISSING for value in values.values())
+
+
+def test_shape_change(caplog):
+    """A device whose payload changes shape gets the right values, and the change is logged once."""
+    update_group = sensor.HildebrandGlowMqttSensorUpdateGroup(
+        DEVICE_ID, KIND_ELECTRICITY, ELECTRICITY_SENSORS
+    )
+    message = next(
+        message
+        for topic, message in synthetic_messages(DEVICE_ID, 0)
+        if topic.endswith(KIND_ELECTRICITY)
+    )
+    complete = orjson.loads(message)
+    partial = orjson.loads(message)
+    del partial["electricitymeter"]["energy"]["import"]["price"]
+    partial["electricitymeter"]["power"] = None
+    caplog.set_level(logging.INFO, logger=sensor.__name__)
+
+    for data in (complete, complete, partial, partial, complete):
+        values = update_group._extract(data)
+        price_known = "price" in data["electricitymeter"]["energy"]["import"]
+        assert (values["electricity_unit_rate"] is MISSING) is not price_known
+        assert values["electricity_import"] == data["electricitymeter"]["energy"]["import"][
+            "cumulative"
+        ]
+    assert [record.getMessage() for record in caplog.records] == [
+        f"The {KIND_ELECTRICITY} payload of {DEVICE_ID} changed shape, now missing: "
+        "electricitymeter/energy/import/price, electricitymeter/power/value",
+        f"The {KIND_ELECTRICITY} payload of {DEVICE_ID} changed shape, now missing: nothing",
+    ]
@@ -0,0 +1,131 @@
+"""HourlyStatistics sums, means and the import of closed hours."""
+
+import asyncio
+from datetime import datetime, timezone
+import json
+
+import pytest
+
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.hildebrand_glow_ihd_mqtt import sensor
+from custom_components.hildebrand_glow_ihd_mqtt.const import KIND_ELECTRICITY
+from custom_components.hildebrand_glow_ihd_mqtt.descriptions import ELECTRICITY_SENSORS
+from custom_components.hildebrand_glow_ihd_mqtt.hourly import (
+    HOUR,
+    STATISTIC_MEAN,
+    STATISTIC_SUM,
+    HourlyStatistics,
+)
+
+DEVICE_ID = "1234567890AB"
+START = 1717200000.0  # 2024-06-01 00:00 UTC
+
+
+def test_sum_follows_resets():
+    """Increases add to the running sum and a decrease is taken as a reset to zero."""
+    hourly = HourlyStatistics({"today": STATISTIC_SUM})
+    for minute, value in ((0, 5.0), (20, 6.0), (40, 7.5)):
+        hourly.add(START + minute * 60, {"today": value})
+    # The daily total resets at midnight and has grown again by the next reading.
+    for minute, value in ((0, 0.5), (30, 1.0)):
+        hourly.add(START + HOUR + minute * 60, {"today": value})
+    hourly.add(START + 2 * HOUR, {"today": None})
+    assert hourly.pending_rows() == {
+        "today": [
+            {"start": START, "state": 7.5, "sum": 2.5},
+            {"start": START + HOUR, "state": 1.0, "sum": 3.5},
+        ]
+    }
+
+
+def test_mean_min_max():
+    """Mean statistics are the mean, min and max of the hour's samples."""
+    hourly = HourlyStatistics({"power": STATISTIC_MEAN})
+    for minute, value in ((0, 1.0), (10, 3.0), (20, None), (30, 0.5)):
+        hourly.add(START + minute * 60, {"power": value})
+    hourly.add(START - 60, {"power": 100.0})
+    hourly.close_before(START + HOUR - 1)
+    assert hourly.pending_rows() == {}
+    hourly.close_before(START + HOUR)
+    assert hourly.pending_rows() == {
+        "power": [{"start": START, "mean": 1.5, "min": 0.5, "max": 3.0}]
+    }
+
+
+def test_seed_continues_the_recorder_sum():
+    """Seeding adds the recorder's last sum to the running sum and the pending hours."""
+    hourly = HourlyStatistics({"energy": STATISTIC_SUM})
+    hourly.add(START, {"energy": 100.0})
+    hourly.add(START + HOUR, {"energy": 102.0})
+    hourly.add(START + 2 * HOUR, {"energy": 103.0})
+    hourly.seed("energy", 50.0)
+    hourly.close_before(START + 3 * HOUR)
+    assert [row["sum"] for row in hourly.pending_rows()["energy"]] == [50.0, 52.0, 53.0]
+
+
+def test_snapshot_restore():
+    """A restored copy, saved as JSON, closes the same hours as the original."""
+    hourly = HourlyStatistics({"energy": STATISTIC_SUM, "power": STATISTIC_MEAN})
+    hourly.add(START, {"energy": 100.0, "power": 1.0})
+    hourly.add(START + HOUR, {"energy": 101.0, "power": 2.0})
+    hourly.add(START + HOUR + 60, {"energy": 101.5, "power": 4.0})
+    restored = HourlyStatistics({"energy": STATISTIC_SUM, "power": STATISTIC_MEAN})
+    restored.restore(json.loads(json.dumps(hourly.snapshot())))
+    for each in (hourly, restored):
+        each.add(START + 2 * HOUR, {"energy": 103.0, "power": 1.0})
+    assert restored.pending_rows() == hourly.pending_rows()
+    assert len(restored.pending_rows()["power"]) == 2
+
+
+def test_pending_kept_until_imported():
+    """Closed hours stay pending until their import is confirmed."""
+    hourly = HourlyStatistics({"energy": STATISTIC_SUM})
+    hourly.add(START, {"energy": 1.0})
+    hourly.add(START + HOUR, {"energy": 2.0})
+    rows = hourly.pending_rows()
+    assert rows == {"energy": [{"start": START, "state": 1.0, "sum": 0.0}]}
+    assert hourly.pending_rows() == rows
+    hourly.add(START + 2 * HOUR, {"energy": 3.0})
+    hourly.imported("energy", len(rows["energy"]))
+    assert hourly.pending_rows() == {
+        "energy": [{"start": START + HOUR, "state": 2.0, "sum": 1.0}]
+    }
+
+
+def test_failed_import_tried_again(monkeypatch):
+    """Hours whose import raised are imported with the next ones."""
+    imported = []
+
+    def failing(hass, metadata, statistics):
+        raise HomeAssistantError("Invalid statistics")
+
+    def recording(hass, metadata, statistics):
+        imported.append((metadata["statistic_id"], [row["start"] for row in statistics]))
+
+    update_group = sensor.HildebrandGlowMqttSensorUpdateGroup(
+        DEVICE_ID,
+        KIND_ELECTRICITY,
+        ELECTRICITY_SENSORS,
+        sensor_keys={"electricity_import"},
+        hourly_statistics=True,
+    )
+    hourly = update_group._hourly
+    hourly.seeded = True
+    hourly.add(START, {"electricity_import": 1.0})
+
+    async def run(now: float):
+        await update_group.async_import_statistics(
+            None, datetime.fromtimestamp(now, timezone.utc)
+        )
+
+    monkeypatch.setattr(sensor, "async_add_external_statistics", failing)
+    with pytest.raises(HomeAssistantError):
+        asyncio.run(run(START + HOUR))
+    hourly.add(START + HOUR, {"electricity_import": 2.0})
+    monkeypatch.setattr(sensor, "async_add_external_statistics", recording)
+    asyncio.run(run(START + 2 * HOUR))
+    assert [starts for _, starts in imported] == [
+        [datetime.fromtimestamp(start, timezone.utc) for start in (START, START + HOUR)]
+    ]
+    assert hourly.pending_rows() == {}
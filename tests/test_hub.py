@@ -0,0 +1,282 @@
+"""The hub's subscriptions, counters and dispatch, mostly driven through the benchmark harness."""
+
+import asyncio
+from functools import partial
+
+import pytest
+
+from homeassistant.const import CONF_DEVICE_ID
+
+from benchmarks.harness import Pipeline, StubEntry, patched, synthetic_messages
+from custom_components.hildebrand_glow_ihd_mqtt import hub, sensor
+from custom_components.hildebrand_glow_ihd_mqtt.const import (
+    CONF_COALESCE_WINDOW,
+    CONF_DENIED_DEVICES,
+    CONF_STALE_ACTION,
+    CONF_STALE_TIMEOUT,
+    CONF_TOPIC_PREFIX,
+    DATA_HUB,
+    DATA_RECONFIGURE,
+    DATA_ROUTER,
+    DOMAIN,
+    KIND_ELECTRICITY,
+    KIND_GAS,
+    STALE_ACTION_EVICT,
+)
+from custom_components.hildebrand_glow_ihd_mqtt.hub import GlowPrefixSubscription
+from custom_components.hildebrand_glow_ihd_mqtt.stats import GlowStats
+
+DEVICE_ID = "000000000001"
+DENIED_DEVICE_ID = "000000000002"
+
+
+def subscribed_topics(pipeline: Pipeline) -> list[str]:
+    """Return the topics subscribed to on the MQTT stand-in."""
+    return sorted(topic for topic, _, _ in pipeline.mqtt.subscriptions)
+
+
+def prefix_topics(topic_prefix: str) -> list[str]:
+    """Return the topics of one prefix subscription."""
+    return sorted([f"{topic_prefix}/+/STATE", f"{topic_prefix}/+/SENSOR/+"])
+
+
+def test_one_subscription_per_prefix():
+    """Entries, reloads and option changes share a single subscription per prefix."""
+
+    async def run():
+        with Pipeline() as pipeline:
+            await pipeline.async_setup()
+            assert subscribed_topics(pipeline) == prefix_topics("glow")
+
+            entry_data = pipeline.hass.data[DOMAIN][pipeline.entry.entry_id]
+            other_entry = StubEntry("other", dict(pipeline.entry.data))
+            pipeline.hass.data[DOMAIN][other_entry.entry_id] = dict(entry_data)
+            await sensor.async_setup_entry(pipeline.hass, other_entry, pipeline.add_entities)
+            assert subscribed_topics(pipeline) == prefix_topics("glow")
+
+            pipeline.entry.unload()
+            assert subscribed_topics(pipeline) == prefix_topics("glow")
+            other_entry.unload()
+            assert subscribed_topics(pipeline) == []
+
+            await pipeline.async_setup()
+            assert subscribed_topics(pipeline) == prefix_topics("glow")
+            written = pipeline.state_writes
+            for topic, payload in synthetic_messages(DEVICE_ID, 0):
+                await pipeline.async_publish(topic, payload)
+            router = entry_data[DATA_ROUTER]
+            assert all(
+                update_group.state_writes == len(list(update_group.all_sensors))
+                for update_group in router.device_groups(DEVICE_ID)
+            )
+            assert pipeline.state_writes > written
+
+            entry_data[CONF_DEVICE_ID] = DEVICE_ID
+            await entry_data[DATA_RECONFIGURE]()
+            assert subscribed_topics(pipeline) == prefix_topics("glow")
+            entry_data[CONF_TOPIC_PREFIX] = "home/glow"
+            await entry_data[DATA_RECONFIGURE]()
+            assert subscribed_topics(pipeline) == prefix_topics("home/glow")
+            entry_data[CONF_TOPIC_PREFIX] = "glow"
+            await entry_data[DATA_RECONFIGURE]()
+            assert subscribed_topics(pipeline) == prefix_topics("glow")
+
+            pipeline.entry.unload()
+            assert subscribed_topics(pipeline) == []
+
+    asyncio.run(run())
+
+
+def test_stats_only_for_accepted_messages():
+    """Messages no group takes are counted without creating per-device counters."""
+
+    async def run():
+        with Pipeline(**{CONF_DENIED_DEVICES: {DENIED_DEVICE_ID}}) as pipeline:
+            await pipeline.async_setup()
+            for device_id in (DEVICE_ID, DENIED_DEVICE_ID):
+                for topic, payload in synthetic_messages(device_id, 0):
+                    await pipeline.async_publish(topic, payload)
+            stats = pipeline.hass.data[DOMAIN][DATA_HUB].stats
+            assert {device_id for device_id, _ in stats.messages} == {DEVICE_ID}
+            assert stats.ignored_messages == len(synthetic_messages(DENIED_DEVICE_ID, 0))
+            assert all(message_stats.matched == 1 for message_stats in stats.messages.values())
+
+    asyncio.run(run())
+
+
+def test_evict_shuts_groups_down():
+    """An evicted device's groups drop their staged writes instead of flushing them."""
+
+    async def run():
+        with Pipeline(**{CONF_COALESCE_WINDOW: 60}) as pipeline:
+            await pipeline.async_setup()
+            for topic, payload in synthetic_messages(DEVICE_ID, 0):
+                await pipeline.async_publish(topic, payload)
+            router = pipeline.hass.data[DOMAIN][pipeline.entry.entry_id][DATA_ROUTER]
+            update_groups = router.device_groups(DEVICE_ID)
+            assert update_groups
+            assert all(update_group._flush_handle is not None for update_group in update_groups)
+            router.evict(DEVICE_ID)
+            assert all(update_group._flush_handle is None for update_group in update_groups)
+            assert not any(update_group._staged for update_group in update_groups)
+
+    asyncio.run(run())
+
+
+def test_republish_waits_for_evicted_entities():
+    """A device heard again while its evicted entities are removed gets new ones once they are gone."""
+
+    async def run():
+        timers = []
+
+        def track_time_interval(hass, action, interval):
+            timers.append(action)
+            return lambda: None
+
+        options = {CONF_STALE_TIMEOUT: 1, CONF_STALE_ACTION: STALE_ACTION_EVICT}
+        with Pipeline(**options) as pipeline:
+            with patched([(sensor, "async_track_time_interval", track_time_interval)]):
+                await pipeline.async_setup()
+            for topic, payload in synthetic_messages(DEVICE_ID, 0):
+                await pipeline.async_publish(topic, payload)
+            router = pipeline.hass.data[DOMAIN][pipeline.entry.entry_id][DATA_ROUTER]
+            evicted = list(pipeline.entities)
+            removed = asyncio.Event()
+
+            async def async_remove(entity):
+                await removed.wait()
+                entity.hass = None
+
+            for entity in evicted:
+                entity.async_remove = partial(async_remove, entity)
+            router.devices[DEVICE_ID].last_seen -= 61
+            for action in timers:
+                action(None)
+            assert router.device_groups(DEVICE_ID) == []
+
+            for topic, payload in synthetic_messages(DEVICE_ID, 1):
+                await pipeline.async_publish(topic, payload)
+            assert router.device_groups(DEVICE_ID) == []
+            assert pipeline.entities == evicted
+
+            removed.set()
+            for _ in range(5):
+                await asyncio.sleep(0)
+            assert all(entity.hass is None for entity in evicted)
+            update_groups = router.device_groups(DEVICE_ID)
+            assert [update_group.kind for update_group in update_groups] == [KIND_ELECTRICITY]
+            added = pipeline.entities[len(evicted) :]
+            assert {entity.unique_id for entity in added} <= {
+                entity.unique_id for entity in evicted
+            }
+            assert update_groups[0].state_writes > 0
+
+    asyncio.run(run())
+
+
+def test_pipeline_restores_the_stubs():
+    """The harness stubs are only in place inside its block."""
+    originals = (
+        sensor.async_get_registered_groups,
+        sensor.async_remove_unselected_entities,
+        sensor.Store,
+        sensor.async_track_time_interval,
+        sensor.HildebrandGlowMqttSensor.async_write_ha_state,
+        sensor.HildebrandGlowMqttSensor.async_schedule_update_ha_state,
+        hub.mqtt,
+    )
+
+    async def run():
+        with Pipeline() as pipeline:
+            await pipeline.async_setup()
+            assert hub.mqtt is pipeline.mqtt
+            assert sensor.Store is not originals[2]
+        assert pipeline.mqtt.subscriptions == []
+
+    asyncio.run(run())
+    assert (
+        sensor.async_get_registered_groups,
+        sensor.async_remove_unselected_entities,
+        sensor.Store,
+        sensor.async_track_time_interval,
+        sensor.HildebrandGlowMqttSensor.async_write_ha_state,
+        sensor.HildebrandGlowMqttSensor.async_schedule_update_ha_state,
+        hub.mqtt,
+    ) == originals
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b'"str"',
+        b"[1, 2]",
+        b"null",
+        b"1",
+        b'{"electricitymeter": null}',
+        b'{"electricitymeter": [1]}',
+        b'{"electricitymeter": {"energy": null, "power": "x"}}',
+    ],
+)
+def test_unexpected_json_does_not_raise(payload):
+    """Valid JSON of an unexpected shape neither raises nor stops later messages."""
+
+    async def run():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: errors.append(context)
+        )
+        topic = f"glow/{DEVICE_ID}/SENSOR/{KIND_ELECTRICITY}"
+        with Pipeline() as pipeline:
+            await pipeline.async_setup()
+            await pipeline.async_publish(topic, payload)
+            for topic, good_payload in synthetic_messages(DEVICE_ID, 1):
+                await pipeline.async_publish(topic, good_payload)
+            written = pipeline.state_writes
+            await pipeline.async_publish(topic, payload)
+            for topic, good_payload in synthetic_messages(DEVICE_ID, 2):
+                await pipeline.async_publish(topic, good_payload)
+            assert pipeline.state_writes > written
+        assert errors == []
+
+    asyncio.run(run())
+
+
+def test_failing_listener_does_not_stop_the_others():
+    """A listener that raises is logged and the remaining listeners still get the message."""
+    subscription = GlowPrefixSubscription("glow", GlowStats())
+    received = []
+
+    def failing(device_id, kind, data):
+        raise RuntimeError("boom")
+
+    def accepting(device_id, kind, data):
+        received.append(data)
+        return True
+
+    subscription.add_listener(DEVICE_ID, failing)
+    subscription.add_listener("+", accepting)
+    subscription._dispatch(DEVICE_ID, KIND_ELECTRICITY, b'{"a": 1}')
+    subscription._dispatch(DEVICE_ID, KIND_ELECTRICITY, b"[1]")
+    assert received == [{"a": 1}]
+
+
+def test_device_indexes():
+    """A device's counters and groups are found by device and dropped with it."""
+    stats = GlowStats()
+    router = sensor.HildebrandGlowMqttRouter()
+    for device_id in (DEVICE_ID, DENIED_DEVICE_ID):
+        for kind in (KIND_ELECTRICITY, KIND_GAS):
+            stats.message_stats(device_id, kind)
+            router.register(sensor.HildebrandGlowMqttSensorUpdateGroup(device_id, kind, []))
+    assert list(stats.device_stats(DEVICE_ID)) == [KIND_ELECTRICITY, KIND_GAS]
+    assert [update_group.kind for update_group in router.device_groups(DEVICE_ID)] == [
+        KIND_ELECTRICITY,
+        KIND_GAS,
+    ]
+    stats.forget_device(DEVICE_ID)
+    router.evict(DEVICE_ID)
+    assert stats.device_stats(DEVICE_ID) == {}
+    assert router.device_groups(DEVICE_ID) == []
+    assert {device_id for device_id, _ in stats.messages} == {DENIED_DEVICE_ID}
+    assert {update_group.device_id for update_group in router.update_groups} == {DENIED_DEVICE_ID}
+    assert list(stats.device_stats(DENIED_DEVICE_ID)) == [KIND_ELECTRICITY, KIND_GAS]
@@ -0,0 +1,136 @@
+"""Entry setup, option updates and unload through the integration's own functions."""
+
+import asyncio
+
+from homeassistant.const import CONF_DEVICE_ID
+
+from benchmarks.harness import LocalMqtt
+import custom_components.hildebrand_glow_ihd_mqtt as integration
+from custom_components.hildebrand_glow_ihd_mqtt import hub, sensor
+from custom_components.hildebrand_glow_ihd_mqtt.const import (
+    CONF_DENIED_DEVICES,
+    CONF_POWER_INTERVAL,
+    CONF_TOPIC_PREFIX,
+    DATA_ROUTER,
+    DEFAULT_POWER_INTERVAL,
+    DOMAIN,
+)
+
+from .common import add_config_entry, async_registry_hass
+
+DEVICE_ID = "000000000001"
+
+
+class Platforms:
+    """Stand in for the platform forwarding of the config entries, recording reloads."""
+
+    def __init__(self, hass, unload_ok: bool = True) -> None:
+        """Forward the entries of hass straight to the sensor platform."""
+        self.hass = hass
+        self.unload_ok = unload_ok
+        self.reloads: list[str] = []
+        hass.config_entries.async_forward_entry_setups = self.async_forward_entry_setups
+        hass.config_entries.async_unload_platforms = self.async_unload_platforms
+        hass.config_entries.async_reload = self.async_reload
+
+    async def async_forward_entry_setups(self, entry, platforms) -> None:
+        """Set up the sensor platform of entry, without entities being added."""
+        assert list(platforms) == integration.PLATFORMS
+        await sensor.async_setup_entry(self.hass, entry, lambda entities, update_before_add=False: None)
+
+    async def async_unload_platforms(self, entry, platforms) -> bool:
+        """Report whether the platforms unloaded."""
+        return self.unload_ok
+
+    async def async_reload(self, entry_id: str) -> bool:
+        """Record a reload."""
+        self.reloads.append(entry_id)
+        return True
+
+
+def run_entry(test, tmp_path, monkeypatch, unload_ok: bool = True) -> None:
+    """Run test(hass, entry, platforms, mqtt) with the entry set up on a real Home Assistant."""
+    # The Home Assistant installed here is older than the integration asks for.
+    monkeypatch.setattr(integration, "MIN_HA_VERSION", integration.HA_VERSION)
+    mqtt = LocalMqtt()
+    monkeypatch.setattr(hub, "mqtt", mqtt)
+
+    async def run():
+        hass = await async_registry_hass(str(tmp_path))
+        try:
+            platforms = Platforms(hass, unload_ok)
+            entry = add_config_entry(hass, {CONF_DEVICE_ID: DEVICE_ID})
+            assert await integration.async_setup(hass, {})
+            assert await integration.async_setup_entry(hass, entry)
+            await test(hass, entry, platforms, mqtt)
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def subscribed_topics(mqtt: LocalMqtt) -> list[str]:
+    """Return the topics subscribed to on the MQTT stand-in."""
+    return sorted(topic for topic, _, _ in mqtt.subscriptions)
+
+
+def test_live_options_applied_without_reload(tmp_path, monkeypatch):
+    """A new topic prefix or device filter is applied to the running entry."""
+
+    async def test(hass, entry, platforms, mqtt):
+        router = hass.data[DOMAIN][entry.entry_id][DATA_ROUTER]
+        hass.config_entries.async_update_entry(
+            entry, options={CONF_TOPIC_PREFIX: "glow2", CONF_DENIED_DEVICES: "00:00:00:00:00:02"}
+        )
+        await hass.async_block_till_done()
+        assert platforms.reloads == []
+        entry_data = hass.data[DOMAIN][entry.entry_id]
+        assert entry_data[CONF_TOPIC_PREFIX] == "glow2"
+        assert entry_data[CONF_DENIED_DEVICES] == {"000000000002"}
+        assert entry_data[DATA_ROUTER] is router
+        assert subscribed_topics(mqtt) == ["glow2/+/SENSOR/+", "glow2/+/STATE"]
+
+    run_entry(test, tmp_path, monkeypatch)
+
+
+def test_other_options_reload(tmp_path, monkeypatch):
+    """Any other option change, even alongside a live one, reloads the entry instead."""
+
+    async def test(hass, entry, platforms, mqtt):
+        topics = subscribed_topics(mqtt)
+        hass.config_entries.async_update_entry(
+            entry, options={CONF_TOPIC_PREFIX: "glow2", CONF_POWER_INTERVAL: 30}
+        )
+        await hass.async_block_till_done()
+        assert platforms.reloads == [entry.entry_id]
+        entry_data = hass.data[DOMAIN][entry.entry_id]
+        assert entry_data[CONF_POWER_INTERVAL] == DEFAULT_POWER_INTERVAL
+        assert entry_data[CONF_TOPIC_PREFIX] == "glow"
+        assert subscribed_topics(mqtt) == topics
+
+    run_entry(test, tmp_path, monkeypatch)
+
+
+def test_unload_entry(tmp_path, monkeypatch):
+    """Unloading drops the entry's data, and its unload callbacks its subscription."""
+
+    async def test(hass, entry, platforms, mqtt):
+        assert subscribed_topics(mqtt) != []
+        assert await integration.async_unload_entry(hass, entry)
+        assert entry.entry_id not in hass.data[DOMAIN]
+        await entry._async_process_on_unload(hass)
+        assert subscribed_topics(mqtt) == []
+        # The update listener went with the entry.
+        assert entry.update_listeners == []
+
+    run_entry(test, tmp_path, monkeypatch)
+
+
+def test_failed_unload_keeps_the_entry(tmp_path, monkeypatch):
+    """An entry whose platforms fail to unload keeps its data."""
+
+    async def test(hass, entry, platforms, mqtt):
+        assert not await integration.async_unload_entry(hass, entry)
+        assert DATA_ROUTER in hass.data[DOMAIN][entry.entry_id]
+
+    run_entry(test, tmp_path, monkeypatch, unload_ok=False)
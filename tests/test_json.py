@@ -0,0 +1,80 @@
+"""Parity of orjson and the stdlib fallback decoder on Glow payloads."""
+
+import os
+import re
+
+import orjson
+import pytest
+
+from custom_components.hildebrand_glow_ihd_mqtt import hub
+from custom_components.hildebrand_glow_ihd_mqtt.hub import GlowPrefixSubscription, stdlib_json_loads
+from custom_components.hildebrand_glow_ihd_mqtt.stats import GlowStats
+
+DESCRIPTIONS_PY = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "custom_components",
+    "hildebrand_glow_ihd_mqtt",
+    "descriptions.py",
+)
+
+
+def sample_payloads() -> dict[str, str]:
+    """Return the sample payloads documented in descriptions.py, by topic."""
+    with open(DESCRIPTIONS_PY, encoding="utf-8") as file:
+        return dict(re.findall(r"^# (glow/\S+)\s+(\{.*\})$", file.read(), re.MULTILINE))
+
+
+SAMPLES = sample_payloads()
+MALFORMED = [
+    b"",
+    b"{",
+    b'{"software":"v1.8.12"',
+    b'{"han":{"rssi":-74,}}',
+    b'{"a":1}garbage',
+    b"\xff\xfe",
+    b'{"power":{"value":NaN}}',
+    b'{"power":{"value":Infinity}}',
+    b'{"power":{"value":-Infinity}}',
+    b'{"power":{"value":1e400}}',
+]
+DECODERS = {"orjson": orjson.loads, "stdlib": stdlib_json_loads}
+
+
+def test_samples_found():
+    """The STATE and both SENSOR samples are picked up from descriptions.py."""
+    assert len(SAMPLES) == 3
+
+
+@pytest.mark.parametrize("topic", sorted(SAMPLES))
+def test_samples_decode_the_same(topic):
+    """Both decoders give the same result for str and bytes payloads."""
+    payload = SAMPLES[topic]
+    expected = orjson.loads(payload)
+    assert stdlib_json_loads(payload) == expected
+    assert orjson.loads(payload.encode()) == expected
+    assert stdlib_json_loads(payload.encode()) == expected
+
+
+@pytest.mark.parametrize("payload", MALFORMED)
+def test_malformed_raise_the_same(payload):
+    """Both decoders raise ValueError, which the hub skips, for malformed payloads."""
+    for loads in DECODERS.values():
+        with pytest.raises(ValueError):
+            loads(payload)
+
+
+@pytest.mark.parametrize("decoder", sorted(DECODERS))
+def test_dispatch_skips_malformed(monkeypatch, decoder):
+    """The hub delivers the samples and drops malformed payloads with either decoder."""
+    monkeypatch.setattr(hub, "json_loads", DECODERS[decoder])
+    stats = GlowStats()
+    subscription = GlowPrefixSubscription("glow", stats)
+    received = []
+    subscription.add_listener("+", lambda device_id, kind, data: received.append(data))
+    for topic, payload in SAMPLES.items():
+        device_id, kind = hub.parse_topic("glow/", topic)
+        subscription._dispatch(device_id, kind, payload.encode())
+    for payload in MALFORMED:
+        subscription._dispatch("XXXXXXYYYYYY", "STATE", payload)
+    assert received == [orjson.loads(payload) for payload in SAMPLES.values()]
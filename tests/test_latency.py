@@ -0,0 +1,49 @@
+"""Write latency of coalesced and suppressed state writes."""
+
+import asyncio
+
+from benchmarks.harness import Pipeline, synthetic_messages
+from custom_components.hildebrand_glow_ihd_mqtt.const import DATA_HUB, DOMAIN, KIND_ELECTRICITY
+from custom_components.hildebrand_glow_ihd_mqtt.stats import LatencyStats
+
+DEVICE_ID = "000000000001"
+
+
+def test_coalesced_messages_timed_from_the_earliest():
+    """A flush of several messages records one write latency, from the first receipt."""
+    latency = LatencyStats()
+    latency.received(100.0, 101.0)
+    latency.received(105.0, 106.0)
+    latency.written(111.0)
+    assert latency.write.count == 1
+    assert latency.write.max == 10.0
+    assert latency.total.max == 11.0
+    latency.written(112.0)
+    assert latency.write.count == 1
+
+
+def test_suppressed_flush_records_no_write_latency():
+    """A message whose states are all unchanged records no write latency."""
+
+    async def run():
+        with Pipeline() as pipeline:
+            await pipeline.async_setup()
+            topic, payload = next(
+                (topic, payload)
+                for topic, payload in synthetic_messages(DEVICE_ID, 0)
+                if topic.endswith(KIND_ELECTRICITY)
+            )
+            # The second reading starts the consumption buckets at zero.
+            await pipeline.async_publish(topic, payload)
+            await pipeline.async_publish(topic, payload)
+            latency = pipeline.hass.data[DOMAIN][DATA_HUB].stats.messages[
+                (DEVICE_ID, KIND_ELECTRICITY)
+            ].latency
+            assert latency.write.count == 2
+            written = pipeline.state_writes
+            await pipeline.async_publish(topic, payload)
+            assert pipeline.state_writes == written
+            assert latency.receipt.count == 3
+            assert latency.write.count == 2
+
+    asyncio.run(run())
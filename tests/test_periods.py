@@ -0,0 +1,98 @@
+"""Message timestamps, and PeriodTracker against determine_last_reset across years of DST changes."""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.hildebrand_glow_ihd_mqtt.const import MeterInterval
+from custom_components.hildebrand_glow_ihd_mqtt.periods import (
+    PeriodTracker,
+    determine_last_reset,
+    get_message_datetime,
+)
+
+# Northern and southern DST, half-hour DST, DST changing at midnight, and none.
+TIME_ZONES = (
+    "Europe/London",
+    "America/New_York",
+    "Australia/Sydney",
+    "Australia/Lord_Howe",
+    "America/Santiago",
+    "UTC",
+)
+START = datetime(2019, 1, 1, tzinfo=UTC)
+END = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def sweep_times(time_zone):
+    """Yield times every few hours from START to END, and every 5 minutes around DST changes."""
+    step = timedelta(hours=3, minutes=17)
+    moment = START
+    while moment < END:
+        yield moment
+        moment += step
+    day = START
+    while day < END:
+        next_day = day + timedelta(days=1)
+        if day.astimezone(time_zone).utcoffset() != next_day.astimezone(time_zone).utcoffset():
+            moment = day - timedelta(days=1)
+            while moment < next_day + timedelta(days=1):
+                yield moment
+                moment += timedelta(minutes=5)
+        day = next_day
+
+
+@pytest.mark.parametrize("time_zone_name", TIME_ZONES)
+def test_period_tracker_matches_determine_last_reset(time_zone_name):
+    """Every cached period start equals the one worked out from scratch."""
+    time_zone = dt_util.get_time_zone(time_zone_name)
+    trackers = {interval: PeriodTracker(time_zone, interval) for interval in MeterInterval}
+    mismatches = [
+        (moment, interval)
+        for moment in sweep_times(time_zone)
+        for interval, tracker in trackers.items()
+        if tracker.period_start(moment) != determine_last_reset(moment, time_zone, interval)
+    ]
+    assert not mismatches
+
+
+@pytest.mark.parametrize(
+    ("payload", "expected"),
+    [
+        ({"timestamp": "2022-06-11T20:54:53Z"}, datetime(2022, 6, 11, 20, 54, 53, tzinfo=UTC)),
+        (
+            {"electricitymeter": {"timestamp": "2022-06-11T20:38:00Z"}},
+            datetime(2022, 6, 11, 20, 38, tzinfo=UTC),
+        ),
+        (
+            {"gasmeter": {"timestamp": "2022-06-11T20:53:52"}},
+            datetime(2022, 6, 11, 20, 53, 52, tzinfo=UTC),
+        ),
+    ],
+)
+def test_message_datetime(payload, expected):
+    """The timestamp is read from the top level or the meter node, as UTC when naive."""
+    assert get_message_datetime(payload) == expected
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        None,
+        "str",
+        [1, 2],
+        1,
+        {},
+        {"electricitymeter": None},
+        {"electricitymeter": [1]},
+        {"gasmeter": "str"},
+        {"electricitymeter": {"timestamp": None}},
+        {"electricitymeter": {"timestamp": "yesterday"}},
+    ],
+)
+def test_message_datetime_invalid(payload):
+    """Payloads without a valid timestamp, whatever their shape, raise ValueError."""
+    with pytest.raises(ValueError):
+        get_message_datetime(payload)
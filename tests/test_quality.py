@@ -0,0 +1,113 @@
+"""CounterValidator rejections and the configurable counter limits."""
+
+import json
+from math import inf, nan
+
+import pytest
+
+from custom_components.hildebrand_glow_ihd_mqtt.descriptions import (
+    GAS_SENSORS,
+    scale_counter_rules,
+)
+from custom_components.hildebrand_glow_ihd_mqtt.quality import (
+    CONFIRMATIONS,
+    REJECT_DECREASE,
+    REJECT_SENTINEL,
+    REJECT_SPIKE,
+    REJECT_STALE,
+    CounterRules,
+    CounterValidator,
+)
+
+# A 30 kW supply, and its power sensor.
+RULES = CounterRules(max_rate=30.0, power="power", sentinels=(16777.215,))
+
+
+def started_validator() -> CounterValidator:
+    """Return a validator whose last accepted reading is 1000 kWh at time 0."""
+    validator = CounterValidator(RULES)
+    assert validator.check(0, 1000.0) is None
+    return validator
+
+
+@pytest.mark.parametrize(
+    ("timestamp", "value", "reason"),
+    [
+        (60, "x", REJECT_SENTINEL),
+        (60, nan, REJECT_SENTINEL),
+        (60, inf, REJECT_SENTINEL),
+        (60, -1.0, REJECT_SENTINEL),
+        (60, 16777.215, REJECT_SENTINEL),
+        (-60, 1000.1, REJECT_STALE),
+        (60, 999.0, REJECT_DECREASE),
+        # 30 kW for a minute is 0.5 kWh, plus the rounding allowance.
+        (60, 1000.6, REJECT_SPIKE),
+        (60, 1000.5, None),
+        (60, 1000.0, None),
+    ],
+)
+def test_rejection_reasons(timestamp, value, reason):
+    """Each rule rejects its readings, which are counted by reason."""
+    validator = started_validator()
+    assert validator.check(timestamp, value) == reason
+    assert validator.total_rejected == (reason is not None)
+    if reason is not None:
+        assert validator.rejected[reason] == 1
+
+
+def test_power_narrows_the_limit():
+    """With power readings the limit is twice the peak power plus 1 kW since the counter moved."""
+    validator = started_validator()
+    assert validator.check(1800, 1000.0, power=1.5) is None
+    # 4 kW over the hour since the counter last advanced allows 4 kWh.
+    assert validator.check(3600, 1004.1, power=0.5) == REJECT_SPIKE
+    assert validator.check(3600, 1004.0, power=0.5) is None
+    # Advancing resets the peak to the current power: 2 kW over the next half hour.
+    assert validator.check(5400, 1005.1, power=0.5) == REJECT_SPIKE
+    assert validator.check(5400, 1005.0, power=0.5) is None
+
+
+def test_meter_exchange_recovered():
+    """Consistent readings from a new meter are accepted after CONFIRMATIONS of them."""
+    validator = started_validator()
+    value = 10.0
+    for minute in range(1, CONFIRMATIONS):
+        assert validator.check(minute * 60, value) == REJECT_DECREASE
+        # A repeat of the same meter timestamp does not count twice.
+        assert validator.check(minute * 60, value) == REJECT_DECREASE
+        value += 0.1
+    assert validator.check(CONFIRMATIONS * 60, value) is None
+    assert validator.check(CONFIRMATIONS * 60 + 60, value + 0.1) is None
+    assert validator.rejected[REJECT_DECREASE] == 2 * (CONFIRMATIONS - 1)
+
+
+def test_inconsistent_rejections_not_confirmed():
+    """Rejected readings that do not agree with each other start the count again."""
+    validator = started_validator()
+    for minute in range(1, 3 * CONFIRMATIONS):
+        value = 10.0 if minute % 2 else 500.0
+        assert validator.check(minute * 60, value) == REJECT_DECREASE
+
+
+def test_snapshot_restore():
+    """A restored validator, saved as JSON, checks against the same last reading and peak."""
+    validator = started_validator()
+    validator.check(600, 1000.0, power=3.0)
+    restored = CounterValidator(RULES)
+    restored.restore(json.loads(json.dumps(validator.snapshot())))
+    for each in (validator, restored):
+        assert each.check(1200, 999.0) == REJECT_DECREASE
+        assert each.check(3600, 1007.1) == REJECT_SPIKE
+        assert each.check(3600, 1007.0) is None
+
+
+def test_counter_limits_scale_with_options():
+    """A gas power limit of half the default halves the energy and volume limits."""
+    assert scale_counter_rules(GAS_SENSORS, 1) == GAS_SENSORS
+    scaled = {description.key: description for description in scale_counter_rules(GAS_SENSORS, 0.5)}
+    assert scaled["gas_import"].counter_rules.max_rate == 30.0
+    assert scaled["gas_import_vol"].counter_rules.max_rate == 3.0
+    validator = CounterValidator(scaled["gas_import"].counter_rules)
+    assert validator.check(0, 100.0) is None
+    assert validator.check(3600, 140.0) == REJECT_SPIKE
+    assert validator.check(3600, 125.0) is None
@@ -0,0 +1,134 @@
+"""Groups and entities found in real device and entity registries."""
+
+import asyncio
+
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.util import slugify
+
+from custom_components.hildebrand_glow_ihd_mqtt import sensor
+from custom_components.hildebrand_glow_ihd_mqtt.const import (
+    DOMAIN,
+    KIND_ELECTRICITY,
+    KIND_GAS,
+)
+from custom_components.hildebrand_glow_ihd_mqtt.descriptions import (
+    ELECTRICITY_SENSORS,
+    SENSOR_GROUPS,
+    select_sensors,
+)
+
+from .common import add_config_entry, async_registry_hass
+
+DEVICE_ID = "1234567890AB"
+
+
+def register_sensor(hass, entry, device_id: str, name: str) -> er.RegistryEntry:
+    """Register a device and one of its sensors the way the sensor platform does."""
+    device = dr.async_get(hass).async_get_or_create(
+        config_entry_id=entry.entry_id, connections={("mac", device_id)}
+    )
+    return er.async_get(hass).async_get_or_create(
+        "sensor",
+        DOMAIN,
+        slugify(device_id + "_" + name),
+        config_entry=entry,
+        device_id=device.id,
+    )
+
+
+def test_registered_groups(tmp_path):
+    """The groups of a registered device are found from its formatted mac connection."""
+
+    async def run():
+        hass = await async_registry_hass(str(tmp_path))
+        entry = add_config_entry(hass)
+        register_sensor(hass, entry, DEVICE_ID, "Smart Meter Electricity: Import")
+        register_sensor(hass, entry, "ABCDEF012345", "Smart Meter Gas: Import")
+        other_entry = add_config_entry(hass)
+        register_sensor(hass, other_entry, "0000000000AA", "Smart Meter Gas: Import")
+        assert dr.async_get(hass).async_get_device(
+            connections={("mac", DEVICE_ID)}
+        ).connections == {("mac", "12:34:56:78:90:ab")}
+        try:
+            assert sorted(sensor.async_get_registered_device_ids(hass, entry)) == [
+                DEVICE_ID,
+                "ABCDEF012345",
+            ]
+            assert sorted(sensor.async_get_registered_groups(hass, entry)) == [
+                (DEVICE_ID, KIND_ELECTRICITY),
+                ("ABCDEF012345", KIND_GAS),
+            ]
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def test_count_added_sensors(tmp_path):
+    """Only the sensors the platform adds are expected to restore their state."""
+
+    async def run():
+        hass = await async_registry_hass(str(tmp_path))
+        entry = add_config_entry(hass)
+        sensors = list(
+            sensor.HildebrandGlowMqttSensorUpdateGroup(
+                DEVICE_ID, KIND_ELECTRICITY, ELECTRICITY_SENSORS
+            ).all_sensors
+        )
+        enabled = [entity for entity in sensors if entity.entity_registry_enabled_default]
+        disabled = [entity for entity in sensors if not entity.entity_registry_enabled_default]
+        assert enabled and disabled
+        entity_registry = er.async_get(hass)
+        try:
+            assert sensor.async_count_added_sensors(hass, sensors) == len(enabled)
+            user_disabled = register_sensor(hass, entry, DEVICE_ID, enabled[0].name)
+            entity_registry.async_update_entity(
+                user_disabled.entity_id, disabled_by=er.RegistryEntryDisabler.USER
+            )
+            register_sensor(hass, entry, DEVICE_ID, enabled[1].name)
+            user_enabled = register_sensor(hass, entry, DEVICE_ID, disabled[0].name)
+            entity_registry.async_update_entity(user_enabled.entity_id, disabled_by=None)
+            assert sensor.async_count_added_sensors(hass, sensors) == len(enabled)
+            entity_registry.async_update_entity(
+                user_enabled.entity_id, disabled_by=er.RegistryEntryDisabler.INTEGRATION
+            )
+            assert sensor.async_count_added_sensors(hass, sensors) == len(enabled) - 1
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def test_remove_unselected_entities(tmp_path):
+    """Entities of sensors taken out of the selection are removed from the registry."""
+
+    async def run():
+        hass = await async_registry_hass(str(tmp_path))
+        entry = add_config_entry(hass)
+        by_key = {description.key: description for description in ELECTRICITY_SENSORS}
+        kept = register_sensor(hass, entry, DEVICE_ID, by_key["electricity_import"].name)
+        removed = register_sensor(
+            hass, entry, DEVICE_ID, by_key["electricity_power_min_5m"].name
+        )
+        gas = register_sensor(hass, entry, DEVICE_ID, "Smart Meter Gas: Import")
+        other_entry = add_config_entry(hass)
+        other = register_sensor(
+            hass, other_entry, "0000000000AA", by_key["electricity_power_min_5m"].name
+        )
+        selected = ["electricity_import", "electricity_power"]
+        sensor_groups = {}
+        for kind, descriptions in SENSOR_GROUPS.items():
+            descriptions, sensor_keys = select_sensors(descriptions, selected)
+            if sensor_keys:
+                sensor_groups[kind] = (descriptions, sensor_keys)
+        entity_registry = er.async_get(hass)
+        try:
+            sensor.async_remove_unselected_entities(hass, entry, sensor_groups)
+            assert entity_registry.async_get(kept.entity_id) is not None
+            assert entity_registry.async_get(removed.entity_id) is None
+            assert entity_registry.async_get(gas.entity_id) is None
+            assert entity_registry.async_get(other.entity_id) is not None
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(run())
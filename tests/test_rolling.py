@@ -0,0 +1,127 @@
+"""RollingWindowStats window folding, gaps and snapshots."""
+
+import json
+import random
+
+import pytest
+
+from custom_components.hildebrand_glow_ihd_mqtt.rolling import BUCKET_SECONDS, RollingWindowStats
+
+WINDOWS = (1, 5, 15)
+START = 1717200000.0  # 2024-06-01 00:00 UTC, a whole minute
+
+
+def expected_window(samples, now: float, minutes: int):
+    """Return a window worked out from every sample, the way RollingWindowStats should."""
+    current = int(now // BUCKET_SECONDS)
+    in_window = [
+        (timestamp, value)
+        for timestamp, value in samples
+        if current - minutes < int(timestamp // BUCKET_SECONDS) <= current
+    ]
+    if not in_window:
+        return None
+    values = [value for _, value in in_window]
+    peak = max(values)
+    # The peak time is the first sample at the peak in the latest minute that reached it.
+    peaks = [timestamp for timestamp, value in in_window if value == peak]
+    latest = max(int(timestamp // BUCKET_SECONDS) for timestamp in peaks)
+    peak_time = min(timestamp for timestamp in peaks if int(timestamp // BUCKET_SECONDS) == latest)
+    return sum(values) / len(values), min(values), peak, peak_time
+
+
+def assert_windows(stats: RollingWindowStats, samples, now: float) -> None:
+    """Check every window against the samples."""
+    for minutes in WINDOWS:
+        window = stats.window(minutes)
+        expected = expected_window(samples, now, minutes)
+        if expected is None:
+            assert window is None
+        else:
+            assert window == (pytest.approx(expected[0]), *expected[1:])
+
+
+def test_windows_fold_the_closed_minutes():
+    """Each window covers the current minute and the ones before it."""
+    stats = RollingWindowStats(WINDOWS)
+    assert stats.window(5) is None
+    for minute, value in enumerate((1.0, 3.0, 2.0, 5.0, 4.0, 0.5)):
+        stats.add(START + minute * BUCKET_SECONDS + 10, value)
+    stats.add(START + 5 * BUCKET_SECONDS + 20, 1.5)
+    assert stats.window(1) == (pytest.approx(1.0), 0.5, 1.5, START + 320)
+    assert stats.window(5) == (pytest.approx(16.0 / 6), 0.5, 5.0, START + 190)
+    assert stats.window(15) == (pytest.approx(17.0 / 7), 0.5, 5.0, START + 190)
+
+
+def test_random_samples_match_every_window():
+    """Windows match a brute-force reckoning over random samples with gaps."""
+    rng = random.Random(7)
+    stats = RollingWindowStats(WINDOWS)
+    samples = []
+    now = START
+    for _ in range(2000):
+        # Mostly seconds apart, sometimes a gap of several minutes or longer than the ring.
+        now += rng.choice((1, 5, 10, 30, 90, 400, 1200))
+        value = None if rng.random() < 0.05 else round(rng.uniform(0, 10), 1)
+        stats.add(now, value)
+        if value is not None:
+            samples.append((now, value))
+        assert_windows(stats, samples, now)
+
+
+def test_older_samples_dropped():
+    """A sample from before the current minute changes nothing."""
+    stats = RollingWindowStats(WINDOWS)
+    stats.add(START + 70, 2.0)
+    stats.add(START + 10, 100.0)
+    assert stats.window(15) == (2.0, 2.0, 2.0, START + 70)
+
+
+def test_clock_only_moves_the_windows_on():
+    """A None sample closes the minute without adding a value."""
+    stats = RollingWindowStats(WINDOWS)
+    stats.add(START, 2.0)
+    stats.add(START + BUCKET_SECONDS, None)
+    assert stats.window(1) is None
+    assert stats.window(5) == (2.0, 2.0, 2.0, START)
+    stats.add(START + 15 * BUCKET_SECONDS, None)
+    assert stats.window(15) is None
+
+
+def test_snapshot_restore():
+    """A restored buffer, saved as JSON, carries on exactly where the saved one left off."""
+    rng = random.Random(11)
+    stats = RollingWindowStats(WINDOWS)
+    now = START
+    for _ in range(100):
+        now += rng.choice((5, 10, 60))
+        stats.add(now, rng.uniform(0, 10))
+    restored = RollingWindowStats(WINDOWS)
+    restored.restore(json.loads(json.dumps(stats.snapshot())))
+    for minutes in WINDOWS:
+        assert restored.window(minutes) == stats.window(minutes)
+    for _ in range(30):
+        now += rng.choice((5, 10, 60))
+        value = rng.uniform(0, 10)
+        stats.add(now, value)
+        restored.add(now, value)
+        for minutes in WINDOWS:
+            assert restored.window(minutes) == stats.window(minutes)
+
+
+def test_restore_ignores_buckets_out_of_range():
+    """Buckets older than the longest window, or newer than the current one, are not loaded."""
+    stats = RollingWindowStats(WINDOWS)
+    current = int(START // BUCKET_SECONDS)
+    stats.restore(
+        {
+            "current": current,
+            "buckets": [
+                [current - 15, 100.0, 1, 100.0, 100.0, START - 900],
+                [current - 1, 4.0, 2, 1.0, 3.0, START - 30],
+                [current + 1, 50.0, 1, 50.0, 50.0, START + 60],
+            ],
+        }
+    )
+    assert stats.window(1) is None
+    assert stats.window(15) == (2.0, 1.0, 3.0, START - 30)
@@ -0,0 +1,75 @@
+"""The integration's services, on a real Home Assistant."""
+
+import asyncio
+
+import pytest
+
+from homeassistant.const import CONF_DEVICE_ID
+from homeassistant.exceptions import ServiceValidationError
+
+import custom_components.hildebrand_glow_ihd_mqtt as integration
+from custom_components.hildebrand_glow_ihd_mqtt.const import (
+    ATTR_DATE,
+    ATTR_METER,
+    DATA_ROUTER,
+    DOMAIN,
+    KIND_ELECTRICITY,
+    METER_ELECTRICITY,
+    SERVICE_GET_CONSUMPTION,
+)
+from custom_components.hildebrand_glow_ihd_mqtt.descriptions import (
+    ELECTRICITY_SENSORS,
+    select_sensors,
+)
+from custom_components.hildebrand_glow_ihd_mqtt.sensor import (
+    HildebrandGlowMqttRouter,
+    HildebrandGlowMqttSensorUpdateGroup,
+)
+
+from .common import async_registry_hass
+
+DEVICE_ID = "1234567890AB"
+
+
+def add_router(hass, entry_id: str, selected: list[str] | None) -> None:
+    """Add an entry whose router has the device's electricity group with the selected sensors."""
+    descriptions, sensor_keys = select_sensors(ELECTRICITY_SENSORS, selected)
+    router = HildebrandGlowMqttRouter()
+    router.register(
+        HildebrandGlowMqttSensorUpdateGroup(
+            DEVICE_ID, KIND_ELECTRICITY, descriptions, sensor_keys=sensor_keys
+        )
+    )
+    hass.data[DOMAIN][entry_id] = {DATA_ROUTER: router}
+
+
+def test_get_consumption_skips_entries_without_buckets(tmp_path, monkeypatch):
+    """The consumption comes from the entry that has the buckets, whatever the entry order."""
+    # The Home Assistant installed here is older than the integration asks for.
+    monkeypatch.setattr(integration, "MIN_HA_VERSION", integration.HA_VERSION)
+
+    async def run():
+        hass = await async_registry_hass(str(tmp_path))
+        try:
+            assert await integration.async_setup(hass, {})
+            call = {
+                CONF_DEVICE_ID: DEVICE_ID,
+                ATTR_METER: METER_ELECTRICITY,
+                ATTR_DATE: "2024-06-10",
+            }
+            add_router(hass, "without_buckets", ["electricity_import"])
+            with pytest.raises(ServiceValidationError):
+                await hass.services.async_call(
+                    DOMAIN, SERVICE_GET_CONSUMPTION, call, blocking=True, return_response=True
+                )
+            add_router(hass, "with_buckets", None)
+            response = await hass.services.async_call(
+                DOMAIN, SERVICE_GET_CONSUMPTION, call, blocking=True, return_response=True
+            )
+            assert response[CONF_DEVICE_ID] == DEVICE_ID
+            assert len(response["half_hours"]) == 48
+            assert len(response["hours"]) == 24
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(run())
@@ -0,0 +1,147 @@
+"""State writes on a controlled clock: throttling, time-weighted power, change detection and heartbeat."""
+
+import asyncio
+from datetime import UTC, datetime
+
+import orjson
+import pytest
+
+from benchmarks.harness import Pipeline, controlled_clock, synthetic_messages
+from custom_components.hildebrand_glow_ihd_mqtt.const import (
+    ATTR_MAX,
+    ATTR_MIN,
+    CONF_COUNTER_INTERVAL,
+    CONF_HEARTBEAT_INTERVAL,
+    CONF_POWER_INTERVAL,
+    KIND_ELECTRICITY,
+)
+
+DEVICE_ID = "000000000001"
+START = datetime(2024, 3, 31, tzinfo=UTC).timestamp()
+
+
+def electricity_message(step: int, power: float | None = None) -> tuple[str, bytes]:
+    """Return the electricity message of a 10 second step, optionally with another power."""
+    topic, payload = next(
+        (topic, payload)
+        for topic, payload in synthetic_messages(DEVICE_ID, step)
+        if topic.endswith(KIND_ELECTRICITY)
+    )
+    if power is not None:
+        data = orjson.loads(payload)
+        data["electricitymeter"]["power"]["value"] = power
+        payload = orjson.dumps(data)
+    return topic, payload
+
+
+class Recorder:
+    """Publish messages at set clock times and record the states written."""
+
+    def __init__(self, pipeline: Pipeline, clock: dict[str, float]) -> None:
+        """Record the writes of pipeline."""
+        self.pipeline = pipeline
+        self.clock = clock
+        self.writes: list[tuple[str, object, dict]] = []
+        pipeline.on_write = lambda entity: self.writes.append(
+            (entity.entity_description.key, entity.native_value, entity.extra_state_attributes)
+        )
+
+    async def publish(self, seconds: float, message: tuple[str, bytes]) -> list[tuple]:
+        """Publish a message seconds after the start and return the writes it made."""
+        self.clock["now"] = START + seconds
+        self.writes = []
+        await self.pipeline.async_publish(*message)
+        return self.writes
+
+    def sensors(self) -> dict:
+        """Return the pipeline's sensors by key."""
+        return {entity.entity_description.key: entity for entity in self.pipeline.entities}
+
+
+def run_pipeline(test, **options) -> None:
+    """Run test(recorder) with a pipeline of options on a controlled clock."""
+
+    async def run():
+        clock = {"now": START}
+        with controlled_clock(clock), Pipeline(**options) as pipeline:
+            await pipeline.async_setup()
+            await test(Recorder(pipeline, clock))
+
+    asyncio.run(run())
+
+
+def keyed(writes, key: str) -> list[tuple]:
+    """Return the value and attributes of the writes of one sensor."""
+    return [(value, attributes) for write_key, value, attributes in writes if write_key == key]
+
+
+def test_power_published_as_time_weighted_mean():
+    """Power is published once per interval as the time-weighted mean, with its min and max."""
+
+    async def test(recorder: Recorder):
+        written = await recorder.publish(0, electricity_message(0, power=1.0))
+        assert [value for value, _ in keyed(written, "electricity_power")] == [1.0]
+        for seconds, power in ((10, 2.0), (20, 4.0)):
+            written = await recorder.publish(seconds, electricity_message(seconds // 10, power))
+            assert keyed(written, "electricity_power") == []
+        written = await recorder.publish(30, electricity_message(3, power=1.0))
+        [(value, attributes)] = keyed(written, "electricity_power")
+        # 1 kW for 10 s, 2 kW for 10 s and 4 kW for 10 s.
+        assert value == pytest.approx(2.333)
+        assert (attributes[ATTR_MIN], attributes[ATTR_MAX]) == (1.0, 4.0)
+        # The next window starts from the sample current at its start, and the
+        # sample that closes it counts towards its min and max but not its mean.
+        written = await recorder.publish(60, electricity_message(6, power=0.5))
+        [(value, attributes)] = keyed(written, "electricity_power")
+        assert value == pytest.approx(1.0)
+        assert (attributes[ATTR_MIN], attributes[ATTR_MAX]) == (0.5, 1.0)
+
+    run_pipeline(test, **{CONF_POWER_INTERVAL: 30})
+
+
+def test_counters_throttled():
+    """Cumulative counters are published at most once per interval, whatever the clock of the payload."""
+
+    async def test(recorder: Recorder):
+        published = []
+        for seconds in range(0, 130, 10):
+            written = await recorder.publish(seconds, electricity_message(seconds // 10))
+            if keyed(written, "electricity_import"):
+                published.append(seconds)
+        assert published == [0, 60, 120]
+
+    run_pipeline(test, **{CONF_COUNTER_INTERVAL: 60})
+
+
+def test_unchanged_states_not_written():
+    """A repeated reading writes nothing, and a new power reading only writes what changed."""
+
+    async def test(recorder: Recorder):
+        await recorder.publish(0, electricity_message(0))
+        # The second reading starts the consumption buckets at zero.
+        await recorder.publish(10, electricity_message(0))
+        sensors = recorder.sensors()
+        suppressed = sensors["electricity_import"].suppressed_writes
+        assert await recorder.publish(20, electricity_message(0)) == []
+        assert sensors["electricity_import"].suppressed_writes == suppressed + 1
+        written = await recorder.publish(30, electricity_message(0, power=9.0))
+        keys = {key for key, _, _ in written}
+        assert "electricity_power" in keys
+        assert "electricity_import" not in keys
+        assert all(key.startswith("electricity_power") for key in keys)
+
+    run_pipeline(test)
+
+
+def test_heartbeat_rewrites_unchanged_states():
+    """Unchanged states are written again once the heartbeat interval has passed."""
+
+    async def test(recorder: Recorder):
+        await recorder.publish(0, electricity_message(0))
+        await recorder.publish(10, electricity_message(0))
+        assert await recorder.publish(50, electricity_message(0)) == []
+        written = await recorder.publish(75, electricity_message(0))
+        assert sorted(key for key, _, _ in written) == sorted(recorder.sensors())
+        assert await recorder.publish(80, electricity_message(0)) == []
+
+    run_pipeline(test, **{CONF_HEARTBEAT_INTERVAL: 1})